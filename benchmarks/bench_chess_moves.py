@@ -0,0 +1,83 @@
+"""Move-validation throughput for server-side chess rooms.
+
+Pre-generates random legal games for many rooms, then plays them
+round-robin through the server's per-room boards, as concurrent games
+would arrive. Compares that with replaying each room's move list to
+validate every new move. Database writes are not included.
+
+    python benchmarks/bench_chess_moves.py --rooms 1000 --plies 80
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import main as srv  # noqa: E402
+
+
+def random_games(rooms: int, plies: int, seed: int) -> list:
+    rng = random.Random(seed)
+    games = []
+    for _ in range(rooms):
+        board = srv.chess.Board()
+        moves = []
+        while len(moves) < plies and board.outcome() is None:
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            moves.append(move.uci())
+        games.append(moves)
+    return games
+
+
+def incremental(games: list) -> int:
+    rooms = [srv.ChessRoom(room_id=str(i), status='playing', board=srv.chess.Board())
+             for i in range(len(games))]
+    played = 0
+    for ply in range(max(map(len, games))):
+        for room, moves in zip(rooms, games):
+            if ply < len(moves):
+                with srv._CHESS_LOCK:
+                    srv._apply_chess_move(room, moves[ply])
+                played += 1
+    return played
+
+
+def replay(games: list) -> int:
+    played = 0
+    for ply in range(max(map(len, games))):
+        for moves in games:
+            if ply < len(moves):
+                board = srv.chess.Board()
+                for uci in moves[:ply]:
+                    board.push_uci(uci)
+                assert board.is_legal(srv.chess.Move.from_uci(moves[ply]))
+                board.push_uci(moves[ply])
+                board.outcome()
+                played += 1
+    return played
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=1000)
+    parser.add_argument('--plies', type=int, default=80)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if not srv.CHESS_AVAILABLE:
+        sys.exit("python-chess is not installed")
+
+    games = random_games(args.rooms, args.plies, args.seed)
+    print(f"rooms            {args.rooms:8d}  ({sum(map(len, games)):,} moves)")
+    for name, run in (('incremental', incremental), ('replay', replay)):
+        start = time.perf_counter()
+        played = run(games)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16} {played / elapsed:8,.0f} moves/s  ({elapsed * 1e6 / played:.0f} us/move)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Round-trip time of the game client's HTTP calls: urlopen vs the keep-alive pool.
+
+Launches the server under uvicorn on a free local port (over TLS with a
+throwaway self-signed certificate when ``--tls`` is given) and times:
+
+    urlopen    a fresh connection per request, as the client used to
+    pooled     http_pool.client reusing one keep-alive connection
+    pong pair  a paddle POST and a state GET, one after the other vs pipelined
+
+``--rtt-ms`` routes traffic through a local proxy that delays every
+chunk by half the round-trip time each way, standing in for a real network.
+
+It then points both at a server that accepts connections but never answers,
+to show the circuit breaker failing fast instead of waiting out every timeout.
+
+    python benchmarks/bench_http_client.py --requests 500
+    python benchmarks/bench_http_client.py --requests 200 --tls --rtt-ms 40
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'terminal_games'))
+
+import http_pool  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, db_path: str, tls_dir: str = '') -> subprocess.Popen:
+    env = dict(os.environ, LEADERBOARD_DB=db_path, RATE_LIMIT='0')
+    cmd = [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning']
+    if tls_dir:
+        cmd += ['--ssl-keyfile', os.path.join(tls_dir, 'key.pem'), '--ssl-certfile', os.path.join(tls_dir, 'cert.pem')]
+    proc = subprocess.Popen(cmd, cwd=os.path.join(ROOT, 'server'), env=env)
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit('server did not start')
+
+
+def start_delay_proxy(upstream_port: int, rtt_ms: float) -> int:
+    """TCP proxy adding ``rtt_ms / 2`` each way; returns its port.
+
+    Each chunk is delivered half an RTT after it arrived, so back-to-back
+    chunks are not delayed one after the other. A new connection also waits
+    one full RTT before its first byte goes upstream, standing in for the
+    TCP handshake that the local accept makes free.
+    """
+    delay = rtt_ms / 2000
+    ready = threading.Event()
+    listen = []
+
+    async def pipe(reader, writer, first_delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        async def deliver() -> None:
+            while True:
+                due, data = await queue.get()
+                await asyncio.sleep(max(0.0, due - loop.time()))
+                if data is None:
+                    break
+                writer.write(data)
+                await writer.drain()
+
+        sender = asyncio.ensure_future(deliver())
+        extra = first_delay
+        try:
+            while True:
+                data = await reader.read(65536)
+                await queue.put((loop.time() + delay + extra, data or None))
+                extra = 0.0
+                if not data:
+                    break
+            await sender
+        except OSError:
+            sender.cancel()
+        finally:
+            writer.close()
+
+    async def handle(reader, writer) -> None:
+        up_reader, up_writer = await asyncio.open_connection('127.0.0.1', upstream_port)
+        await asyncio.gather(pipe(reader, up_writer, 2 * delay), pipe(up_reader, writer, 0.0))
+
+    async def serve() -> None:
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        listen.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        await server.serve_forever()
+
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+    ready.wait()
+    return listen[0]
+
+
+def make_cert(directory: str) -> None:
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=127.0.0.1',
+         '-addext', 'subjectAltName=IP:127.0.0.1',
+         '-keyout', os.path.join(directory, 'key.pem'), '-out', os.path.join(directory, 'cert.pem')],
+        check=True, capture_output=True,
+    )
+
+
+def timed(fn, n: int) -> list:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples: list) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f'{label:<22} mean {statistics.mean(ordered):6.2f} ms   p50 {statistics.median(ordered):6.2f} ms   '
+          f'p99 {p99:6.2f} ms')
+
+
+def bench_down(timeout: float, calls: int) -> None:
+    with socket.socket() as hung:
+        hung.bind(('127.0.0.1', 0))
+        hung.listen(64)  # accepts into the backlog, never reads or answers
+        url = f'http://127.0.0.1:{hung.getsockname()[1]}/health'
+        start = time.perf_counter()
+        for _ in range(calls):
+            try:
+                urllib.request.urlopen(url, timeout=timeout)
+            except OSError:
+                pass
+        plain = time.perf_counter() - start
+
+        client = http_pool.HTTPClient(timeout=timeout)
+        start = time.perf_counter()
+        refused = 0
+        for _ in range(calls):
+            try:
+                client.get(url)
+            except http_pool.CircuitOpenError:
+                refused += 1
+            except OSError:
+                pass
+        pooled = time.perf_counter() - start
+    print(f'hung server, {calls} calls with a {timeout:g} s timeout: urlopen {plain:5.2f} s, '
+          f'pooled {pooled:5.2f} s ({refused} refused by the breaker)')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--tls', action='store_true', help='serve over HTTPS with a self-signed certificate')
+    parser.add_argument('--rtt-ms', type=float, default=0.0, help='emulated network round-trip time')
+    parser.add_argument('--down-timeout', type=float, default=0.5)
+    args = parser.parse_args()
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        context = None
+        if args.tls:
+            make_cert(tmp)
+            context = ssl.create_default_context(cafile=os.path.join(tmp, 'cert.pem'))
+        scheme = 'https' if args.tls else 'http'
+        proc = start_server(port, os.path.join(tmp, 'bench.db'), tmp if args.tls else '')
+        if args.rtt_ms:
+            port = start_delay_proxy(port, args.rtt_ms)
+        server = f'{scheme}://127.0.0.1:{port}'
+        try:
+            client = http_pool.HTTPClient(ssl_context=context)
+            room = client.post(f'{server}/api/pong/create_room?player_name=left').json()['room_id']
+            client.post(f'{server}/api/pong/join_room?room_id={room}&player_name=right')
+            state = f'{server}/api/pong/state?room_id={room}&player_name=left'
+            paddle = f'{server}/api/pong/paddle?room_id={room}&player_name=left&direction=up'
+
+            def fresh() -> None:
+                with urllib.request.urlopen(state, timeout=5, context=context) as resp:
+                    json.loads(resp.read())
+
+            print(f'{args.requests} requests against {server} (uvicorn on this machine, '
+                  f'{args.rtt_ms:g} ms emulated RTT)')
+            report('urlopen GET', timed(fresh, args.requests))
+            report('pooled GET', timed(lambda: client.get(state).json(), args.requests))
+            report('pong pair sequential', timed(lambda: (client.post(paddle), client.get(state)), args.requests))
+            report('pong pair pipelined', timed(
+                lambda: client.pipeline([('POST', paddle, b''), ('GET', state, None)]), args.requests))
+            print(f'connections opened by the pool: {client.opened}')
+            client.close()
+        finally:
+            proc.terminate()
+            proc.wait()
+    bench_down(args.down_timeout, 20)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+"""Load-test harness: mixed scores, leaderboard, chess and Pong traffic.
+
+Launches the server under uvicorn on a free local port (or targets
+``--server``) and runs ``--concurrency`` virtual users for ``--duration``
+seconds. Each user is seeded from ``--seed`` and plays one scenario,
+picked by the ``--mix`` weights:
+
+    scores       submit single scores, and now and then a bulk batch
+    leaderboard  all-time, windowed and paged boards plus rank lookups
+    chess        create, join, play a fixed opening with long-polls, resign
+    pong         create, join, poll state at 30 Hz with paddle changes, forfeit
+
+Prints per-operation throughput, p50/p90/p99 latency and error rates as
+JSON (also written to ``--output``). Given ``--baseline`` it compares
+against an earlier report and exits non-zero on a regression.
+
+    python benchmarks/bench_load.py --concurrency 32 --duration 20 --output load.json
+    python benchmarks/bench_load.py --baseline load.json --tolerance 0.2
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+GAMES = ['snake', 'tetris', 'breakout', 'pong', 'wordle', '2048']
+OPENING = ['e2e4', 'e7e5', 'g1f3', 'b8c6', 'f1b5', 'a7a6', 'b5a4', 'g8f6', 'e1g1', 'f8e7']
+DEFAULT_MIX = 'scores=3,leaderboard=4,chess=2,pong=1'
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, db_path: str, rate_limit: bool) -> subprocess.Popen:
+    env = dict(os.environ, LEADERBOARD_DB=db_path, RATE_LIMIT='1' if rate_limit else '0',
+               RATE_LIMIT_TRUST_PROXY='1')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=os.path.join(ROOT, 'server'), env=env,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit('server did not start')
+
+
+def cpu_seconds(pid: int):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+class Stop(Exception):
+    """The run is over; unwinds a scenario mid-iteration."""
+
+
+class User:
+    """One virtual user: a keep-alive connection, its own address and RNG."""
+
+    def __init__(self, uid: int, host: str, port: int, seed: int, deadline: float, samples: list) -> None:
+        self.uid = uid
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed * 100003 + uid)
+        self.deadline = deadline
+        self.samples = samples  # (finished_at, op, ms, status, ok) shared list
+        self.headers = {'X-Forwarded-For': f'10.{uid // 65536 % 256}.{uid // 256 % 256}.{uid % 256}',
+                        'Content-Type': 'application/json'}
+        self.conn = None
+
+    def call(self, op: str, method: str, path: str, params=None, body=None, expect=(200,)):
+        if time.perf_counter() >= self.deadline:
+            raise Stop
+        if params:
+            path += '?' + urllib.parse.urlencode(params)
+        start = time.perf_counter()
+        status, data = 0, None
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                              headers=self.headers)
+            resp = self.conn.getresponse()
+            raw = resp.read()
+            status = resp.status
+            if status == 200 and raw[:1] in (b'{', b'['):
+                data = json.loads(raw)
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+        end = time.perf_counter()
+        self.samples.append((end, op, (end - start) * 1000, status, status in expect))
+        return status, data
+
+    # ── Scenarios: one iteration each ──
+
+    def scores(self) -> None:
+        if self.rng.random() < 0.1:
+            batch = [{'player_name': f'p{self.rng.randrange(1000)}', 'game_name': self.rng.choice(GAMES),
+                      'score': self.rng.randrange(100000)} for _ in range(20)]
+            self.call('submit_bulk', 'POST', '/api/scores/bulk', body=batch)
+        else:
+            self.call('submit_score', 'POST', '/api/scores', body={
+                'player_name': f'p{self.rng.randrange(1000)}', 'game_name': self.rng.choice(GAMES),
+                'score': self.rng.randrange(100000),
+            })
+
+    def leaderboard(self) -> None:
+        game = self.rng.choice(GAMES)
+        roll = self.rng.random()
+        if roll < 0.5:
+            self.call('leaderboard', 'GET', '/api/leaderboard', {'game_name': game, 'limit': 10})
+        elif roll < 0.7:
+            self.call('leaderboard_window', 'GET', '/api/leaderboard',
+                      {'game_name': game, 'window': self.rng.choice(['day', 'week', 'month'])})
+        elif roll < 0.85:
+            self.call('leaderboard_page', 'GET', '/api/leaderboard/page', {'game_name': game, 'limit': 50})
+        else:
+            # Not every player has a score in every game yet; 404 is a valid answer.
+            self.call('rank', 'GET', '/api/rank', {'player_name': f'p{self.rng.randrange(1000)}', 'game_name': game},
+                      expect=(200, 404))
+
+    def chess(self) -> None:
+        white, black = f'w{self.uid}', f'b{self.uid}'
+        status, room = self.call('chess_create', 'POST', '/api/chess/create_room', {'player_name': white})
+        if status != 200:
+            return
+        room_id = room['room_id']
+        self.call('chess_join', 'POST', '/api/chess/join_room', {'room_id': room_id, 'player_name': black})
+        for i, move in enumerate(OPENING):
+            player = white if i % 2 == 0 else black
+            self.call('chess_move', 'POST', '/api/chess/move',
+                      {'room_id': room_id, 'player_name': player, 'move': move})
+            self.call('chess_wait', 'GET', '/api/chess/wait', {'room_id': room_id, 'since': i, 'timeout': 5})
+        self.call('chess_state', 'GET', '/api/chess/game_state', {'room_id': room_id, 'player_name': white})
+        self.call('chess_resign', 'POST', '/api/chess/resign', {'room_id': room_id, 'player_name': black})
+
+    def pong(self, seconds: float = 2.0, hz: float = 30.0) -> None:
+        status, room = self.call('pong_create', 'POST', '/api/pong/create_room', {'player_name': f'l{self.uid}'})
+        if status != 200:
+            return
+        room_id = room['room_id']
+        self.call('pong_join', 'POST', '/api/pong/join_room', {'room_id': room_id, 'player_name': f'r{self.uid}'})
+        try:
+            next_at = time.perf_counter()
+            for frame in range(int(seconds * hz)):
+                self.call('pong_state', 'GET', '/api/pong/state', {'room_id': room_id, 'player_name': f'l{self.uid}'})
+                if frame % 5 == 0:
+                    self.call('pong_paddle', 'POST', '/api/pong/paddle', {
+                        'room_id': room_id, 'player_name': f'l{self.uid}',
+                        'direction': self.rng.choice(['up', 'down', 'stop']),
+                    })
+                next_at += 1 / hz
+                time.sleep(max(0.0, next_at - time.perf_counter()))
+        finally:
+            self.deadline += 5  # let the forfeit through even when time is up
+            self.call('pong_forfeit', 'POST', '/api/pong/forfeit', {'room_id': room_id, 'player_name': f'l{self.uid}'})
+            self.deadline -= 5
+
+    def run(self, scenario: str) -> None:
+        step = getattr(self, scenario)
+        try:
+            while time.perf_counter() < self.deadline:
+                step()
+        except Stop:
+            pass
+        finally:
+            if self.conn is not None:
+                self.conn.close()
+
+
+def parse_mix(text: str) -> list:
+    mix = []
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('scores', 'leaderboard', 'chess', 'pong'):
+            raise SystemExit(f'unknown scenario: {name}')
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def assign(mix: list, users: int, seed: int) -> list:
+    """Scenario per user: proportional to the weights, shuffled by the seed."""
+    total = sum(w for _, w in mix)
+    names = []
+    for name, weight in mix:
+        names += [name] * round(users * weight / total)
+    while len(names) < users:
+        names.append(max(mix, key=lambda m: m[1])[0])
+    names = names[:users]
+    random.Random(seed).shuffle(names)
+    return names
+
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def summarise(samples: list, start: float, end: float) -> dict:
+    window = end - start
+    ops = {}
+    for at, op, ms, status, ok in samples:
+        if start <= at <= end:
+            ops.setdefault(op, []).append((ms, status, ok))
+    report = {}
+    for op, rows in sorted(ops.items()):
+        ordered = sorted(ms for ms, _, _ in rows)
+        limited = sum(1 for _, status, _ in rows if status == 429)
+        errors = sum(1 for _, status, ok in rows if not ok and status != 429)
+        report[op] = {
+            'count': len(rows),
+            'throughput_rps': round(len(rows) / window, 1),
+            'p50_ms': round(percentile(ordered, 0.5), 2),
+            'p90_ms': round(percentile(ordered, 0.9), 2),
+            'p99_ms': round(percentile(ordered, 0.99), 2),
+            'max_ms': round(ordered[-1], 2),
+            'errors': errors,
+            'rate_limited': limited,
+            'error_rate': round(errors / len(rows), 4),
+        }
+    count = sum(r['count'] for r in report.values())
+    errors = sum(r['errors'] for r in report.values())
+    all_ms = sorted(ms for rows in ops.values() for ms, _, _ in rows)
+    total = {
+        'count': count,
+        'throughput_rps': round(count / window, 1),
+        'p50_ms': round(percentile(all_ms, 0.5), 2),
+        'p99_ms': round(percentile(all_ms, 0.99), 2),
+        'errors': errors,
+        'rate_limited': sum(r['rate_limited'] for r in report.values()),
+        'error_rate': round(errors / count, 4) if count else 0.0,
+    }
+    return {'total': total, 'operations': report}
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_count: int = 100) -> list:
+    """Regressions of ``report`` against ``baseline`` beyond ``tolerance``.
+
+    Operations with fewer than ``min_count`` samples in either run are too
+    noisy to judge on their own and only count towards the total.
+    """
+    problems = []
+    pairs = [('total', report['total'], baseline['total'])]
+    pairs += [(op, stats, baseline['operations'][op]) for op, stats in report['operations'].items()
+              if op in baseline['operations']
+              and min(stats['count'], baseline['operations'][op]['count']) >= min_count]
+    for name, now, before in pairs:
+        if now['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            problems.append(f"{name}: throughput {before['throughput_rps']} -> {now['throughput_rps']} req/s")
+        if now['p99_ms'] > before['p99_ms'] * (1 + tolerance) and now['p99_ms'] - before['p99_ms'] > 1.0:
+            problems.append(f"{name}: p99 {before['p99_ms']} -> {now['p99_ms']} ms")
+        if now['error_rate'] > before['error_rate'] + 0.01:
+            problems.append(f"{name}: error rate {before['error_rate']} -> {now['error_rate']}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=32, help='virtual users')
+    parser.add_argument('--duration', type=float, default=20.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3.0, help='seconds run before measuring')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'scenario weights (default {DEFAULT_MIX})')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--server', help='host:port of a running server instead of launching one')
+    parser.add_argument('--rate-limit', action='store_true', help='keep the server rate limiter on')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--baseline', help='earlier JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    scenarios = assign(mix, args.concurrency, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = None
+        if args.server:
+            host, _, port = args.server.rpartition(':')
+            port = int(port)
+        else:
+            host, port = '127.0.0.1', free_port()
+            proc = start_server(port, os.path.join(tmp, 'load.db'), args.rate_limit)
+        try:
+            samples = []
+            begin = time.perf_counter()
+            measure_from = begin + args.warmup
+            measure_to = measure_from + args.duration
+            users = [User(i, host, port, args.seed, measure_to, samples) for i in range(args.concurrency)]
+            threads = [threading.Thread(target=u.run, args=(s,), daemon=True) for u, s in zip(users, scenarios)]
+            for t in threads:
+                t.start()
+            time.sleep(max(0.0, measure_from - time.perf_counter()))
+            cpu_start = cpu_seconds(proc.pid) if proc else None
+            time.sleep(max(0.0, measure_to - time.perf_counter()))
+            cpu_end = cpu_seconds(proc.pid) if proc else None
+            for t in threads:
+                t.join(timeout=30)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    report = {
+        'config': {
+            'concurrency': args.concurrency, 'duration_s': args.duration, 'warmup_s': args.warmup,
+            'mix': dict(mix), 'seed': args.seed, 'rate_limit': args.rate_limit,
+            'users': {name: scenarios.count(name) for name, _ in mix},
+        },
+        'environment': {
+            'commit': git_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        **summarise(samples, measure_from, measure_to),
+    }
+    if cpu_start is not None and cpu_end is not None:
+        report['server'] = {'cpu_percent': round((cpu_end - cpu_start) / args.duration * 100, 1)}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f'REGRESSION {problem}', file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
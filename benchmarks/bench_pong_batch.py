@@ -0,0 +1,67 @@
+"""Scalar vs NumPy batch tick throughput for the Pong simulation.
+
+Steps the same set of rooms with ``_tick_pong`` one by one and with a
+single ``PongBatch`` and reports room-ticks per second for each, plus how
+many rooms one core could keep at the 1/PONG_TICK target. Needs numpy.
+
+    python benchmarks/bench_pong_batch.py --rooms 10000 --ticks 300
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import main as srv  # noqa: E402
+
+
+def make_rooms(n: int) -> list:
+    rooms = []
+    for i in range(n):
+        room = srv.PongRoom(room_id=f'bench{i}', player_left='l', player_right='r', seed=i)
+        srv._reset_pong_room(room)
+        room.paddle_dir_left = ('up', 'stop', 'down')[i % 3]
+        rooms.append(room)
+    return rooms
+
+
+def report(label: str, room_ticks: int, seconds: float, target: float) -> float:
+    rate = room_ticks / seconds
+    print(f"{label:<8} {rate:12,.0f} room-ticks/s  (one core sustains ~{rate / target:,.0f} rooms)")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=10_000)
+    parser.add_argument('--ticks', type=int, default=300)
+    args = parser.parse_args()
+    if not srv.NUMPY_AVAILABLE:
+        sys.exit("numpy is not installed")
+
+    srv.pong_engine.stop()
+    # Matches would end after ten points; keep them all playing.
+    srv.WIN_SCORE = 10 ** 9
+    target = 1.0 / srv.PONG_TICK
+
+    rooms = make_rooms(args.rooms)
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        for room in rooms:
+            srv._tick_pong(room)
+    scalar = report('scalar', args.rooms * args.ticks, time.perf_counter() - start, target)
+
+    batch = srv.PongBatch(capacity=args.rooms)
+    for room in make_rooms(args.rooms):
+        batch.add(room)
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        batch.step()
+    batched = report('batch', args.rooms * args.ticks, time.perf_counter() - start, target)
+    print(f"speedup  {batched / scalar:12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Tick-rate benchmark for the Pong simulation engine.
+
+Creates many live rooms, lets a PongEngine run them for a few seconds and
+reports the tick rate each room actually achieved against the 1/PONG_TICK
+target, plus the raw cost of one tick.
+
+    python benchmarks/bench_pong_engine.py --rooms 10000 --workers 4 --seconds 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import main as srv  # noqa: E402
+
+
+def make_rooms(n: int) -> list:
+    rooms = []
+    for i in range(n):
+        room = srv.PongRoom(room_id=f'bench{i}', player_left='l', player_right='r', seed=i)
+        srv._reset_pong_room(room)
+        rooms.append(room)
+    return rooms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=srv.PONG_WORKERS)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    srv.pong_engine.stop()
+    target = 1.0 / srv.PONG_TICK
+
+    rooms = make_rooms(1000)
+    start = time.perf_counter()
+    for room in rooms:
+        for _ in range(30):
+            srv._tick_pong(room)
+    per_tick = (time.perf_counter() - start) / (len(rooms) * 30)
+    print(f"single tick      {per_tick * 1e6:8.2f} us  (one core sustains ~{1 / per_tick / target:,.0f} rooms)")
+
+    engine = srv.PongEngine(workers=args.workers)
+    rooms = make_rooms(args.rooms)
+    # Matches would end after ten points; keep them all playing.
+    srv.WIN_SCORE = 10 ** 9
+    for room in rooms:
+        engine.add(room)
+        engine.start_match(room)
+    engine.start()
+    time.sleep(args.seconds)
+    engine.stop()
+
+    ticks = sum(room.tick for room in rooms)
+    rate = ticks / len(rooms) / args.seconds
+    print(f"rooms            {args.rooms:8d}  across {args.workers} workers")
+    print(f"achieved rate    {rate:8.1f} ticks/s per room  (target {target:.1f}, {100 * rate / target:.0f}%)")
+    print(f"total            {ticks / args.seconds:8.0f} room-ticks/s")
+
+
+if __name__ == '__main__':
+    main()
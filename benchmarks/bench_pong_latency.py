@@ -0,0 +1,117 @@
+"""Input-to-state latency for online Pong: WebSocket push vs HTTP polling.
+
+Launches the server under uvicorn on a free local port, opens a match and,
+for each transport, flips the paddle direction and times how long it takes
+until a state showing the paddle moving reaches the client.
+
+    python benchmarks/bench_pong_latency.py --samples 100
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'terminal_games'))
+
+import network_game as ng  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, db_path: str) -> subprocess.Popen:
+    env = dict(os.environ, LEADERBOARD_DB=db_path)
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=os.path.join(ROOT, 'server'), env=env,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit('server did not start')
+
+
+HTTP_CALLS = [0]
+
+
+def _counting(func):
+    def wrapper(*args, **kwargs):
+        HTTP_CALLS[0] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+ng._get = _counting(ng._get)
+ng._post = _counting(ng._post)
+
+
+def measure(transport: ng.PongTransport, samples: int) -> list:
+    latencies = []
+    direction = 'up'
+    for _ in range(samples):
+        before = (transport.latest_state() or {}).get('my_paddle_y')
+        direction = 'down' if direction == 'up' else 'up'
+        start = time.perf_counter()
+        transport._last_http_send = 0.0
+        transport.send_paddle(direction)
+        while time.perf_counter() - start < 2.0:
+            state = transport.latest_state() or {}
+            if state.get('my_paddle_y') != before:
+                latencies.append((time.perf_counter() - start) * 1000)
+                break
+            time.sleep(0.001)
+        # Let the paddle come off the wall before the next flip.
+        time.sleep(0.05)
+    return latencies
+
+
+def report(label: str, latencies: list, http_calls: int, elapsed: float) -> None:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{label:<10} p50 {statistics.median(ordered):7.1f} ms   p99 {p99:7.1f} ms   "
+          f"n={len(ordered)}   {http_calls / elapsed:7.1f} HTTP req/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=100)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = start_server(port, os.path.join(tmp, 'bench.db'))
+        try:
+            for label, use_ws in (('http', False), ('websocket', True)):
+                room = ng.create_pong_room('left', server)
+                ng.join_pong_room(room['room_id'], 'right', server)
+                transport = ng.PongTransport(room['room_id'], 'left', server, use_websocket=use_ws)
+                assert transport.mode == label, f'expected {label}, got {transport.mode}'
+                time.sleep(0.2)
+                HTTP_CALLS[0] = 0
+                start = time.perf_counter()
+                latencies = measure(transport, args.samples)
+                report(label, latencies, HTTP_CALLS[0], time.perf_counter() - start)
+                transport.close()
+                ng.forfeit_pong(room['room_id'], 'left', server)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == '__main__':
+    main()
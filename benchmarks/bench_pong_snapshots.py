@@ -0,0 +1,64 @@
+"""Bytes on the wire per Pong match: full state vs snapshot deltas.
+
+Plays one seeded match to WIN_SCORE with scripted paddles and, for every
+tick, encodes what the WebSocket would push to each player: the full JSON
+view, a JSON delta and a binary delta. Reports bytes/second per match.
+
+    python benchmarks/bench_pong_snapshots.py --seed 7
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import main as srv  # noqa: E402
+
+
+def steer(room, ball_y: float, paddle: float, lag: int) -> Optional[str]:
+    """Chase the ball, but only re-aim every ``lag`` ticks."""
+    if room.tick % lag:
+        return None
+    centre = paddle + room.paddle_size / 2
+    if ball_y < centre - 1:
+        return 'up'
+    if ball_y > centre + 1:
+        return 'down'
+    return 'stop'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    srv.pong_engine.stop()
+    room = srv.PongRoom(room_id='bench', player_left='Alice', player_right='Bob', seed=args.seed)
+    srv._reset_pong_room(room)
+    logs = {'left': srv.PongSnapshotLog(), 'right': srv.PongSnapshotLog()}
+    sent = {'full': 0, 'json': 0, 'binary': 0}
+    while room.status == 'playing':
+        for side, lag in (('left', 3), ('right', 9)):
+            paddle = room.paddle_left if side == 'left' else room.paddle_right
+            direction = steer(room, room.ball_y, paddle, lag)
+            if direction:
+                srv._set_pong_paddle(room, side, direction)
+        srv._tick_pong(room)
+        for side, log in logs.items():
+            sent['full'] += len(json.dumps(srv._pong_view(room, side)))
+            seq, base, changes = log.delta(srv._pong_snapshot(room, side), log.seq)
+            sent['json'] += len(srv._encode_pong_delta(seq, base, changes, 'json'))
+            sent['binary'] += len(srv._encode_pong_delta(seq, base, changes, 'binary'))
+
+    seconds = room.tick * srv.PONG_TICK
+    print(f"match            {room.score_left}-{room.score_right} in {room.tick} ticks ({seconds:.1f}s)")
+    for name, label in (('full', 'full JSON'), ('json', 'JSON delta'), ('binary', 'binary delta')):
+        rate = sent[name] / seconds
+        print(f"{label:<16} {rate:8.0f} B/s per match  ({sent[name] / sent['full']:.0%} of full)")
+
+
+if __name__ == '__main__':
+    main()
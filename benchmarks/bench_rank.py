@@ -0,0 +1,78 @@
+"""Benchmark /api/rank against a million synthetic player bests.
+
+Compares the in-memory RankIndex with the naive SQL answer
+(``COUNT(*) WHERE best_score > ?``) and times score updates.
+
+    python benchmarks/bench_rank.py --players 1000000 --lookups 2000 --sql-lookups 100
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import main as srv  # noqa: E402
+
+
+def populate(players: int, seed: int) -> None:
+    rng = random.Random(seed)
+    conn = srv.get_db()
+    now = time.time()
+    with conn:
+        conn.executemany(
+            "INSERT INTO player_best (game_name, player_name, best_score, achieved_at) VALUES (?, ?, ?, ?)",
+            (('snake', f'p{i}', int(rng.paretovariate(1.5) * 100), now) for i in range(players)),
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS bench_best ON player_best (game_name, best_score)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--sql-lookups', type=int, default=100, help='the SQL baseline is slow; sample fewer')
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        srv.DB_PATH = os.path.join(tmp, 'rank.db')
+        populate(args.players, seed=0)
+        names = [f'p{rng.randrange(args.players)}' for _ in range(args.lookups)]
+
+        start = time.perf_counter()
+        srv.player_rank(player_name='p0', game_name='snake')
+        print(f"index load       {time.perf_counter() - start:8.2f} s for {args.players} players")
+
+        start = time.perf_counter()
+        for name in names:
+            srv.player_rank(player_name=name, game_name='snake')
+        elapsed = time.perf_counter() - start
+        print(f"index lookup     {elapsed / len(names) * 1e6:8.1f} us/op")
+
+        conn = srv.get_db()
+        sql_names = names[:args.sql_lookups]
+        start = time.perf_counter()
+        for name in sql_names:
+            best = conn.execute(
+                "SELECT best_score FROM player_best WHERE game_name = 'snake' AND player_name = ?", (name,)
+            ).fetchone()[0]
+            conn.execute(
+                "SELECT COUNT(*) FROM player_best WHERE game_name = 'snake' AND best_score > ?", (best,)
+            ).fetchone()
+        sql_elapsed = time.perf_counter() - start
+        print(f"sql count lookup {sql_elapsed / len(sql_names) * 1e6:8.1f} us/op")
+
+        updates = [{'game_name': 'snake', 'player_name': name, 'score': rng.randrange(10 ** 6)} for name in names]
+        start = time.perf_counter()
+        srv.rank_index.apply(updates)
+        elapsed = time.perf_counter() - start
+        print(f"index update     {elapsed / len(updates) * 1e6:8.1f} us/op")
+        srv.close_pools()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Rate limiting and GET coalescing under abusive load.
+
+Launches the server under uvicorn on a free local port, once without
+protection and once with it. Abusive clients spam ``/api/scores`` and
+poll ``/api/pong/state`` as fast as they can while one well-behaved
+client reads the leaderboard. Reports how many writes reached SQLite and
+what latency the well-behaved client saw. A second phase sends many
+concurrent identical leaderboard GETs, with and without coalescing.
+
+    python benchmarks/bench_rate_limit.py --abusers 16 --seconds 5
+"""
+
+import argparse
+import http.client
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, db_path: str, **env_vars) -> subprocess.Popen:
+    env = dict(os.environ, LEADERBOARD_DB=db_path, RATE_LIMIT_TRUST_PROXY='1', **env_vars)
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=os.path.join(ROOT, 'server'), env=env,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit('server did not start')
+
+
+def cpu_seconds(pid: int):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+class Client:
+    """Keep-alive HTTP client posing as one address via X-Forwarded-For."""
+
+    def __init__(self, port: int, ip: str) -> None:
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.headers = {'X-Forwarded-For': ip, 'Content-Type': 'application/json'}
+
+    def request(self, method: str, path: str, body=None) -> int:
+        self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=self.headers)
+        resp = self.conn.getresponse()
+        resp.read()
+        return resp.status
+
+    def metrics(self) -> str:
+        self.conn.request('GET', '/metrics', headers=self.headers)
+        return self.conn.getresponse().read().decode()
+
+
+def metric_sum(text: str, name: str) -> float:
+    return sum(float(m.group(1)) for m in re.finditer(rf'^{name}(?:{{[^}}]*}})? (\S+)$', text, re.M))
+
+
+def abuse_phase(port: int, pid: int, abusers: int, seconds: float) -> None:
+    setup = Client(port, '10.0.0.1')
+    setup.conn.request('POST', '/api/pong/create_room?player_name=left', headers=setup.headers)
+    room_id = json.loads(setup.conn.getresponse().read())['room_id']
+    setup.request('POST', f'/api/pong/join_room?room_id={room_id}&player_name=right')
+    stop = time.perf_counter() + seconds
+    codes = {}
+    lock = threading.Lock()
+    latencies = []
+    good_codes = []
+
+    def abuse(i: int) -> None:
+        client = Client(port, f'10.1.{i // 250}.{i % 250}')
+        seen = {}
+        n = 0
+        while time.perf_counter() < stop:
+            if n % 2:
+                status = client.request('POST', '/api/scores',
+                                        {'player_name': f'bot{i}', 'game_name': 'snake', 'score': n})
+            else:
+                status = client.request('GET', f'/api/pong/state?room_id={room_id}&player_name=left')
+            seen[status] = seen.get(status, 0) + 1
+            n += 1
+        with lock:
+            for status, count in seen.items():
+                codes[status] = codes.get(status, 0) + count
+
+    def behave() -> None:
+        client = Client(port, '10.9.9.9')
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            good_codes.append(client.request('GET', '/api/leaderboard?game_name=snake&limit=10'))
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.05)
+
+    before = setup.metrics()
+    cpu = cpu_seconds(pid)
+    threads = [threading.Thread(target=abuse, args=(i,)) for i in range(abusers)] + [threading.Thread(target=behave)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    after = setup.metrics()
+    cpu = None if cpu is None else cpu_seconds(pid) - cpu
+    writes = (metric_sum(after, 'arcade_sqlite_query_duration_seconds_count{query="SQL_INSERT_SCORE"}')
+              - metric_sum(before, 'arcade_sqlite_query_duration_seconds_count{query="SQL_INSERT_SCORE"}'))
+    total = sum(codes.values())
+    ordered = sorted(latencies)
+    print(f'  abusers {total / seconds:8.0f} req/s   200: {codes.get(200, 0) / seconds:7.0f}/s   '
+          f'429: {codes.get(429, 0) / seconds:7.0f}/s   score inserts {writes / seconds:6.0f}/s')
+    print(f'  good client p50 {statistics.median(ordered):6.1f} ms   p99 {ordered[int(len(ordered) * 0.99)]:6.1f} ms   '
+          f'ok {good_codes.count(200)}/{len(good_codes)}'
+          + (f'   server CPU {cpu / seconds * 100:4.0f}%' if cpu is not None else ''))
+
+
+def coalesce_phase(port: int, readers: int, seconds: float) -> None:
+    stop = time.perf_counter() + seconds
+    counts = []
+
+    def read(i: int) -> None:
+        client = Client(port, f'10.2.{i // 250}.{i % 250}')
+        n = 0
+        while time.perf_counter() < stop:
+            client.request('GET', '/api/leaderboard?game_name=snake&limit=100')
+            n += 1
+        counts.append(n)
+
+    before = Client(port, '10.0.0.2').metrics()
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    coalesced = (metric_sum(Client(port, '10.0.0.2').metrics(), 'arcade_coalesced_requests_total')
+                 - metric_sum(before, 'arcade_coalesced_requests_total'))
+    total = sum(counts)
+    print(f'  {readers} readers  {total / seconds:8.0f} req/s   coalesced {coalesced / max(1, total) * 100:5.1f}%')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--abusers', type=int, default=16)
+    parser.add_argument('--readers', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, env in (('unprotected', {'RATE_LIMIT': '0', 'COALESCE': '0'}),
+                           ('protected', {'RATE_LIMIT': '1', 'COALESCE': '1'})):
+            port = free_port()
+            proc = start_server(port, os.path.join(tmp, f'{label}.db'), **env)
+            try:
+                print(label)
+                abuse_phase(port, proc.pid, args.abusers, args.seconds)
+                coalesce_phase(port, args.readers, args.seconds)
+            finally:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Load benchmark for the leaderboard server's SQLite layer.
+
+Drives a mixed score-submit / leaderboard / my_best workload through the
+FastAPI app from several threads and reports requests/sec, first with the
+legacy connect-per-request ``get_db`` and then with the connection pool.
+
+    python benchmarks/bench_server_db.py --threads 8 --requests 2000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+import main as srv  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+GAMES = ['snake', 'tetris', 'pacman', 'breakout']
+
+
+def legacy_get_db() -> sqlite3.Connection:
+    """The pre-pool behaviour: fresh connection plus DDL on every call."""
+    conn = sqlite3.connect(srv.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_name TEXT NOT NULL,
+            game_name TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            difficulty TEXT DEFAULT 'normal',
+            submitted_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_game ON scores (game_name, score DESC)")
+    conn.commit()
+    return conn
+
+
+def _worker(n: int, seed: int) -> int:
+    rng = random.Random(seed)
+    client = TestClient(srv.app)
+    errors = 0
+    for _ in range(n):
+        roll = rng.random()
+        game = rng.choice(GAMES)
+        if roll < 0.4:
+            r = client.post('/api/scores', json={
+                'player_name': f'p{rng.randrange(500)}', 'game_name': game,
+                'score': rng.randrange(100000),
+            })
+        elif roll < 0.8:
+            r = client.get(f'/api/leaderboard?game_name={game}&limit=10')
+        else:
+            r = client.get(f'/api/my_best?player_name=p{rng.randrange(500)}&game_name={game}')
+        if r.status_code != 200:
+            errors += 1
+    return errors
+
+
+def run(label: str, threads: int, requests: int) -> float:
+    per_thread = requests // threads
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        errors = sum(pool.map(_worker, [per_thread] * threads, range(threads)))
+    elapsed = time.perf_counter() - start
+    rps = per_thread * threads / elapsed
+    print(f"{label:<8} {rps:10.1f} req/s  ({elapsed:.2f}s, {errors} errors)")
+    return rps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    # Every worker is one in-process client; measure the database, not the limiter.
+    srv.rate_limiter.enabled = False
+    with tempfile.TemporaryDirectory() as tmp:
+        pooled_get_db = srv.get_db
+
+        srv.DB_PATH = os.path.join(tmp, 'before.db')
+        srv.get_db = legacy_get_db
+        before = run('before', args.threads, args.requests)
+
+        srv.DB_PATH = os.path.join(tmp, 'after.db')
+        srv.get_db = pooled_get_db
+        after = run('after', args.threads, args.requests)
+        srv.close_pools()
+
+    print(f"speedup  {after / before:10.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""Spectator fan-out: many watchers on one live room, over server-sent events.
+
+Launches the server under uvicorn on a free local port and opens
+``--spectators`` SSE streams on one room. For chess it then plays moves
+and times how long each move takes to reach every spectator; for Pong it
+counts the frames delivered per second. Server CPU is read from /proc.
+
+    python benchmarks/bench_spectators.py --spectators 1000 --moves 20
+    python benchmarks/bench_spectators.py --game pong --seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+MOVES = ['e2e4', 'e7e5', 'g1f3', 'b8c6', 'f1b5', 'a7a6', 'b5a4', 'g8f6', 'e1g1', 'f8e7',
+         'f1e1', 'b7b5', 'a4b3', 'd7d6', 'c2c3', 'e8g8', 'h2h3', 'c6b8', 'd2d4', 'b8d7']
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, db_path: str) -> subprocess.Popen:
+    env = dict(os.environ, LEADERBOARD_DB=db_path)
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning',
+         '--backlog', '4096'],
+        cwd=os.path.join(ROOT, 'server'), env=env,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit('server did not start')
+
+
+def cpu_seconds(pid: int):
+    """User + system CPU time of ``pid``, or None where /proc is missing."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def post(server: str, path: str) -> dict:
+    req = urllib.request.Request(server + path, method='POST')
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())
+
+
+class Spectator:
+    """A raw-socket SSE reader that timestamps each event.
+
+    Events are kept as raw bytes and parsed after the run, so the client
+    spends as little CPU as possible while the server is being measured.
+    """
+
+    def __init__(self) -> None:
+        self.raw = []  # (perf_counter, b'{...}')
+
+    @property
+    def events(self) -> list:
+        return [(at, json.loads(data)) for at, data in self.raw]
+
+    async def run(self, port: int, path: str, ready: asyncio.Event, count: list, total: int) -> None:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode())
+        await writer.drain()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.startswith(b'data: '):
+                    self.raw.append((time.perf_counter(), line[6:]))
+                    if len(self.raw) == 1:
+                        count[0] += 1
+                        if count[0] == total:
+                            ready.set()
+        finally:
+            writer.close()
+
+
+async def watch(port: int, path: str, spectators: int, play) -> list:
+    ready = asyncio.Event()
+    count = [0]
+    watchers = [Spectator() for _ in range(spectators)]
+    tasks = [asyncio.ensure_future(w.run(port, path, ready, count, spectators)) for w in watchers]
+    await asyncio.wait_for(ready.wait(), 60)
+    client_cpu = time.process_time()
+    await play()
+    print(f'client CPU during run {time.process_time() - client_cpu:.2f} s')
+    await asyncio.wait(tasks, timeout=30)
+    for task in tasks:
+        task.cancel()
+    return watchers
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def bench_chess(server: str, port: int, pid: int, spectators: int, moves: int) -> None:
+    room_id = post(server, '/api/chess/create_room?player_name=white')['room_id']
+    post(server, f'/api/chess/join_room?room_id={room_id}&player_name=black')
+    sent = []
+    cpu = []
+
+    async def play() -> None:
+        loop = asyncio.get_running_loop()
+        cpu.append(cpu_seconds(pid))
+        for i, move in enumerate(MOVES[:moves]):
+            player = 'white' if i % 2 == 0 else 'black'
+            sent.append(time.perf_counter())
+            await loop.run_in_executor(None, post, server,
+                                       f'/api/chess/move?room_id={room_id}&player_name={player}&move={move}')
+            await asyncio.sleep(0.05)
+        await loop.run_in_executor(None, post, server, f'/api/chess/resign?room_id={room_id}&player_name=white')
+        await asyncio.sleep(0.5)
+        cpu.append(cpu_seconds(pid))
+
+    watchers = asyncio.run(watch(port, f'/api/chess/spectate?room_id={room_id}', spectators, play))
+    latencies = []
+    missed = 0
+    for w in watchers:
+        seen = {len(state['moves']): at for at, state in w.events}
+        for n, start in enumerate(sent, 1):
+            if n in seen:
+                latencies.append((seen[n] - start) * 1000)
+            else:
+                missed += 1
+    print(f'chess  spectators={spectators}  moves={len(sent)}  deliveries={len(latencies)}  missed={missed}')
+    print(f'       latency p50 {percentile(latencies, 0.5):6.1f} ms   p99 {percentile(latencies, 0.99):6.1f} ms   '
+          f'max {max(latencies):6.1f} ms')
+    if None not in cpu:
+        print(f'       server CPU {(cpu[1] - cpu[0]) * 1000 / len(sent):6.1f} ms per move '
+              f'({(cpu[1] - cpu[0]) * 1e6 / max(1, len(latencies)):5.1f} us per delivery)')
+
+
+def bench_pong(server: str, port: int, pid: int, spectators: int, seconds: float) -> None:
+    room_id = post(server, '/api/pong/create_room?player_name=left')['room_id']
+    post(server, f'/api/pong/join_room?room_id={room_id}&player_name=right')
+    window = []
+    cpu = []
+
+    async def play() -> None:
+        cpu.append(cpu_seconds(pid))
+        window.append(time.perf_counter())
+        await asyncio.sleep(seconds)
+        window.append(time.perf_counter())
+        cpu.append(cpu_seconds(pid))
+        await asyncio.get_running_loop().run_in_executor(
+            None, post, server, f'/api/pong/forfeit?room_id={room_id}&player_name=left')
+
+    watchers = asyncio.run(watch(port, f'/api/pong/spectate?room_id={room_id}', spectators, play))
+    start, end = window
+    frames = [sum(start <= at < end for at, _ in w.raw) for w in watchers]
+    rate = sum(frames) / (end - start)
+    print(f'pong   spectators={spectators}  frames/s per spectator '
+          f'min {min(frames) / (end - start):5.1f}  mean {rate / spectators:5.1f}  (tick rate {1 / 0.033:.1f})')
+    if None not in cpu:
+        busy = cpu[1] - cpu[0]
+        print(f'       server CPU {busy / (end - start) * 100:5.1f}%   {busy * 1e6 / max(1, sum(frames)):5.1f} us per frame')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--game', choices=('chess', 'pong'), default='chess')
+    parser.add_argument('--spectators', type=int, default=1000)
+    parser.add_argument('--moves', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Each spectator is a socket on both ends; the server inherits this limit.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = min(hard, max(soft, 2 * args.spectators + 256))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+
+    port = free_port()
+    server = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = start_server(port, os.path.join(tmp, 'bench.db'))
+        try:
+            if args.game == 'chess':
+                bench_chess(server, port, proc.pid, args.spectators, min(args.moves, len(MOVES)))
+            else:
+                bench_pong(server, port, proc.pid, args.spectators, args.seconds)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Player database startup and profile load on a long play history.
+
+Builds an unversioned player database the way clients before the migration
+runner left it (no indexes, no rollup, rollback journal) holding
+``--sessions`` play sessions over 40 games, then times:
+
+    old profile    the per-game COUNT/SUM queries over play_sessions it used to run
+    first start    StatsManager() migrating it: indexes, rollup backfill, WAL
+    warm start     StatsManager() on the migrated database (median of --starts)
+    new profile    get_stats(), one query over the profile tables and the rollup
+    sessions/s     record_session on a rollback journal with synchronous=FULL vs WAL with NORMAL
+
+    python benchmarks/bench_stats_startup.py --sessions 500000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'terminal_games'))
+
+import stats_manager  # noqa: E402
+from stats_manager import StatsManager  # noqa: E402
+
+GAMES = [f'game_{i}' for i in range(40)]
+
+
+def build_legacy(path: str, sessions: int, seed: int) -> None:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    # The tables as CREATE TABLE IF NOT EXISTS made them, before any migration.
+    for statements in stats_manager.MIGRATIONS[:2]:
+        for sql in statements:
+            conn.execute(sql)
+    now = time.time()
+    conn.executemany(
+        "INSERT INTO play_sessions (game_name, score, xp_earned, duration_seconds, difficulty, played_at) "
+        "VALUES (?, ?, ?, ?, 'normal', ?)",
+        ((rng.choice(GAMES), rng.randrange(10_000), rng.randrange(100), rng.uniform(10, 600),
+          now - rng.uniform(0, 365 * 86400)) for _ in range(sessions)),
+    )
+    conn.executemany(
+        "INSERT INTO games (game_name, stat_key, stat_value, updated_at) VALUES (?, 'high_score', ?, ?)",
+        ((g, rng.randrange(10_000), now) for g in GAMES),
+    )
+    conn.commit()
+    conn.close()
+
+
+def old_profile(path: str) -> float:
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    for game in GAMES:
+        conn.execute("SELECT stat_value FROM games WHERE game_name = ? AND stat_key = 'high_score'", (game,))
+        conn.execute("SELECT COUNT(*) FROM play_sessions WHERE game_name = ?", (game,)).fetchone()
+        conn.execute("SELECT COALESCE(SUM(duration_seconds), 0) FROM play_sessions WHERE game_name = ?",
+                     (game,)).fetchone()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def open_manager() -> tuple:
+    start = time.perf_counter()
+    manager = StatsManager()
+    return manager, time.perf_counter() - start
+
+
+def sessions_per_second(manager: StatsManager, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        manager.record_session(GAMES[i % len(GAMES)], i, 1, 30.0)
+    return n / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=200_000)
+    parser.add_argument('--starts', type=int, default=20)
+    parser.add_argument('--writes', type=int, default=300, help='record_session calls per journal mode')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--dir', help='directory for the player database (default: system temp)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        StatsManager.DB_PATH = os.path.join(tmp, 'player.db')
+        build_legacy(StatsManager.DB_PATH, args.sessions, args.seed)
+        size_mb = os.path.getsize(StatsManager.DB_PATH) / 1e6
+        print(f'{args.sessions:,} sessions, {size_mb:.1f} MB, schema version 0 -> {stats_manager.SCHEMA_VERSION}')
+
+        print(f'old profile    {old_profile(StatsManager.DB_PATH) * 1000:9.2f} ms')
+        manager, first = open_manager()
+        manager.conn.close()
+        print(f'first start    {first * 1000:9.2f} ms')
+
+        warm = []
+        for _ in range(args.starts):
+            manager, elapsed = open_manager()
+            warm.append(elapsed)
+            manager.conn.close()
+        print(f'warm start     {statistics.median(warm) * 1000:9.2f} ms')
+
+        manager, _ = open_manager()
+        profile = []
+        for _ in range(args.starts):
+            start = time.perf_counter()
+            manager.get_stats()
+            profile.append(time.perf_counter() - start)
+        print(f'new profile    {statistics.median(profile) * 1000:9.2f} ms')
+
+        manager.conn.execute("PRAGMA journal_mode = DELETE")
+        manager.conn.execute("PRAGMA synchronous = FULL")
+        before = sessions_per_second(manager, args.writes)
+        manager.conn.execute("PRAGMA journal_mode = WAL")
+        manager.conn.execute("PRAGMA synchronous = NORMAL")
+        after = sessions_per_second(manager, args.writes)
+        print(f'sessions/s     {before:9,.0f} rollback journal, {after:,.0f} WAL')
+        manager.conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""XP awards per second: committed per award vs written behind.
+
+Builds a player database in a temporary directory (``--dir`` to put it on
+the disk you care about, since the cost is mostly fsync) and times
+``--awards`` calls of:
+
+    per-award     the old StatsManager.add_xp: two SELECTs and two committed writes
+    write-behind  StatsManager.add_xp now: held in memory, flushed once at the end
+
+    python benchmarks/bench_stats_xp.py --awards 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'terminal_games'))
+
+import stats_manager  # noqa: E402
+from stats_manager import StatsManager  # noqa: E402
+
+
+def per_award_add_xp(manager: StatsManager, amount: int) -> int:
+    """StatsManager.add_xp as it was before write-behind."""
+    current = manager._read_profile_int('total_xp', 0) + amount
+    manager._write_profile_int('total_xp', current)
+    manager._read_profile_int('level', 1)
+    new_level = 1 + current // 500
+    manager._write_profile_int('level', new_level)
+    return new_level
+
+
+def run(label: str, manager: StatsManager, award, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        award(10)
+    manager.flush()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<13} {n / elapsed:>10,.0f} awards/s   ({elapsed * 1e6 / n:7.1f} us each)')
+    return n / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--awards', type=int, default=5000)
+    parser.add_argument('--dir', help='directory for the player database (default: system temp)')
+    args = parser.parse_args()
+
+    stats_manager.XP_FLUSH_SECONDS = 3600  # keep the timed loop free of background flushes
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        StatsManager.DB_PATH = os.path.join(tmp, 'player.db')
+        manager = StatsManager()
+        before = run('per-award', manager, lambda amount: per_award_add_xp(manager, amount), args.awards)
+        after = run('write-behind', manager, manager.add_xp, args.awards)
+        print(f'speed-up x{after / before:,.0f}; total XP {manager.get_level_and_xp()[1]:,}')
+        manager.conn.close()
+
+
+if __name__ == '__main__':
+    main()
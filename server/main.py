@@ -1,42 +1,701 @@
 """Retro Arcade Online Leaderboard + Chess + Pong Multiplayer API."""
 
+import asyncio
+import base64
+import bisect
+import calendar
+import concurrent.futures
+import itertools
 import json
+import logging
+import math
+import os
+import queue
 import random
 import secrets
 import sqlite3
+import struct
+import sys
 import threading
 import time
-from dataclasses import dataclass, field
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs
 
-from fastapi import FastAPI, HTTPException, Query
+import anyio
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+try:
+    import chess
+    CHESS_AVAILABLE = True
+except ImportError:
+    chess = None
+    CHESS_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Retro Arcade", version="1.0.0")
 
-DB_PATH = str(Path(__file__).parent / "leaderboard.db")
+DB_PATH = os.environ.get("LEADERBOARD_DB", str(Path(__file__).parent / "leaderboard.db"))
+
+
+# ── Metrics ──────────────────────────────────────────────────────────
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape_label(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per label set, in the Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[tuple, float] = {} if labels else {(): 0.0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            lines.append(f"{self.name}{_labels(self.labels, values)} {total:g}")
+        return lines
+
+
+class Histogram:
+    """Bucketed observations per label set; ``observe`` is a bisect and a locked add."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...],
+                 labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.labels = labels
+        # label values -> [count per bucket..., count above the last bucket, sum]
+        self._series: Dict[tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._series.items())
+        for values, series in items:
+            running = 0
+            for bound, hits in zip(self.buckets, series):
+                running += hits
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {running}")
+            running += series[-2]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {running}")
+        return lines
+
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+TICK_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25)
+
+HTTP_LATENCY = Histogram(
+    "arcade_http_request_duration_seconds",
+    "Time from request to response headers, by route template.",
+    LATENCY_BUCKETS, ("method", "route"),
+)
+HTTP_REQUESTS = Counter("arcade_http_requests_total", "HTTP responses by route and status.",
+                        ("method", "route", "status"))
+SQL_LATENCY = Histogram(
+    "arcade_sqlite_query_duration_seconds",
+    "SQLite execute and commit time, by statement constant.",
+    SQL_BUCKETS, ("query",),
+)
+PONG_TICK_DURATION = Histogram("arcade_pong_tick_duration_seconds",
+                               "Time to step one Pong shard once.", TICK_BUCKETS)
+PONG_TICK_LAG = Histogram("arcade_pong_tick_lag_seconds",
+                          "How late a Pong shard pass started against its schedule.", TICK_BUCKETS)
+PONG_TICKS = Counter("arcade_pong_room_ticks_total", "Room simulation steps run.")
+
+
+# SQL text -> name of the module constant holding it, filled on first use.
+_SQL_NAMES: Dict[str, str] = {}
+
+
+def _sql_name(sql: str) -> str:
+    if not _SQL_NAMES:
+        _SQL_NAMES.update({v: k for k, v in globals().items() if k.startswith("SQL_") and isinstance(v, str)})
+    return _SQL_NAMES.get(sql, "other")
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that records statement and commit times in ``SQL_LATENCY``.
+
+    Statements are labelled with their ``SQL_*`` constant name. Only the
+    execute step is timed, so rows fetched afterwards are not included.
+    """
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            SQL_LATENCY.observe(time.perf_counter() - start, _sql_name(sql))
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            SQL_LATENCY.observe(time.perf_counter() - start, _sql_name(sql))
+
+    def __exit__(self, *exc):
+        start = time.perf_counter()
+        try:
+            return super().__exit__(*exc)
+        finally:
+            SQL_LATENCY.observe(time.perf_counter() - start, "commit")
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding ``HTTP_LATENCY`` and ``HTTP_REQUESTS``.
+
+    Requests are labelled by route template, not raw path, so the number
+    of series stays bounded. Streaming responses are timed to their
+    headers.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        done = False
+
+        def record(status: int) -> None:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], path)
+            HTTP_REQUESTS.inc(1.0, scope["method"], path, str(status))
+
+        async def send_timed(message) -> None:
+            nonlocal done
+            if message["type"] == "http.response.start" and not done:
+                done = True
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            if not done:
+                record(500)
+
+
+# ── Rate limiting and coalescing ─────────────────────────────────────
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT", "1") == "1"
+# Behind a reverse proxy every client shares the proxy's address; trust
+# the first X-Forwarded-For entry instead.
+RATE_LIMIT_TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+# (name, path prefix, keyed by "client" or "room", tokens per second, burst).
+# A request spends one token from every rule it matches.
+RATE_LIMIT_RULES = (
+    ("scores", "/api/scores", "client", 5.0, 20.0),
+    ("pong_room", "/api/pong/", "room", 120.0, 240.0),
+    ("chess_room", "/api/chess/", "room", 20.0, 40.0),
+    ("client", "/", "client", 60.0, 120.0),
+)
+# Paths a rule skips. Game polling (Pong state and pipelined paddle sends,
+# chess state and long polls) is bounded per room; charging it to the
+# client address too would starve players who share one NAT address.
+# Everything else, room creation included, still spends the client bucket.
+RATE_LIMIT_EXEMPT: Dict[str, Tuple[str, ...]] = {
+    "client": ("/api/pong/state", "/api/pong/paddle", "/api/chess/game_state", "/api/chess/wait"),
+}
+# Buckets kept before the least recently used are dropped (a dropped
+# bucket simply starts full again).
+RATE_LIMIT_MAX_BUCKETS = 50_000
+COALESCE_ENABLED = os.environ.get("COALESCE", "1") == "1"
+# GET routes whose response depends only on the path, the query string
+# and If-None-Match, so concurrent identical requests can share one.
+COALESCE_PATHS = frozenset({"/api/leaderboard", "/api/leaderboard/page", "/api/rank", "/api/my_best"})
+
+RATE_LIMITED = Counter("arcade_rate_limited_total", "Requests refused with 429, by rule.", ("rule",))
+COALESCED = Counter("arcade_coalesced_requests_total",
+                    "GETs answered with a concurrent identical request's response.", ("route",))
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+
+class RateLimiter:
+    """Token buckets per (rule, client or room), refilled lazily on use."""
+
+    def __init__(self, rules=RATE_LIMIT_RULES, max_buckets: int = RATE_LIMIT_MAX_BUCKETS,
+                 enabled: bool = RATE_LIMIT_ENABLED) -> None:
+        self.rules = rules
+        self.max_buckets = max_buckets
+        self.enabled = enabled
+        # (rule name, key) -> [tokens, last refill]
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def _keys(self, scope) -> List[Tuple[str, str, float, float]]:
+        path = scope["path"]
+        client = None
+        room = None
+        keys = []
+        for name, prefix, by, rate, burst in self.rules:
+            if not path.startswith(prefix) or path.startswith(RATE_LIMIT_EXEMPT.get(name, ())):
+                continue
+            if by == "client":
+                if client is None:
+                    forwarded = _header(scope, b"x-forwarded-for") if RATE_LIMIT_TRUST_PROXY else None
+                    if forwarded:
+                        client = forwarded.split(b",")[0].strip().decode("latin-1")
+                    else:
+                        client = (scope.get("client") or ("unknown",))[0]
+                keys.append((name, client, rate, burst))
+            else:
+                if room is None:
+                    room = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("room_id", [""])[0]
+                if room:
+                    keys.append((name, room, rate, burst))
+        return keys
+
+    def check(self, scope, now: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """Spend a token for this request, or return ``(rule, retry_after)`` if any rule is empty."""
+        if not self.enabled:
+            return None
+        keys = self._keys(scope)
+        if not keys:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            buckets = []
+            for name, key, rate, burst in keys:
+                bucket = self._buckets.get((name, key))
+                if bucket is None:
+                    bucket = self._buckets[(name, key)] = [burst, now]
+                    if len(self._buckets) > self.max_buckets:
+                        self._buckets.popitem(last=False)
+                else:
+                    self._buckets.move_to_end((name, key))
+                    bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                    bucket[1] = now
+                if bucket[0] < 1.0:
+                    return name, (1.0 - bucket[0]) / rate
+                buckets.append(bucket)
+            for bucket in buckets:
+                bucket[0] -= 1.0
+        return None
+
+
+rate_limiter = RateLimiter()
+
+
+class RateLimitMiddleware:
+    """Answer ``429 Too Many Requests`` once a request's token bucket is empty."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limited = rate_limiter.check(scope)
+        if limited is None:
+            await self.app(scope, receive, send)
+            return
+        rule, retry_after = limited
+        RATE_LIMITED.inc(1.0, rule)
+        body = b'{"detail":"Too many requests"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class CoalesceMiddleware:
+    """Share one response among concurrent identical GETs on ``COALESCE_PATHS``.
+
+    The first request runs the handler and buffers its response; requests
+    with the same path, query and If-None-Match that arrive meanwhile wait
+    for it instead of computing their own. Works across event loops.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._in_flight: Dict[tuple, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (not COALESCE_ENABLED or scope["type"] != "http" or scope["method"] != "GET"
+                or scope["path"] not in COALESCE_PATHS):
+            await self.app(scope, receive, send)
+            return
+        key = (scope["path"], scope.get("query_string", b""), _header(scope, b"if-none-match"))
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = concurrent.futures.Future()
+        if not leader:
+            try:
+                messages, route = await asyncio.wrap_future(future)
+            except Exception:
+                await self.app(scope, receive, send)
+                return
+            COALESCED.inc(1.0, scope["path"])
+            if route is not None:
+                scope["route"] = route
+        else:
+            messages = []
+
+            async def capture(message) -> None:
+                messages.append(message)
+
+            try:
+                await self.app(scope, receive, capture)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result((messages, scope.get("route")))
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+        for message in messages:
+            await send(message)
+
+
+app.add_middleware(CoalesceMiddleware)
+app.add_middleware(RateLimitMiddleware)
+# Outermost, so refused and coalesced requests are measured too.
+app.add_middleware(MetricsMiddleware)
+
+
+# ── Database ─────────────────────────────────────────────────────────
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_name TEXT NOT NULL,
+        game_name TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        difficulty TEXT DEFAULT 'normal',
+        submitted_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_scores_game
+    ON scores (game_name, score DESC);
+    CREATE INDEX IF NOT EXISTS idx_scores_score
+    ON scores (score DESC);
+    CREATE INDEX IF NOT EXISTS idx_scores_time
+    ON scores (submitted_at);
+    CREATE TABLE IF NOT EXISTS player_best (
+        game_name TEXT NOT NULL,
+        player_name TEXT NOT NULL,
+        best_score INTEGER NOT NULL,
+        achieved_at REAL NOT NULL,
+        PRIMARY KEY (game_name, player_name)
+    );
+    INSERT INTO player_best (game_name, player_name, best_score, achieved_at)
+    SELECT game_name, player_name, MAX(score), submitted_at FROM scores
+    WHERE NOT EXISTS (SELECT 1 FROM player_best)
+    GROUP BY game_name, player_name;
+    CREATE TABLE IF NOT EXISTS score_rollups (
+        period TEXT NOT NULL,
+        period_start INTEGER NOT NULL,
+        game_name TEXT NOT NULL,
+        player_name TEXT NOT NULL,
+        best_score INTEGER NOT NULL,
+        difficulty TEXT DEFAULT 'normal',
+        achieved_at REAL NOT NULL,
+        PRIMARY KEY (period, period_start, game_name, player_name)
+    );
+    CREATE INDEX IF NOT EXISTS idx_rollups_game
+    ON score_rollups (period, period_start, game_name, best_score DESC);
+    CREATE INDEX IF NOT EXISTS idx_rollups_score
+    ON score_rollups (period, period_start, best_score DESC);
+    CREATE TABLE IF NOT EXISTS chess_games (
+        room_id TEXT PRIMARY KEY,
+        player_white TEXT,
+        player_black TEXT,
+        winner TEXT,
+        moves_json TEXT,
+        created_at REAL,
+        fen TEXT,
+        result TEXT,
+        termination TEXT
+    );
+    CREATE TABLE IF NOT EXISTS rooms (
+        kind TEXT NOT NULL,
+        room_id TEXT NOT NULL,
+        status TEXT NOT NULL,
+        state_json TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (kind, room_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_rooms_status
+    ON rooms (kind, status);
+"""
+
+# Columns added to a table after it first shipped, as (table, column, type).
+# CREATE TABLE IF NOT EXISTS leaves older databases alone, so add them here.
+COLUMN_UPGRADES = (
+    ("chess_games", "fen", "TEXT"),
+    ("chess_games", "result", "TEXT"),
+    ("chess_games", "termination", "TEXT"),
+)
+
+# Seed rollups from existing scores the first time the table appears.
+# Day and week starts are computed in UTC; 1970-01-01 was a Thursday.
+# Periods starting before the parameter are skipped: compaction may have
+# removed some of their raw rows (see _backfill_cutoff).
+ROLLUP_BACKFILL = """
+    INSERT INTO score_rollups
+        (period, period_start, game_name, player_name, best_score, difficulty, achieved_at)
+    SELECT p.period,
+           CASE p.period
+               WHEN 'day' THEN CAST(s.submitted_at / 86400 AS INTEGER) * 86400
+               WHEN 'week' THEN (CAST(s.submitted_at / 86400 AS INTEGER)
+                                 - (CAST(s.submitted_at / 86400 AS INTEGER) + 3) % 7) * 86400
+               ELSE CAST(strftime('%s', s.submitted_at, 'unixepoch', 'start of month') AS INTEGER)
+           END AS start,
+           s.game_name, s.player_name, MAX(s.score), s.difficulty, s.submitted_at
+    FROM scores s, (SELECT 'day' AS period UNION ALL SELECT 'week' UNION ALL SELECT 'month') p
+    WHERE NOT EXISTS (SELECT 1 FROM score_rollups)
+    GROUP BY p.period, start, s.game_name, s.player_name
+    HAVING start >= ?
+"""
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 67108864",
+)
+
+# Size of sqlite3's per-connection prepared statement cache. Every query
+# below is a module-level constant so repeated calls reuse the compiled
+# statement instead of re-parsing the SQL.
+STATEMENT_CACHE_SIZE = 256
+
+
+def _upgrade_columns(conn: sqlite3.Connection) -> None:
+    for table, column, kind in COLUMN_UPGRADES:
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+
+class ConnectionPool:
+    """Per-thread SQLite connections to one database file.
+
+    The schema is applied once, when the first connection is opened.
+    Each worker thread then keeps its own WAL-mode connection for the
+    lifetime of the process, so handlers never pay for a file open or
+    DDL on the request path.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: List[sqlite3.Connection] = []
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=TimedConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                with conn:
+                    _upgrade_columns(conn)
+                    conn.execute(ROLLUP_BACKFILL, (_backfill_cutoff(time.time()),))
+                self._schema_ready = True
+            self._conns.append(conn)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def close_all(self) -> None:
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the pool for the current ``DB_PATH``."""
+    pool = _POOLS.get(DB_PATH)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(DB_PATH)
+            if pool is None:
+                pool = ConnectionPool(DB_PATH)
+                _POOLS[DB_PATH] = pool
+    return pool
 
 
 def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS scores (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            player_name TEXT NOT NULL,
-            game_name TEXT NOT NULL,
-            score INTEGER NOT NULL,
-            difficulty TEXT DEFAULT 'normal',
-            submitted_at REAL NOT NULL
-        )
-    """)
-    conn.execute("""
-        CREATE INDEX IF NOT EXISTS idx_scores_game
-        ON scores (game_name, score DESC)
-    """)
-    conn.commit()
-    return conn
+    """Return the calling thread's pooled connection. Do not close it."""
+    return get_pool().connection()
+
+
+def close_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+SQL_INSERT_SCORE = (
+    "INSERT INTO scores (player_name, game_name, score, difficulty, submitted_at) VALUES (?, ?, ?, ?, ?)"
+)
+SQL_TOP_GAME = (
+    "SELECT id, player_name, game_name, score, difficulty, submitted_at FROM scores "
+    "WHERE game_name = ? ORDER BY score DESC, id LIMIT ?"
+)
+SQL_TOP_ALL = (
+    "SELECT id, player_name, game_name, score, difficulty, submitted_at FROM scores "
+    "ORDER BY score DESC, id LIMIT ?"
+)
+SQL_BEST_GAME = "SELECT MAX(score) as best FROM scores WHERE player_name = ? AND game_name = ?"
+SQL_BEST_ALL = "SELECT MAX(score) as best FROM scores WHERE player_name = ?"
+SQL_PAGE_GAME = (
+    "SELECT id, player_name, game_name, score, difficulty, submitted_at FROM scores "
+    "WHERE game_name = ? AND (score < ? OR (score = ? AND id > ?)) ORDER BY score DESC, id LIMIT ?"
+)
+SQL_PAGE_ALL = (
+    "SELECT id, player_name, game_name, score, difficulty, submitted_at FROM scores "
+    "WHERE score < ? OR (score = ? AND id > ?) ORDER BY score DESC, id LIMIT ?"
+)
+SQL_UPSERT_BEST = (
+    "INSERT INTO player_best (game_name, player_name, best_score, achieved_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (game_name, player_name) DO UPDATE SET "
+    "best_score = excluded.best_score, achieved_at = excluded.achieved_at "
+    "WHERE excluded.best_score > player_best.best_score"
+)
+SQL_UPSERT_ROLLUP = (
+    "INSERT INTO score_rollups "
+    "(period, period_start, game_name, player_name, best_score, difficulty, achieved_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (period, period_start, game_name, player_name) DO UPDATE SET "
+    "best_score = excluded.best_score, difficulty = excluded.difficulty, achieved_at = excluded.achieved_at "
+    "WHERE excluded.best_score > score_rollups.best_score"
+)
+SQL_WINDOW_TOP_GAME = (
+    "SELECT player_name, game_name, best_score AS score, difficulty, achieved_at AS submitted_at "
+    "FROM score_rollups WHERE period = ? AND period_start = ? AND game_name = ? "
+    "ORDER BY best_score DESC, achieved_at LIMIT ?"
+)
+SQL_WINDOW_TOP_ALL = (
+    "SELECT player_name, game_name, best_score AS score, difficulty, achieved_at AS submitted_at "
+    "FROM score_rollups WHERE period = ? AND period_start = ? "
+    "ORDER BY best_score DESC, achieved_at LIMIT ?"
+)
+SQL_GAME_BESTS = "SELECT player_name, best_score FROM player_best WHERE game_name = ?"
+SQL_COMPACT_SCORES = (
+    "DELETE FROM scores WHERE submitted_at < ? AND score < ("
+    "SELECT best_score FROM player_best pb "
+    "WHERE pb.game_name = scores.game_name AND pb.player_name = scores.player_name)"
+)
+SQL_EXPIRE_ROLLUPS = "DELETE FROM score_rollups WHERE period = ? AND period_start < ?"
+SQL_SAVE_CHESS = """
+    INSERT OR REPLACE INTO chess_games
+        (room_id, player_white, player_black, winner, moves_json, created_at, fen, result, termination)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_SAVE_ROOM = (
+    "INSERT OR REPLACE INTO rooms (kind, room_id, status, state_json, updated_at) VALUES (?, ?, ?, ?, ?)"
+)
+SQL_LOAD_ROOM = "SELECT state_json FROM rooms WHERE kind = ? AND room_id = ?"
+SQL_ACTIVE_ROOMS = "SELECT state_json FROM rooms WHERE kind = ? AND status IN ('waiting', 'playing')"
+SQL_DELETE_ROOM = "DELETE FROM rooms WHERE kind = ? AND room_id = ?"
 
 
 class ScoreSubmission(BaseModel):
@@ -54,56 +713,838 @@ class ScoreEntry(BaseModel):
     submitted_at: float
 
 
-@app.on_event("startup")
-def startup() -> None:
-    get_db().close()
+# ── Leaderboard cache ────────────────────────────────────────────────
 
+CACHE_TOP_N = 100
+CACHE_MAX_BOARDS = 256
+# Prefix for ETags so versions from a previous process never collide.
+_ETAG_EPOCH = secrets.token_hex(4)
 
-@app.get("/health")
-def health() -> dict:
-    return {"status": "ok", "timestamp": time.time()}
 
+class _Board:
+    """Top-N entries for one game (or all games), best first."""
 
-@app.post("/api/scores")
-def submit_score(submission: ScoreSubmission) -> dict:
+    __slots__ = ("keys", "entries", "ids", "version")
+
+    def __init__(self, entries: List[dict], version: int) -> None:
+        self.keys = [(-e["score"], e["id"]) for e in entries]
+        self.entries = entries
+        self.ids = {e["id"] for e in entries}
+        self.version = version
+
+
+class LeaderboardCache:
+    """Precomputed top-N boards per game plus a global board.
+
+    Boards are loaded from SQL on first use and then kept current by
+    ``apply``, which only touches a board when a new score makes its cut.
+    A board holding fewer than N rows holds every row for that game, so
+    any new score belongs on it. Each change bumps the board's version,
+    which doubles as its ETag.
+    """
+
+    def __init__(self, size: int = CACHE_TOP_N, max_boards: int = CACHE_MAX_BOARDS) -> None:
+        self.size = size
+        self.max_boards = max_boards
+        self._boards: "OrderedDict[tuple, _Board]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions = itertools.count(1)
+
+    def _load(self, key: tuple) -> _Board:
+        _, game_name = key
+        conn = get_db()
+        if game_name:
+            rows = conn.execute(SQL_TOP_GAME, (game_name, self.size)).fetchall()
+        else:
+            rows = conn.execute(SQL_TOP_ALL, (self.size,)).fetchall()
+        return _Board([dict(r) for r in rows], next(self._versions))
+
+    def get(self, game_name: Optional[str]) -> Tuple[List[dict], int]:
+        """Return (entries, version) for a game, or the global board for None."""
+        key = (DB_PATH, game_name or None)
+        with self._lock:
+            board = self._boards.get(key)
+            if board is None:
+                board = self._load(key)
+                self._boards[key] = board
+                while len(self._boards) > self.max_boards:
+                    self._boards.popitem(last=False)
+            else:
+                self._boards.move_to_end(key)
+            return board.entries, board.version
+
+    def apply(self, entries: List[dict]) -> None:
+        """Fold freshly committed scores into any loaded board they beat."""
+        with self._lock:
+            for entry in entries:
+                for game_name in (entry["game_name"], None):
+                    board = self._boards.get((DB_PATH, game_name))
+                    if board is not None:
+                        self._insert(board, entry)
+
+    def _insert(self, board: _Board, entry: dict) -> None:
+        if entry["id"] in board.ids:
+            return
+        key = (-entry["score"], entry["id"])
+        if len(board.keys) >= self.size and key >= board.keys[-1]:
+            return
+        pos = bisect.bisect_left(board.keys, key)
+        board.keys.insert(pos, key)
+        # Copy-on-write so readers holding the old list stay consistent.
+        entries = list(board.entries)
+        entries.insert(pos, entry)
+        board.ids.add(entry["id"])
+        if len(board.keys) > self.size:
+            board.keys.pop()
+            board.ids.discard(entries.pop()["id"])
+        board.entries = entries
+        board.version = next(self._versions)
+
+    def invalidate(self, game_name: Optional[str] = None) -> None:
+        """Drop a game's board and the global board, or everything if no game is given."""
+        with self._lock:
+            if game_name is None:
+                self._boards.clear()
+                return
+            for key in ((DB_PATH, game_name), (DB_PATH, None)):
+                self._boards.pop(key, None)
+
+
+leaderboard_cache = LeaderboardCache()
+
+
+# ── Player ranks ─────────────────────────────────────────────────────
+
+class RankedList:
+    """Sorted list with O(log n) rank and select.
+
+    Items live in sorted buckets of about ``LOAD`` elements. A Fenwick tree
+    over the bucket lengths turns "how many items sort before x" and "the
+    item at position i" into a bisect over bucket maxima plus a tree walk.
+    """
+
+    LOAD = 512
+
+    def __init__(self, items=()) -> None:
+        ordered = sorted(items)
+        self._buckets = [ordered[i:i + self.LOAD] for i in range(0, len(ordered), self.LOAD)]
+        self._maxes = [b[-1] for b in self._buckets]
+        self._len = len(ordered)
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _rebuild(self) -> None:
+        n = len(self._buckets)
+        tree = [0] * (n + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, index: int, delta: int) -> None:
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, index: int) -> int:
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def add(self, item) -> None:
+        if not self._buckets:
+            self._buckets.append([item])
+            self._maxes.append(item)
+            self._len = 1
+            self._rebuild()
+            return
+        i = min(bisect.bisect_left(self._maxes, item), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        bisect.insort(bucket, item)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * self.LOAD:
+            half = len(bucket) // 2
+            self._buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+            self._rebuild()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, item) -> None:
+        i = bisect.bisect_left(self._maxes, item)
+        if i == len(self._buckets):
+            raise ValueError(f"{item!r} not in list")
+        bucket = self._buckets[i]
+        j = bisect.bisect_left(bucket, item)
+        if j == len(bucket) or bucket[j] != item:
+            raise ValueError(f"{item!r} not in list")
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild()
+
+    def bisect_left(self, item) -> int:
+        """Number of items that sort strictly before ``item``."""
+        i = bisect.bisect_left(self._maxes, item)
+        if i == len(self._buckets):
+            return self._len
+        return self._prefix(i) + bisect.bisect_left(self._buckets[i], item)
+
+    def __getitem__(self, pos: int):
+        if not 0 <= pos < self._len:
+            raise IndexError("RankedList index out of range")
+        n = len(self._buckets)
+        idx = 0
+        step = 1 << (n.bit_length() - 1)
+        while step:
+            nxt = idx + step
+            if nxt <= n and self._tree[nxt] <= pos:
+                idx = nxt
+                pos -= self._tree[nxt]
+            step >>= 1
+        return self._buckets[idx][pos]
+
+
+class _GameRanks:
+    """Every player's best score for one game, ordered best first."""
+
+    __slots__ = ("best", "order")
+
+    def __init__(self, rows: List[tuple]) -> None:
+        self.best: Dict[str, int] = {name: score for name, score in rows}
+        self.order = RankedList((-score, name) for name, score in rows)
+
+    def update(self, player_name: str, score: int) -> None:
+        old = self.best.get(player_name)
+        if old is not None:
+            if score <= old:
+                return
+            self.order.remove((-old, player_name))
+        self.best[player_name] = score
+        self.order.add((-score, player_name))
+
+
+class RankIndex:
+    """Per-game player rankings kept in step with the ``player_best`` table.
+
+    A game's rankings are loaded on first lookup and then updated by the
+    score writer, so a rank query never touches SQLite.
+    """
+
+    def __init__(self) -> None:
+        self._games: Dict[tuple, _GameRanks] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, game_name: str) -> _GameRanks:
+        key = (DB_PATH, game_name)
+        ranks = self._games.get(key)
+        if ranks is None:
+            rows = get_db().execute(SQL_GAME_BESTS, (game_name,)).fetchall()
+            ranks = _GameRanks([(r["player_name"], r["best_score"]) for r in rows])
+            self._games[key] = ranks
+        return ranks
+
+    def lookup(self, game_name: str, player_name: str) -> Optional[dict]:
+        """Return rank, percentile and neighbours for a player, or None if unranked."""
+        with self._lock:
+            ranks = self._get(game_name)
+            best = ranks.best.get(player_name)
+            if best is None:
+                return None
+            order = ranks.order
+            total = len(order)
+            pos = order.bisect_left((-best, player_name))
+            # Players tied on score share the rank of the first of them.
+            rank = order.bisect_left((-best, "")) + 1
+            below = total - order.bisect_left((-best + 1, ""))
+
+            def neighbour(i: int) -> Optional[dict]:
+                if not 0 <= i < total:
+                    return None
+                neg_score, name = order[i]
+                return {"player_name": name, "best": -neg_score,
+                        "rank": order.bisect_left((neg_score, "")) + 1}
+
+            return {
+                "player_name": player_name,
+                "game_name": game_name,
+                "best": best,
+                "rank": rank,
+                "total_players": total,
+                "percentile": round(100.0 * below / total, 2),
+                "above": neighbour(pos - 1),
+                "below": neighbour(pos + 1),
+            }
+
+    def apply(self, entries: List[dict]) -> None:
+        """Fold freshly committed scores into any loaded game."""
+        with self._lock:
+            for entry in entries:
+                ranks = self._games.get((DB_PATH, entry["game_name"]))
+                if ranks is not None:
+                    ranks.update(entry["player_name"], entry["score"])
+
+    def invalidate(self, game_name: Optional[str] = None) -> None:
+        with self._lock:
+            if game_name is None:
+                self._games.clear()
+            else:
+                self._games.pop((DB_PATH, game_name), None)
+
+
+rank_index = RankIndex()
+
+
+# ── Time windows ─────────────────────────────────────────────────────
+
+ROLLUP_PERIODS = ("day", "week", "month")
+# With SCORE_COMPACTION=1, raw score rows older than SCORE_RETENTION_DAYS
+# are folded into the rollups: only each player's best per game survives,
+# which also thins the all-time board, paging and export. Off by default.
+SCORE_COMPACTION = os.environ.get("SCORE_COMPACTION", "0") == "1"
+SCORE_RETENTION_DAYS = int(os.environ.get("SCORE_RETENTION_DAYS", "30"))
+# How many past periods of each rollup to keep.
+ROLLUP_KEEP_PERIODS = {"day": 31, "week": 26, "month": 24}
+COMPACT_INTERVAL = 3600
+
+
+def period_start(period: str, ts: float) -> int:
+    """UTC start of the day, ISO week (Monday) or month containing ``ts``."""
+    t = time.gmtime(ts)
+    if period == "month":
+        return calendar.timegm((t.tm_year, t.tm_mon, 1, 0, 0, 0))
+    day = calendar.timegm((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0))
+    if period == "week":
+        return day - t.tm_wday * 86400
+    return day
+
+
+def _rollup_cutoff(period: str, now: float) -> int:
+    keep = ROLLUP_KEEP_PERIODS[period]
+    if period == "month":
+        t = time.gmtime(now)
+        months = t.tm_year * 12 + t.tm_mon - 1 - keep
+        return calendar.timegm((months // 12, months % 12 + 1, 1, 0, 0, 0))
+    length = 7 * 86400 if period == "week" else 86400
+    return period_start(period, now) - keep * length
+
+
+def _backfill_cutoff(now: float) -> float:
+    """Earliest period start ROLLUP_BACKFILL may rebuild from raw rows."""
+    if SCORE_COMPACTION and SCORE_RETENTION_DAYS > 0:
+        return now - SCORE_RETENTION_DAYS * 86400
+    return float("-inf")
+
+
+def compact_scores(now: Optional[float] = None) -> int:
+    """Expire old rollup periods and, if SCORE_COMPACTION is on, compact raw rows.
+
+    Compaction drops raw rows past retention that are not a player's best.
+    Returns the number of raw score rows removed.
+    """
+    now = time.time() if now is None else now
+    conn = get_db()
+    removed = 0
+    with conn:
+        if SCORE_COMPACTION and SCORE_RETENTION_DAYS > 0:
+            cur = conn.execute(SQL_COMPACT_SCORES, (now - SCORE_RETENTION_DAYS * 86400,))
+            removed = cur.rowcount
+        for period in ROLLUP_PERIODS:
+            conn.execute(SQL_EXPIRE_ROLLUPS, (period, _rollup_cutoff(period, now)))
+    if removed:
+        # Cached all-time boards may still list rows that are now gone.
+        leaderboard_cache.invalidate()
+    return removed
+
+
+def _compact_loop() -> None:
+    while True:
+        time.sleep(COMPACT_INTERVAL)
+        try:
+            compact_scores()
+        except sqlite3.Error as e:
+            logger.error(f"Score compaction failed: {e}")
+
+
+_compact_thread = threading.Thread(target=_compact_loop, daemon=True)
+_compact_thread.start()
+
+
+# ── Score ingestion ──────────────────────────────────────────────────
+
+# Flush a batch once it holds this many rows or its oldest row has waited
+# this long, whichever comes first.
+SCORE_FLUSH_ROWS = int(os.environ.get("SCORE_FLUSH_ROWS", "200"))
+SCORE_FLUSH_MS = int(os.environ.get("SCORE_FLUSH_MS", "20"))
+# "commit": the request returns once its batch is committed (group commit).
+# "buffered": the request returns as soon as it is queued; a crash can lose
+# up to one flush window of scores.
+SCORE_DURABILITY = os.environ.get("SCORE_DURABILITY", "commit")
+SCORE_COMMIT_TIMEOUT = 5.0
+MAX_BULK_SCORES = 500
+
+
+class _ScoreBatch:
+    __slots__ = ("rows", "done", "error")
+
+    def __init__(self, rows: List[tuple]) -> None:
+        self.rows = rows
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+def _write_scores(conn: sqlite3.Connection, rows: List[tuple]) -> List[dict]:
+    """Insert score rows and return them as entries. Caller owns the transaction."""
+    entries = []
+    for row in rows:
+        cur = conn.execute(SQL_INSERT_SCORE, row)
+        player_name, game_name, score, difficulty, submitted_at = row
+        conn.execute(SQL_UPSERT_BEST, (game_name, player_name, score, submitted_at))
+        for period in ROLLUP_PERIODS:
+            conn.execute(SQL_UPSERT_ROLLUP, (period, period_start(period, submitted_at), game_name,
+                                             player_name, score, difficulty, submitted_at))
+        entries.append({
+            "id": cur.lastrowid, "player_name": player_name, "game_name": game_name,
+            "score": score, "difficulty": difficulty, "submitted_at": submitted_at,
+        })
+    return entries
+
+
+class ScoreWriter:
+    """Write-behind queue that groups score inserts into few transactions."""
+
+    def __init__(self, flush_rows: int = SCORE_FLUSH_ROWS, flush_ms: int = SCORE_FLUSH_MS) -> None:
+        self.flush_rows = flush_rows
+        self.flush_ms = flush_ms
+        self._queue: "queue.Queue[Optional[_ScoreBatch]]" = queue.Queue()
+        self._depth = 0
+        self._depth_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def depth(self) -> int:
+        """Number of queued score rows not yet committed."""
+        return self._depth
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="score-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, rows: List[tuple]) -> _ScoreBatch:
+        batch = _ScoreBatch(rows)
+        with self._depth_lock:
+            self._depth += len(rows)
+        self.start()
+        self._queue.put(batch)
+        return batch
+
+    def stop(self) -> None:
+        """Flush everything still queued and stop the writer thread."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=SCORE_COMMIT_TIMEOUT)
+            if thread.is_alive():
+                # Still flushing: draining here too would write the same queue from two threads.
+                logger.error("Score writer did not stop in time; queued scores left to it")
+                return
+        self._thread = None
+        self._drain_now()
+
+    def _drain_now(self) -> None:
+        pending: List[_ScoreBatch] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                pending.append(item)
+        if pending:
+            self._flush(pending)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            pending = [first]
+            count = len(first.rows)
+            deadline = time.monotonic() + self.flush_ms / 1000.0
+            stopping = False
+            while count < self.flush_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                pending.append(item)
+                count += len(item.rows)
+            self._flush(pending)
+            if stopping:
+                return
+
+    def _flush(self, pending: List[_ScoreBatch]) -> None:
+        rows = [row for batch in pending for row in batch.rows]
+        error: Optional[BaseException] = None
+        try:
+            conn = get_db()
+            with conn:
+                entries = _write_scores(conn, rows)
+        except Exception as e:
+            # Anything, not just sqlite3.Error: a dead writer thread would leave every later POST hanging.
+            logger.error(f"Score flush of {len(rows)} rows failed: {e!r}")
+            error = e
+        else:
+            try:
+                leaderboard_cache.apply(entries)
+                rank_index.apply(entries)
+            except Exception as e:
+                # The rows are committed; rebuild the boards from SQL rather than fail the batch.
+                logger.error(f"Leaderboard update after score flush failed: {e!r}")
+                leaderboard_cache.invalidate()
+        with self._depth_lock:
+            self._depth -= len(rows)
+        for batch in pending:
+            batch.error = error
+            batch.done.set()
+
+
+score_writer = ScoreWriter()
+
+
+def _validate_submission(submission: ScoreSubmission) -> tuple:
     if not submission.player_name.strip():
         raise HTTPException(400, "player_name is required")
     if not submission.game_name.strip():
         raise HTTPException(400, "game_name is required")
     if submission.score < 0:
         raise HTTPException(400, "score must be non-negative")
+    return (submission.player_name.strip(), submission.game_name.strip().lower(),
+            submission.score, submission.difficulty, time.time())
 
-    conn = get_db()
-    conn.execute(
-        "INSERT INTO scores (player_name, game_name, score, difficulty, submitted_at) VALUES (?, ?, ?, ?, ?)",
-        (submission.player_name.strip(), submission.game_name.strip().lower(),
-         submission.score, submission.difficulty, time.time())
-    )
-    conn.commit()
-    conn.close()
+
+def _enqueue_scores(rows: List[tuple]) -> None:
+    batch = score_writer.submit(rows)
+    if SCORE_DURABILITY != "commit":
+        return
+    if not batch.done.wait(SCORE_COMMIT_TIMEOUT):
+        raise HTTPException(503, "Score queue is backed up, try again")
+    if batch.error is not None:
+        raise HTTPException(503, "Score could not be saved")
+
+
+@app.on_event("startup")
+def startup() -> None:
+    get_db()
+    score_writer.start()
+    restore_rooms()
+    pong_checkpointer.start()
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    score_writer.stop()
+    pong_checkpointer.stop()
+    close_pools()
+
+
+@app.get("/health")
+def health() -> dict:
+    return {"status": "ok", "timestamp": time.time(), "score_queue_depth": score_writer.depth}
+
+
+def _gauge(name: str, help_text: str, samples: List[Tuple[str, float]], kind: str = "gauge") -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{labels} {value:g}" for labels, value in samples)
+    return lines
+
+
+def render_metrics() -> str:
+    """Every metric in the Prometheus text exposition format.
+
+    Room counts and queue depths are read at scrape time, so they cost
+    nothing between scrapes.
+    """
+    rooms = []
+    for game, registry in (("chess", CHESS_ROOMS), ("pong", PONG_ROOMS)):
+        counts = {"waiting": 0, "playing": 0, "finished": 0}
+        for room in list(registry.values()):
+            counts[room.status] = counts.get(room.status, 0) + 1
+        rooms.extend((f'{{game="{game}",status="{status}"}}', n) for status, n in counts.items())
+    spectators = [
+        (f'{{game="{game}"}}', sum(b.subscribers(key) for key in b.watched()))
+        for game, b in (("chess", chess_spectators), ("pong", pong_spectators))
+    ]
+    lines: List[str] = []
+    lines += _gauge("arcade_rooms", "Rooms held by this process.", rooms)
+    lines += _gauge("arcade_spectators", "Open spectator streams.", spectators)
+    lines += _gauge("arcade_score_queue_depth", "Score rows queued but not yet committed.",
+                    [("", score_writer.depth)])
+    lines += _gauge("arcade_chess_waiters", "Parked /api/chess/wait requests.",
+                    [("", sum(len(r.waiters) for r in list(CHESS_ROOMS.values())))])
+    lines += _gauge("process_cpu_seconds_total", "CPU time used by this process.",
+                    [("", time.process_time())], kind="counter")
+    for metric in (HTTP_LATENCY, HTTP_REQUESTS, RATE_LIMITED, COALESCED, SQL_LATENCY,
+                   PONG_TICK_DURATION, PONG_TICK_LAG, PONG_TICKS):
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ── Profiling ────────────────────────────────────────────────────────
+
+# The /debug/profiler endpoints exist only when this is set.
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "0") == "1"
+PROFILER_INTERVAL = 0.01
+
+
+class SamplingProfiler:
+    """Statistical profiler: reads every thread's Python stack on a timer.
+
+    Costs nothing until started and roughly one stack walk per thread
+    per ``interval`` while running. Counts how often each function is on
+    top of a stack (self) and anywhere in it (total).
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL) -> None:
+        self.interval = interval
+        self.samples = 0
+        self._self: Dict[Tuple[str, int, str], int] = {}
+        self._total: Dict[Tuple[str, int, str], int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.samples = 0
+        self._self = {}
+        self._total = {}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                self.samples += 1
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                self._self[key] = self._self.get(key, 0) + 1
+                seen = set()
+                while frame is not None:
+                    code = frame.f_code
+                    key = (code.co_filename, code.co_firstlineno, code.co_name)
+                    if key not in seen:
+                        seen.add(key)
+                        self._total[key] = self._total.get(key, 0) + 1
+                    frame = frame.f_back
+
+    def report(self, top: int = 25) -> str:
+        """The ``top`` functions by self samples, as a plain-text table."""
+        samples = max(1, self.samples)
+        hot = sorted(self._self.items(), key=lambda item: item[1], reverse=True)[:top]
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms"
+                 f"{' (running)' if self.running else ''}",
+                 f"{'self%':>6} {'total%':>7}  function"]
+        for key, count in hot:
+            filename, line, name = key
+            lines.append(f"{count * 100 / samples:6.1f} {self._total.get(key, 0) * 100 / samples:7.1f}  "
+                         f"{name} ({os.path.basename(filename)}:{line})")
+        return "\n".join(lines) + "\n"
+
+
+profiler = SamplingProfiler()
+
+
+def _require_profiler() -> None:
+    if not PROFILER_ENABLED:
+        raise HTTPException(404, "Not Found")
+
+
+@app.post("/debug/profiler")
+def profiler_toggle(enabled: bool = Query(...)) -> dict:
+    """Start (clearing earlier samples) or stop the sampling profiler."""
+    _require_profiler()
+    if enabled:
+        profiler.start()
+    else:
+        profiler.stop()
+    return {"running": profiler.running, "samples": profiler.samples}
+
+
+@app.get("/debug/profiler")
+def profiler_report(top: int = Query(25, ge=1, le=500)) -> Response:
+    _require_profiler()
+    return Response(profiler.report(top), media_type="text/plain; charset=utf-8")
+
+
+@app.post("/api/scores")
+def submit_score(submission: ScoreSubmission) -> dict:
+    _enqueue_scores([_validate_submission(submission)])
     return {"status": "accepted"}
 
 
+@app.post("/api/scores/bulk")
+def submit_scores_bulk(submissions: List[ScoreSubmission]) -> dict:
+    if len(submissions) > MAX_BULK_SCORES:
+        raise HTTPException(400, f"At most {MAX_BULK_SCORES} scores per request")
+    rows = [_validate_submission(s) for s in submissions]
+    if rows:
+        _enqueue_scores(rows)
+    return {"status": "accepted", "count": len(rows)}
+
+
 @app.get("/api/leaderboard")
 def leaderboard(
+    request: Request,
+    response: Response,
     game_name: Optional[str] = Query(None),
-    limit: int = Query(10, ge=1, le=100),
-) -> List[dict]:
+    limit: int = Query(10, ge=1, le=CACHE_TOP_N),
+    window: str = Query("all", pattern="^(all|day|week|month)$"),
+):
+    game = game_name.strip().lower() if game_name else None
+    if window != "all":
+        return _window_leaderboard(window, game, limit)
+    entries, version = leaderboard_cache.get(game)
+    etag = f'"{_ETAG_EPOCH}-{version}-{limit}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+    result = []
+    for i, entry in enumerate(entries[:limit], 1):
+        row = {k: v for k, v in entry.items() if k != "id"}
+        row["rank"] = i
+        result.append(row)
+    return result
+
+
+# ── Paging ───────────────────────────────────────────────────────────
+
+PAGE_MAX = 500
+EXPORT_CHUNK = 1000
+# Sorts above every real score, so the first page needs no special case.
+_FIRST_KEY = (2 ** 63 - 1, 0, 0)
+
+
+def _encode_cursor(score: int, row_id: int, rank: int) -> str:
+    raw = f"{score}:{row_id}:{rank}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, int, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        score, row_id, rank = (int(part) for part in raw.split(":"))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(400, "Invalid cursor")
+    return score, row_id, rank
+
+
+def _fetch_page(game: Optional[str], after: Tuple[int, int, int], limit: int) -> List[dict]:
+    """Rows strictly after ``after`` in (score DESC, id) order, with ranks."""
+    score, row_id, rank = after
     conn = get_db()
-    if game_name:
-        rows = conn.execute(
-            "SELECT player_name, game_name, score, difficulty, submitted_at FROM scores "
-            "WHERE game_name = ? ORDER BY score DESC LIMIT ?",
-            (game_name.strip().lower(), limit)
-        ).fetchall()
+    if game:
+        rows = conn.execute(SQL_PAGE_GAME, (game, score, score, row_id, limit)).fetchall()
     else:
-        rows = conn.execute(
-            "SELECT player_name, game_name, score, difficulty, submitted_at FROM scores "
-            "ORDER BY score DESC LIMIT ?",
-            (limit,)
-        ).fetchall()
-    conn.close()
+        rows = conn.execute(SQL_PAGE_ALL, (score, score, row_id, limit)).fetchall()
+    result = []
+    for i, row in enumerate(rows, rank + 1):
+        entry = dict(row)
+        entry["rank"] = i
+        result.append(entry)
+    return result
+
 
+@app.get("/api/leaderboard/page")
+def leaderboard_page(
+    game_name: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=PAGE_MAX),
+    cursor: Optional[str] = Query(None),
+) -> dict:
+    """One page of the all-time board; pass ``next_cursor`` back to get the next."""
+    game = game_name.strip().lower() if game_name else None
+    after = _decode_cursor(cursor) if cursor else _FIRST_KEY
+    entries = _fetch_page(game, after, limit)
+    next_cursor = None
+    if len(entries) == limit:
+        last = entries[-1]
+        next_cursor = _encode_cursor(last["score"], last["id"], last["rank"])
+    for entry in entries:
+        del entry["id"]
+    return {"entries": entries, "next_cursor": next_cursor}
+
+
+@app.get("/api/leaderboard/export")
+def leaderboard_export(game_name: Optional[str] = Query(None)) -> StreamingResponse:
+    """Stream the whole board as NDJSON, one keyset page at a time."""
+    game = game_name.strip().lower() if game_name else None
+
+    def generate():
+        after = _FIRST_KEY
+        while True:
+            entries = _fetch_page(game, after, EXPORT_CHUNK)
+            if not entries:
+                return
+            last = entries[-1]
+            after = (last["score"], last["id"], last["rank"])
+            yield "".join(
+                json.dumps({k: v for k, v in e.items() if k != "id"}) + "\n" for e in entries
+            )
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+def _window_leaderboard(window: str, game: Optional[str], limit: int) -> List[dict]:
+    """Best score per player in the current day/week/month, from the rollups."""
+    start = period_start(window, time.time())
+    conn = get_db()
+    if game:
+        rows = conn.execute(SQL_WINDOW_TOP_GAME, (window, start, game, limit)).fetchall()
+    else:
+        rows = conn.execute(SQL_WINDOW_TOP_ALL, (window, start, limit)).fetchall()
     result = []
     for i, row in enumerate(rows, 1):
         entry = dict(row)
@@ -112,6 +1553,288 @@ def leaderboard(
     return result
 
 
+# ── Room store ───────────────────────────────────────────────────────
+
+# Which store keeps live chess and Pong rooms: "sqlite" (survives a
+# restart) or "memory" (process-local, as before).
+ROOM_STORE = os.environ.get("ROOM_STORE", "sqlite")
+# Multi-process deployments run WORKER_COUNT server processes, each with
+# its own WORKER_INDEX, behind a proxy that routes on the room_id query
+# parameter with the same hash (see README). A worker mints room ids in
+# its own shard and restores only its own shard's rooms at startup.
+WORKER_COUNT = max(1, int(os.environ.get("WORKER_COUNT", "1")))
+WORKER_INDEX = int(os.environ.get("WORKER_INDEX", "0"))
+
+
+def room_shard(room_id: str, workers: Optional[int] = None) -> int:
+    """The worker that owns ``room_id``."""
+    return zlib.crc32(room_id.encode()) % (workers or WORKER_COUNT)
+
+
+def _new_room_id() -> str:
+    while True:
+        room_id = secrets.token_hex(4)
+        if room_shard(room_id) == WORKER_INDEX % WORKER_COUNT:
+            return room_id
+
+
+def _room_record(room) -> dict:
+    """A room's durable fields. Fields declared ``compare=False`` are runtime-only."""
+    record = {f.name: getattr(room, f.name) for f in fields(room) if f.compare}
+    for name, value in record.items():
+        if isinstance(value, list):
+            record[name] = list(value)
+    return record
+
+
+class RoomStore:
+    """Durable home of live game rooms, keyed by ``(kind, room_id)``.
+
+    ``CHESS_ROOMS`` and ``PONG_ROOMS`` remain each worker's working copy;
+    the store holds the records (see :func:`_room_record`) that let a
+    restarted process pick its games back up.
+    """
+
+    def save(self, kind: str, records: List[dict]) -> None:
+        raise NotImplementedError
+
+    def load(self, kind: str, room_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def load_active(self, kind: str) -> List[dict]:
+        """Records of every room that is still waiting or playing."""
+        raise NotImplementedError
+
+    def delete(self, kind: str, room_id: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryRoomStore(RoomStore):
+    """Records in a dict; gone with the process."""
+
+    def __init__(self) -> None:
+        self._records: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    def save(self, kind: str, records: List[dict]) -> None:
+        with self._lock:
+            for record in records:
+                self._records[(kind, record["room_id"])] = dict(record)
+
+    def load(self, kind: str, room_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get((kind, room_id))
+        return dict(record) if record is not None else None
+
+    def load_active(self, kind: str) -> List[dict]:
+        with self._lock:
+            return [dict(r) for (k, _), r in self._records.items()
+                    if k == kind and r["status"] in ("waiting", "playing")]
+
+    def delete(self, kind: str, room_id: str) -> None:
+        with self._lock:
+            self._records.pop((kind, room_id), None)
+
+
+class SqliteRoomStore(RoomStore):
+    """Records as JSON in the ``rooms`` table of the leaderboard database."""
+
+    def save(self, kind: str, records: List[dict]) -> None:
+        now = time.time()
+        conn = get_db()
+        with conn:
+            conn.executemany(SQL_SAVE_ROOM, [
+                (kind, r["room_id"], r["status"], json.dumps(r), now) for r in records
+            ])
+
+    def load(self, kind: str, room_id: str) -> Optional[dict]:
+        row = get_db().execute(SQL_LOAD_ROOM, (kind, room_id)).fetchone()
+        return json.loads(row["state_json"]) if row else None
+
+    def load_active(self, kind: str) -> List[dict]:
+        return [json.loads(row["state_json"]) for row in get_db().execute(SQL_ACTIVE_ROOMS, (kind,))]
+
+    def delete(self, kind: str, room_id: str) -> None:
+        conn = get_db()
+        with conn:
+            conn.execute(SQL_DELETE_ROOM, (kind, room_id))
+
+
+ROOM_STORES = {"memory": MemoryRoomStore, "sqlite": SqliteRoomStore}
+room_store: RoomStore = ROOM_STORES[ROOM_STORE]()
+# Serialises loading a room from the store into this worker.
+_RESTORE_LOCK = threading.Lock()
+
+
+# ── Spectators ───────────────────────────────────────────────────────
+
+class _Channel:
+    __slots__ = ("payload", "frame", "version", "final", "subscribers", "events")
+
+    def __init__(self) -> None:
+        self.payload = ""
+        self.frame = b""
+        self.version = 0
+        self.final = False
+        self.subscribers = 0
+        self.events: Dict[asyncio.AbstractEventLoop, asyncio.Event] = {}
+
+
+class Subscription:
+    """One spectator's feed of a channel, iterated with ``async for``.
+
+    Yields the newest payload each time the channel moves on; a spectator
+    too slow to keep up skips straight to the latest state. Ends after
+    the channel's final message.
+    """
+
+    def __init__(self, broadcaster: "Broadcaster", key: str, channel: _Channel) -> None:
+        self._broadcaster = broadcaster
+        self._key = key
+        self._channel = channel
+        self._seen = channel.version
+        self.frame = b""
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> str:
+        channel = self._channel
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._broadcaster._lock:
+                if channel.version != self._seen:
+                    self._seen = channel.version
+                    self.frame = channel.frame
+                    return channel.payload
+                if channel.final:
+                    raise StopAsyncIteration
+                event = channel.events.get(loop)
+                if event is None:
+                    event = channel.events[loop] = asyncio.Event()
+            await event.wait()
+
+    def close(self) -> None:
+        self._broadcaster._unsubscribe(self._key, self._channel)
+
+
+class Broadcaster:
+    """Latest-value publish/subscribe for room state.
+
+    :meth:`publish` serialises a message once, as JSON and as an SSE
+    frame, and wakes one event per subscribed event loop however many
+    spectators share it. Publishing to a room nobody watches costs a
+    dict lookup. Safe to publish from any thread.
+    """
+
+    def __init__(self) -> None:
+        self._channels: Dict[str, _Channel] = {}
+        self._lock = threading.Lock()
+
+    def watching(self, key: str) -> bool:
+        return key in self._channels
+
+    def watched(self) -> List[str]:
+        return list(self._channels)
+
+    def subscribers(self, key: str) -> int:
+        channel = self._channels.get(key)
+        return channel.subscribers if channel is not None else 0
+
+    def subscribe(self, key: str) -> Subscription:
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None:
+                channel = self._channels[key] = _Channel()
+            channel.subscribers += 1
+            return Subscription(self, key, channel)
+
+    def _unsubscribe(self, key: str, channel: _Channel) -> None:
+        with self._lock:
+            channel.subscribers -= 1
+            if channel.subscribers == 0 and self._channels.get(key) is channel:
+                del self._channels[key]
+
+    def publish(self, key: str, message: dict, final: bool = False) -> bool:
+        """Send ``message`` to every subscriber of ``key``. False if there are none."""
+        channel = self._channels.get(key)
+        if channel is None:
+            return False
+        payload = json.dumps(message)
+        frame = f"data: {payload}\n\n".encode()
+        with self._lock:
+            channel.payload = payload
+            channel.frame = frame
+            channel.version += 1
+            channel.final = final
+            events, channel.events = channel.events, {}
+        for loop, event in events.items():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # that loop has already closed
+                pass
+        return True
+
+
+chess_spectators = Broadcaster()
+pong_spectators = Broadcaster()
+
+
+async def _spectate_ws(websocket: WebSocket, subscription: Subscription, initial: dict) -> None:
+    """Send ``initial``, then every state published to ``subscription`` until the game ends.
+
+    The caller subscribes and takes ``initial`` under the lock that
+    publishers hold, so no change falls between the two.
+    """
+    try:
+        await websocket.accept()
+    except BaseException:
+        subscription.close()
+        raise
+
+    async def push() -> None:
+        try:
+            await websocket.send_text(json.dumps(initial))
+            if initial["status"] != "finished":
+                async for payload in subscription:
+                    await websocket.send_text(payload)
+            await websocket.close()
+        except (WebSocketDisconnect, OSError):
+            pass
+        tg.cancel_scope.cancel()
+
+    async def receive() -> None:
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        tg.cancel_scope.cancel()
+
+    try:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(push)
+            tg.start_soon(receive)
+    finally:
+        subscription.close()
+
+
+def _spectate_sse(subscription: Subscription, initial: dict) -> StreamingResponse:
+    """Server-sent events version of :func:`_spectate_ws`."""
+
+    async def generate():
+        try:
+            yield f"data: {json.dumps(initial)}\n\n".encode()
+            if initial["status"] != "finished":
+                async for _ in subscription:
+                    yield subscription.frame
+        finally:
+            subscription.close()
+
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
 # ── Chess Multiplayer ────────────────────────────────────────────────
 
 @dataclass
@@ -119,14 +1842,25 @@ class ChessRoom:
     room_id: str
     player_white: Optional[str] = None
     player_black: Optional[str] = None
-    board_fen: str = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
     moves: List[str] = field(default_factory=list)
     status: str = "waiting"       # waiting | playing | finished
     winner: Optional[str] = None
     created_at: float = 0.0
+    result: Optional[str] = None        # "1-0" | "0-1" | "1/2-1/2" once finished
+    termination: Optional[str] = None   # checkmate | stalemate | ... | resignation
+    # Authoritative position, advanced one move at a time (None without python-chess)
+    board: Optional["chess.Board"] = field(default=None, repr=False, compare=False)
+    # (loop, event) pairs of /api/chess/wait requests parked on this room
+    waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = field(
+        default_factory=list, repr=False, compare=False)
 
 
 CHESS_ROOMS: Dict[str, ChessRoom] = {}
+# Guards room moves/status changes and waiter registration, so a waiter
+# can never check a room and then miss the move that lands next.
+_CHESS_LOCK = threading.Lock()
+# Longest a /api/chess/wait request is held open, in seconds.
+CHESS_WAIT_TIMEOUT = 25.0
 
 # Periodic chess room cleanup
 def _chess_cleanup_loop() -> None:
@@ -137,51 +1871,163 @@ def _chess_cleanup_loop() -> None:
                    if r.status == "finished" and now - r.created_at > 3600]
         for rid in expired:
             del CHESS_ROOMS[rid]
+            try:
+                room_store.delete("chess", rid)
+            except sqlite3.Error as e:
+                logger.error(f"Could not drop chess room {rid} from the store: {e}")
 
 _chess_cleanup_thread = threading.Thread(target=_chess_cleanup_loop, daemon=True)
 _chess_cleanup_thread.start()
 
 
-def _get_chess_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS chess_games (
-            room_id TEXT PRIMARY KEY,
-            player_white TEXT,
-            player_black TEXT,
-            winner TEXT,
-            moves_json TEXT,
-            created_at REAL
+def _wake_chess_waiters(room: ChessRoom) -> None:
+    """Release every parked wait on ``room``. Caller holds ``_CHESS_LOCK``."""
+    waiters, room.waiters = room.waiters, []
+    for loop, event in waiters:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:  # the waiting request's loop has already closed
+            pass
+
+
+def _chess_spectator_view(room: ChessRoom) -> dict:
+    return {
+        "room_id": room.room_id,
+        "status": room.status,
+        "player_white": room.player_white,
+        "player_black": room.player_black,
+        "moves": room.moves,
+        "last_move": room.moves[-1] if room.moves else None,
+        "turn": "white" if len(room.moves) % 2 == 0 else "black",
+        "winner": room.winner,
+        "fen": _chess_fen(room),
+        "result": room.result,
+        "termination": room.termination,
+    }
+
+
+def _chess_changed(room: ChessRoom) -> None:
+    """Tell long-polls and spectators the room moved on. Caller holds ``_CHESS_LOCK``."""
+    _wake_chess_waiters(room)
+    if chess_spectators.watching(room.room_id):
+        chess_spectators.publish(room.room_id, _chess_spectator_view(room), final=room.status == "finished")
+
+
+def _apply_chess_move(room: ChessRoom, text: str) -> str:
+    """Play ``text`` (UCI, or SAN as a fallback) on the room's board.
+
+    Only this one move is checked against the current position, never a
+    replay of the game. Ends the game on mate or an automatic draw and
+    returns the move in UCI. Caller holds ``_CHESS_LOCK``.
+    """
+    board = room.board
+    try:
+        move = chess.Move.from_uci(text)
+        if not board.is_legal(move):
+            raise HTTPException(400, f"Illegal move: {text}")
+    except ValueError:
+        try:
+            move = board.parse_san(text)
+        except ValueError:
+            raise HTTPException(400, f"Illegal move: {text}") from None
+    board.push(move)
+    outcome = board.outcome()
+    if outcome is not None:
+        room.status = "finished"
+        room.result = outcome.result()
+        room.termination = outcome.termination.name.lower()
+        if outcome.winner is not None:
+            room.winner = "white" if outcome.winner == chess.WHITE else "black"
+    return move.uci()
+
+
+def _chess_fen(room: ChessRoom) -> Optional[str]:
+    # Serialising a FEN costs more than validating a move, so do it on read.
+    # Without a board (no python-chess) the position is unknown.
+    return room.board.fen() if room.board is not None else None
+
+
+def _save_chess_room(room: ChessRoom) -> None:
+    conn = get_db()
+    with conn:
+        conn.execute(
+            SQL_SAVE_CHESS,
+            (room.room_id, room.player_white, room.player_black, room.winner,
+             json.dumps(room.moves), room.created_at, _chess_fen(room), room.result, room.termination),
         )
-    """)
-    conn.commit()
-    return conn
+    room_store.save("chess", [_room_record(room)])
+
+
+def _chess_from_record(record: dict) -> ChessRoom:
+    """Rebuild a room from the store, replaying its moves onto a fresh board."""
+    record = dict(record)
+    record.pop("board_fen", None)  # stored by versions that kept a (never updated) FEN field
+    room = ChessRoom(**record)
+    if CHESS_AVAILABLE:
+        room.board = chess.Board()
+        try:
+            for move in room.moves:
+                try:
+                    room.board.push_uci(move)
+                except ValueError:
+                    room.board.push_san(move)
+        except ValueError:
+            # Moves saved before server-side validation may not replay.
+            room.board = None
+    return room
+
+
+def _chess_room(room_id: str) -> Optional[ChessRoom]:
+    """This worker's copy of a room, loaded from the store on first use."""
+    room = CHESS_ROOMS.get(room_id)
+    if room is not None:
+        return room
+    with _RESTORE_LOCK:
+        room = CHESS_ROOMS.get(room_id)
+        if room is None:
+            record = room_store.load("chess", room_id)
+            if record is not None:
+                room = CHESS_ROOMS[room_id] = _chess_from_record(record)
+    return room
+
+
+async def _chess_room_async(room_id: str) -> Optional[ChessRoom]:
+    """:func:`_chess_room` for async handlers: a store load runs off the event loop."""
+    room = CHESS_ROOMS.get(room_id)
+    if room is None:
+        room = await asyncio.to_thread(_chess_room, room_id)
+    return room
 
 
 @app.post("/api/chess/create_room")
 def chess_create_room(player_name: str = Query(...)) -> dict:
-    room_id = secrets.token_hex(4)
+    room_id = _new_room_id()
     room = ChessRoom(
         room_id=room_id,
         player_white=player_name.strip(),
         created_at=time.time(),
+        board=chess.Board() if CHESS_AVAILABLE else None,
     )
     CHESS_ROOMS[room_id] = room
+    room_store.save("chess", [_room_record(room)])
     return {"room_id": room_id, "color": "white", "status": room.status}
 
 
 @app.post("/api/chess/join_room")
 def chess_join_room(room_id: str = Query(...), player_name: str = Query(...)):
-    room = CHESS_ROOMS.get(room_id)
+    room = _chess_room(room_id)
     if not room:
         raise HTTPException(404, "Room not found")
-    if room.status != "waiting":
-        raise HTTPException(400, "Game already started or finished")
-    if room.player_white == player_name.strip():
-        raise HTTPException(400, "Cannot join your own room")
-    room.player_black = player_name.strip()
-    room.status = "playing"
+    with _CHESS_LOCK:
+        # Checked under the lock so two players cannot both take the one open seat.
+        if room.status != "waiting":
+            raise HTTPException(400, "Game already started or finished")
+        if room.player_white == player_name.strip():
+            raise HTTPException(400, "Cannot join your own room")
+        room.player_black = player_name.strip()
+        room.status = "playing"
+        _chess_changed(room)
+    room_store.save("chess", [_room_record(room)])
     return {"room_id": room_id, "color": "black", "status": room.status}
 
 
@@ -191,7 +2037,7 @@ def chess_move(
     player_name: str = Query(...),
     move: str = Query(...),
 ) -> dict:
-    room = CHESS_ROOMS.get(room_id)
+    room = _chess_room(room_id)
     if not room:
         raise HTTPException(404, "Room not found")
     if room.status != "playing":
@@ -199,28 +2045,27 @@ def chess_move(
     if player_name.strip() not in (room.player_white, room.player_black):
         raise HTTPException(403, "You are not a player in this game")
 
-    # Basic turn validation (alternating moves)
-    expected = "white" if len(room.moves) % 2 == 0 else "black"
-    if (expected == "white" and player_name.strip() != room.player_white) or \
-       (expected == "black" and player_name.strip() != room.player_black):
-        raise HTTPException(400, f"Not your turn — waiting for {expected}")
-
-    room.moves.append(move)
+    with _CHESS_LOCK:
+        if room.status != "playing":
+            raise HTTPException(400, "Game is not in progress")
+        # Basic turn validation (alternating moves)
+        expected = "white" if len(room.moves) % 2 == 0 else "black"
+        if (expected == "white" and player_name.strip() != room.player_white) or \
+           (expected == "black" and player_name.strip() != room.player_black):
+            raise HTTPException(400, f"Not your turn — waiting for {expected}")
+
+        if room.board is not None:
+            move = _apply_chess_move(room, move)
+        room.moves.append(move)
+        _chess_changed(room)
     # Persist after each move
-    conn = _get_chess_db()
-    conn.execute(
-        "INSERT OR REPLACE INTO chess_games VALUES (?, ?, ?, ?, ?, ?)",
-        (room.room_id, room.player_white, room.player_black, room.winner,
-         json.dumps(room.moves), room.created_at),
-    )
-    conn.commit()
-    conn.close()
-    return {"move_number": len(room.moves), "ack": True}
+    _save_chess_room(room)
+    return {"move_number": len(room.moves), "ack": True, "status": room.status, "result": room.result}
 
 
 @app.get("/api/chess/game_state")
 def chess_game_state(room_id: str = Query(...), player_name: str = Query(...)):
-    room = CHESS_ROOMS.get(room_id)
+    room = _chess_room(room_id)
     if not room:
         raise HTTPException(404, "Room not found")
     last_move = room.moves[-1] if room.moves else None
@@ -234,58 +2079,135 @@ def chess_game_state(room_id: str = Query(...), player_name: str = Query(...)):
         "last_move": last_move,
         "turn": "white" if len(room.moves) % 2 == 0 else "black",
         "winner": room.winner,
+        "fen": _chess_fen(room),
+        "result": room.result,
+        "termination": room.termination,
+    }
+
+
+@app.get("/api/chess/wait")
+async def chess_wait(
+    room_id: str = Query(...),
+    since: int = Query(0, ge=0),
+    timeout: float = Query(CHESS_WAIT_TIMEOUT, gt=0, le=CHESS_WAIT_TIMEOUT),
+) -> dict:
+    """Long-poll: return moves after the first ``since`` once there are any.
+
+    Also returns when the game finishes, or with no moves after ``timeout``.
+    """
+    room = await _chess_room_async(room_id)
+    if not room:
+        raise HTTPException(404, "Room not found")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        remaining = deadline - loop.time()
+        event = asyncio.Event()
+        with _CHESS_LOCK:
+            ready = len(room.moves) > since or room.status == "finished"
+            if not ready and remaining > 0:
+                room.waiters.append((loop, event))
+        if ready or remaining <= 0:
+            break
+        try:
+            await asyncio.wait_for(event.wait(), remaining)
+        except asyncio.TimeoutError:
+            with _CHESS_LOCK:
+                if (loop, event) in room.waiters:
+                    room.waiters.remove((loop, event))
+            break
+    return {
+        "room_id": room.room_id,
+        "status": room.status,
+        "moves": room.moves[since:],
+        "move_count": len(room.moves),
+        "turn": "white" if len(room.moves) % 2 == 0 else "black",
+        "winner": room.winner,
+        "fen": _chess_fen(room),
+        "result": room.result,
+        "termination": room.termination,
     }
 
 
 @app.post("/api/chess/resign")
 def chess_resign(room_id: str = Query(...), player_name: str = Query(...)) -> dict:
-    room = CHESS_ROOMS.get(room_id)
+    room = _chess_room(room_id)
     if not room:
         raise HTTPException(404, "Room not found")
     if room.status != "playing":
         raise HTTPException(400, "Game is not in progress")
 
     resigner_color = "white" if room.player_white == player_name.strip() else "black"
-    room.status = "finished"
-    room.winner = "black" if resigner_color == "white" else "white"
+    with _CHESS_LOCK:
+        room.status = "finished"
+        room.winner = "black" if resigner_color == "white" else "white"
+        room.result = "1-0" if room.winner == "white" else "0-1"
+        room.termination = "resignation"
+        _chess_changed(room)
 
     # Persist to DB
-    conn = _get_chess_db()
-    conn.execute(
-        "INSERT OR REPLACE INTO chess_games VALUES (?, ?, ?, ?, ?, ?)",
-        (room.room_id, room.player_white, room.player_black, room.winner,
-         json.dumps(room.moves), room.created_at),
-    )
-    conn.commit()
-    conn.close()
+    _save_chess_room(room)
     return {"status": "finished", "winner": room.winner}
 
 
+@app.get("/api/chess/spectate")
+def chess_spectate(room_id: str = Query(...)) -> StreamingResponse:
+    """Watch a game as server-sent events: the state now, then after every change."""
+    room = _chess_room(room_id)
+    if not room:
+        raise HTTPException(404, "Room not found")
+    with _CHESS_LOCK:
+        subscription = chess_spectators.subscribe(room_id)
+        initial = _chess_spectator_view(room)
+    return _spectate_sse(subscription, initial)
+
+
+@app.websocket("/ws/chess/spectate")
+async def chess_spectate_ws(websocket: WebSocket, room_id: str) -> None:
+    room = await _chess_room_async(room_id)
+    if room is None:
+        await websocket.close(code=1008)
+        return
+    with _CHESS_LOCK:
+        subscription = chess_spectators.subscribe(room_id)
+        initial = _chess_spectator_view(room)
+    await _spectate_ws(websocket, subscription, initial)
+
+
 # ── Leaderboard ──────────────────────────────────────────────────────
 
 @app.get("/api/my_best")
 def my_best(player_name: str = Query(...), game_name: Optional[str] = Query(None)) -> dict:
     conn = get_db()
     if game_name:
-        row = conn.execute(
-            "SELECT MAX(score) as best FROM scores WHERE player_name = ? AND game_name = ?",
-            (player_name.strip(), game_name.strip().lower())
-        ).fetchone()
+        row = conn.execute(SQL_BEST_GAME, (player_name.strip(), game_name.strip().lower())).fetchone()
     else:
-        row = conn.execute(
-            "SELECT MAX(score) as best FROM scores WHERE player_name = ?",
-            (player_name.strip(),)
-        ).fetchone()
-    conn.close()
+        row = conn.execute(SQL_BEST_ALL, (player_name.strip(),)).fetchone()
     return {"best": row["best"] if row and row["best"] else 0}
 
 
+@app.get("/api/rank")
+def player_rank(player_name: str = Query(...), game_name: str = Query(...)) -> dict:
+    result = rank_index.lookup(game_name.strip().lower(), player_name.strip())
+    if result is None:
+        raise HTTPException(404, "No score for this player and game")
+    return result
+
+
 # ── Pong Multiplayer ───────────────────────────────────────────────────
 
 PONG_WIDTH = 80
 PONG_HEIGHT = 30
 PONG_TICK = 0.033  # ~30 fps
 WIN_SCORE = 10
+PADDLE_SPEED = 12.0
+# Simulation worker threads. Rooms are spread across them by room_id.
+PONG_WORKERS = int(os.environ.get("PONG_WORKERS", "4"))
+# A room that falls further behind than this many ticks skips ahead
+# instead of fast-forwarding through the backlog.
+PONG_MAX_CATCHUP = 5
+# Step each shard's rooms together as NumPy arrays (needs numpy).
+PONG_VECTORIZED = os.environ.get("PONG_VECTORIZED", "0") == "1"
 
 
 @dataclass
@@ -308,15 +2230,29 @@ class PongRoom:
     winner: str = ""
     last_tick: float = 0.0
     seed: int = 0
+    tick: int = 0
+    next_tick_at: float = field(default=0.0, compare=False)
+    rng: random.Random = field(default_factory=random.Random, repr=False, compare=False)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    slot: Optional[int] = field(default=None, repr=False, compare=False)
+    snapshots: Dict[str, "PongSnapshotLog"] = field(default_factory=dict, repr=False, compare=False)
+    # Tick at which the room was last written to the room store
+    saved_tick: int = field(default=-1, repr=False, compare=False)
 
 
 PONG_ROOMS: Dict[str, PongRoom] = {}
+# Guards PONG_ROOMS membership; each room's own lock guards its state.
 _PONG_LOCK = threading.Lock()
 
 
 def _init_pong_room(room: PongRoom) -> None:
     room.seed = random.randint(0, 2 ** 31)
-    rng = random.Random(room.seed)
+    _reset_pong_room(room)
+
+
+def _reset_pong_room(room: PongRoom) -> None:
+    """Start a match from ``room.seed``; the same seed replays the same game."""
+    rng = room.rng = random.Random(room.seed)
     room.ball_x = PONG_WIDTH / 2
     room.ball_y = PONG_HEIGHT / 2
     angle = rng.uniform(-0.6, 0.6)
@@ -333,19 +2269,17 @@ def _init_pong_room(room: PongRoom) -> None:
     room.last_tick = time.time()
 
 
-def _tick_pong(room: PongRoom, dt: float) -> None:
-    dt = min(dt, 0.1)
-    # Paddle movement
-    speed = 12.0
-    for side, pos, direction in [
-        ("left", "paddle_left", "paddle_dir_left"),
-        ("right", "paddle_right", "paddle_dir_right"),
-    ]:
-        d = getattr(room, direction)
-        if d == "up":
-            setattr(room, pos, max(0, getattr(room, pos) - speed * dt))
-        elif d == "down":
-            setattr(room, pos, min(PONG_HEIGHT - room.paddle_size, getattr(room, pos) + speed * dt))
+def _tick_pong(room: PongRoom, dt: float = PONG_TICK) -> None:
+    """Advance one room by one fixed step. Caller holds ``room.lock``."""
+    step = PADDLE_SPEED * dt
+    if room.paddle_dir_left == "up":
+        room.paddle_left = max(0.0, room.paddle_left - step)
+    elif room.paddle_dir_left == "down":
+        room.paddle_left = min(PONG_HEIGHT - room.paddle_size, room.paddle_left + step)
+    if room.paddle_dir_right == "up":
+        room.paddle_right = max(0.0, room.paddle_right - step)
+    elif room.paddle_dir_right == "down":
+        room.paddle_right = min(PONG_HEIGHT - room.paddle_size, room.paddle_right + step)
 
     # Ball movement
     room.ball_x += room.ball_dx * dt * 30
@@ -370,7 +2304,7 @@ def _tick_pong(room: PongRoom, dt: float) -> None:
             room.ball_x = PONG_WIDTH / 2
             room.ball_y = PONG_HEIGHT / 2
             room.ball_dx = 2.0
-            room.ball_dy = random.uniform(-1, 1)
+            room.ball_dy = room.rng.uniform(-1, 1)
 
     # Right paddle collision
     if room.ball_x >= PONG_WIDTH - 3.0:
@@ -386,7 +2320,7 @@ def _tick_pong(room: PongRoom, dt: float) -> None:
             room.ball_x = PONG_WIDTH / 2
             room.ball_y = PONG_HEIGHT / 2
             room.ball_dx = -2.0
-            room.ball_dy = random.uniform(-1, 1)
+            room.ball_dy = room.rng.uniform(-1, 1)
 
     # Win check
     if room.score_left >= WIN_SCORE:
@@ -395,118 +2329,795 @@ def _tick_pong(room: PongRoom, dt: float) -> None:
     elif room.score_right >= WIN_SCORE:
         room.status = "finished"
         room.winner = room.player_right
+    room.tick += 1
 
 
-def _pong_background_loop() -> None:
-    while True:
-        now = time.time()
-        with _PONG_LOCK:
-            for room in list(PONG_ROOMS.values()):
-                if room.status == "playing":
-                    dt = now - room.last_tick
-                    _tick_pong(room, dt)
-                    room.last_tick = now
-            # Clean up finished rooms after 5 minutes
-            expired = [rid for rid, r in list(PONG_ROOMS.items())
-                       if r.status == "finished" and now - r.last_tick > 300]
-            for rid in expired:
-                del PONG_ROOMS[rid]
-        time.sleep(PONG_TICK)
+def _pong_spectator_view(room: PongRoom) -> dict:
+    """Side-neutral state of a room, for spectators."""
+    return {
+        "room_id": room.room_id,
+        "status": room.status,
+        "winner": room.winner,
+        "player_left": room.player_left,
+        "player_right": room.player_right,
+        "ball_x": room.ball_x,
+        "ball_y": room.ball_y,
+        "ball_dx": room.ball_dx,
+        "ball_dy": room.ball_dy,
+        "paddle_left": room.paddle_left,
+        "paddle_right": room.paddle_right,
+        "paddle_size": room.paddle_size,
+        "score_left": room.score_left,
+        "score_right": room.score_right,
+        "width": PONG_WIDTH,
+        "height": PONG_HEIGHT,
+        "tick": room.tick,
+        "tick_seconds": PONG_TICK,
+    }
+
 
+_DIR_CODES = {"up": -1, "stop": 0, "down": 1}
+
+
+class PongBatch:
+    """Structure-of-arrays store that steps many rooms at once with NumPy.
+
+    Each field of every attached room lives at ``slot`` in a flat array,
+    and :meth:`step` applies :func:`_tick_pong` to all of them with
+    vectorised masks. Results match the scalar tick exactly: the same
+    float operations run in the same order, and the only random draw
+    (the serve after a point) still comes from each room's own ``rng``.
+    Rooms are copied in by :meth:`add` and read back by :meth:`load`.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("PongBatch needs numpy")
+        self.size = 0
+        self.rooms: List[Optional[PongRoom]] = []
+        self._free: List[int] = []
+        self.ball_x = np.zeros(0)
+        self.ball_y = np.zeros(0)
+        self.ball_dx = np.zeros(0)
+        self.ball_dy = np.zeros(0)
+        self.paddle_left = np.zeros(0)
+        self.paddle_right = np.zeros(0)
+        self.paddle_size = np.zeros(0)
+        self.dir_left = np.zeros(0, dtype=np.int8)
+        self.dir_right = np.zeros(0, dtype=np.int8)
+        self.score_left = np.zeros(0, dtype=np.int64)
+        self.score_right = np.zeros(0, dtype=np.int64)
+        self.tick = np.zeros(0, dtype=np.int64)
+        self.active = np.zeros(0, dtype=bool)
+        self._grow(capacity)
+
+    def _grow(self, capacity: int) -> None:
+        for name in ("ball_x", "ball_y", "ball_dx", "ball_dy", "paddle_left", "paddle_right",
+                     "paddle_size", "dir_left", "dir_right", "score_left", "score_right",
+                     "tick", "active"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def __len__(self) -> int:
+        return self.size - len(self._free)
+
+    def add(self, room: PongRoom) -> int:
+        """Copy a room's state into a free slot and return the slot."""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = self.size
+            if slot == len(self.active):
+                self._grow(2 * slot)
+            self.size += 1
+            self.rooms.append(None)
+        self.rooms[slot] = room
+        self.ball_x[slot] = room.ball_x
+        self.ball_y[slot] = room.ball_y
+        self.ball_dx[slot] = room.ball_dx
+        self.ball_dy[slot] = room.ball_dy
+        self.paddle_left[slot] = room.paddle_left
+        self.paddle_right[slot] = room.paddle_right
+        self.paddle_size[slot] = room.paddle_size
+        self.score_left[slot] = room.score_left
+        self.score_right[slot] = room.score_right
+        self.tick[slot] = room.tick
+        self.steer(slot, room.paddle_dir_left, room.paddle_dir_right)
+        self.active[slot] = True
+        return slot
+
+    def remove(self, slot: int) -> None:
+        self.active[slot] = False
+        self.rooms[slot] = None
+        self._free.append(slot)
+
+    def steer(self, slot: int, left: str, right: str) -> None:
+        self.dir_left[slot] = _DIR_CODES[left]
+        self.dir_right[slot] = _DIR_CODES[right]
+
+    def load(self, room: PongRoom, slot: int) -> None:
+        """Copy a slot's simulated state back onto its room."""
+        room.ball_x = float(self.ball_x[slot])
+        room.ball_y = float(self.ball_y[slot])
+        room.ball_dx = float(self.ball_dx[slot])
+        room.ball_dy = float(self.ball_dy[slot])
+        room.paddle_left = float(self.paddle_left[slot])
+        room.paddle_right = float(self.paddle_right[slot])
+        room.score_left = int(self.score_left[slot])
+        room.score_right = int(self.score_right[slot])
+        room.tick = int(self.tick[slot])
+
+    def step(self, dt: float = PONG_TICK) -> List[Tuple[int, str]]:
+        """Advance every active slot by one tick.
+
+        Returns ``(slot, event)`` pairs where event is ``"point_left"``,
+        ``"point_right"`` or ``"finished"``. Finished slots are
+        deactivated but stay attached until :meth:`remove`.
+        """
+        n = self.size
+        active = self.active[:n]
+        if not active.any():
+            return []
+        bx, by = self.ball_x[:n], self.ball_y[:n]
+        dx, dy = self.ball_dx[:n], self.ball_dy[:n]
+        size = self.paddle_size[:n]
+
+        step = PADDLE_SPEED * dt
+        for paddle, direction in ((self.paddle_left[:n], self.dir_left[:n]),
+                                  (self.paddle_right[:n], self.dir_right[:n])):
+            np.copyto(paddle, np.maximum(0.0, paddle - step), where=active & (direction == -1))
+            np.copyto(paddle, np.minimum(PONG_HEIGHT - size, paddle + step),
+                      where=active & (direction == 1))
+
+        # Ball movement
+        np.add(bx, dx * dt * 30, out=bx, where=active)
+        np.add(by, dy * dt * 30, out=by, where=active)
+
+        # Wall bounce
+        wall = active & ((by <= 0) | (by >= PONG_HEIGHT - 1))
+        np.copyto(dy, dy * -0.95, where=wall)
+        np.copyto(by, np.maximum(0.1, np.minimum(PONG_HEIGHT - 1.1, by)), where=wall)
+
+        # Paddle collisions; the left check resets the ball before the right one looks.
+        missed = []
+        for paddle, edge, sign, scorer in ((self.paddle_left[:n], 2.0, 1.0, self.score_right[:n]),
+                                           (self.paddle_right[:n], PONG_WIDTH - 3.0, -1.0,
+                                            self.score_left[:n])):
+            near = active & ((bx <= edge) if sign > 0 else (bx >= edge))
+            hit = near & (paddle <= by) & (by < paddle + size)
+            miss = near & ~hit
+            np.copyto(dx, sign * np.abs(dx) * 1.01, where=hit)
+            np.copyto(dy, ((by - paddle) / size - 0.5) * 3.0, where=hit)
+            np.copyto(bx, edge, where=hit)
+            scorer += miss
+            np.copyto(bx, PONG_WIDTH / 2, where=miss)
+            np.copyto(by, PONG_HEIGHT / 2, where=miss)
+            np.copyto(dx, 2.0 * sign, where=miss)
+            missed.append(miss)
+
+        events: List[Tuple[int, str]] = []
+        for miss, event in zip(missed, ("point_right", "point_left")):
+            for slot in np.flatnonzero(miss).tolist():
+                dy[slot] = self.rooms[slot].rng.uniform(-1, 1)
+                events.append((slot, event))
+
+        self.tick[:n] += active
+        won = active & ((self.score_left[:n] >= WIN_SCORE) | (self.score_right[:n] >= WIN_SCORE))
+        for slot in np.flatnonzero(won).tolist():
+            self.active[slot] = False
+            events.append((slot, "finished"))
+        return events
+
+
+class PongEngine:
+    """Fixed-timestep Pong simulation sharded across worker threads.
+
+    Every room advances in steps of exactly ``tick`` seconds, so a match
+    depends only on its seed and paddle inputs, not on scheduling jitter.
+    Rooms are assigned to a shard by ``room_id``. A worker only ever
+    try-locks a room: if a handler is holding it, that room catches up
+    on the next pass while the rest of the shard carries on.
+
+    With ``vectorized=True`` (and numpy installed) each shard keeps its
+    playing rooms in a :class:`PongBatch` and steps them together on a
+    shared shard clock. Room objects are then only refreshed when read
+    through :meth:`sync`, and the shard's batch lock replaces per-room
+    locking for simulation state. Always take ``room.lock`` before a
+    batch lock, never the other way round.
+    """
+
+    def __init__(self, workers: int = PONG_WORKERS, tick: float = PONG_TICK,
+                 vectorized: bool = PONG_VECTORIZED) -> None:
+        self.tick = tick
+        self.workers = max(1, workers)
+        self.vectorized = vectorized and NUMPY_AVAILABLE
+        self._shards: List[Dict[str, PongRoom]] = [{} for _ in range(self.workers)]
+        self._batches = [PongBatch() for _ in range(self.workers)] if self.vectorized else []
+        self._batch_locks = [threading.Lock() for _ in range(self.workers)]
+        self._batch_next_at = [0.0] * self.workers
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    def _index(self, room_id: str) -> int:
+        return zlib.crc32(room_id.encode()) % self.workers
+
+    def _shard(self, room_id: str) -> Dict[str, PongRoom]:
+        return self._shards[self._index(room_id)]
+
+    def add(self, room: PongRoom) -> None:
+        with _PONG_LOCK:
+            PONG_ROOMS[room.room_id] = room
+            self._shard(room.room_id)[room.room_id] = room
 
-_pong_thread = threading.Thread(target=_pong_background_loop, daemon=True)
-_pong_thread.start()
+    def remove(self, room_id: str) -> None:
+        with _PONG_LOCK:
+            PONG_ROOMS.pop(room_id, None)
+            self._shard(room_id).pop(room_id, None)
+        try:
+            room_store.delete("pong", room_id)
+        except sqlite3.Error as e:
+            logger.error(f"Could not drop pong room {room_id} from the store: {e}")
+
+    def start_match(self, room: PongRoom) -> None:
+        """Put a room into play from its first tick. Caller holds ``room.lock``."""
+        room.next_tick_at = time.monotonic() + self.tick
+        room.last_tick = time.time()
+        if self.vectorized:
+            index = self._index(room.room_id)
+            with self._batch_locks[index]:
+                room.slot = self._batches[index].add(room)
+
+    def end_match(self, room: PongRoom) -> None:
+        """Take a room out of its batch early. Caller holds ``room.lock``."""
+        if room.slot is None:
+            return
+        index = self._index(room.room_id)
+        with self._batch_locks[index]:
+            if room.slot is not None:
+                self._batches[index].load(room, room.slot)
+                self._batches[index].remove(room.slot)
+                room.slot = None
+
+    def steer(self, room: PongRoom) -> None:
+        """Push a room's paddle directions into its batch, if it has one."""
+        if room.slot is None:
+            return
+        index = self._index(room.room_id)
+        with self._batch_locks[index]:
+            if room.slot is not None:
+                self._batches[index].steer(room.slot, room.paddle_dir_left, room.paddle_dir_right)
+
+    def sync(self, room: PongRoom) -> None:
+        """Refresh a batched room's fields from its batch before reading them."""
+        if room.slot is None:
+            return
+        index = self._index(room.room_id)
+        with self._batch_locks[index]:
+            if room.slot is not None:
+                self._batches[index].load(room, room.slot)
+
+    def step_shard(self, index: int, now: float) -> int:
+        """Advance every due room in one shard to ``now``. Returns ticks run."""
+        if not self._shards[index]:
+            return 0
+        if self.vectorized:
+            return self._step_batch(index, now)
+        ticks = 0
+        wall = time.time()
+        for room in list(self._shards[index].values()):
+            if room.status != "playing":
+                # Clean up finished rooms after 5 minutes
+                if room.status == "finished" and wall - room.last_tick > 300:
+                    self.remove(room.room_id)
+                continue
+            if room.next_tick_at > now or not room.lock.acquire(blocking=False):
+                continue
+            try:
+                steps = 0
+                while room.next_tick_at <= now and room.status == "playing":
+                    if steps == PONG_MAX_CATCHUP:
+                        room.next_tick_at = now + self.tick
+                        break
+                    _tick_pong(room, self.tick)
+                    room.next_tick_at += self.tick
+                    steps += 1
+                room.last_tick = wall
+                ticks += steps
+                if steps and pong_spectators.watching(room.room_id):
+                    pong_spectators.publish(room.room_id, _pong_spectator_view(room),
+                                            final=room.status == "finished")
+            finally:
+                room.lock.release()
+        return ticks
+
+    def _step_batch(self, index: int, now: float) -> int:
+        batch = self._batches[index]
+        wall = time.time()
+        ticks = 0
+        finished: List[PongRoom] = []
+        with self._batch_locks[index]:
+            steps = 0
+            while self._batch_next_at[index] <= now:
+                if steps == PONG_MAX_CATCHUP:
+                    self._batch_next_at[index] = now + self.tick
+                    break
+                ticks += len(batch)
+                for slot, event in batch.step(self.tick):
+                    if event != "finished":
+                        continue
+                    room = batch.rooms[slot]
+                    batch.load(room, slot)
+                    batch.remove(slot)
+                    room.slot = None
+                    room.winner = room.player_left if room.score_left >= WIN_SCORE else room.player_right
+                    room.last_tick = wall
+                    room.status = "finished"
+                    finished.append(room)
+                self._batch_next_at[index] += self.tick
+                steps += 1
+            if steps:
+                for room_id in pong_spectators.watched():
+                    room = self._shards[index].get(room_id)
+                    if room is not None and room.slot is not None:
+                        batch.load(room, room.slot)
+                        pong_spectators.publish(room_id, _pong_spectator_view(room))
+        for room in finished:
+            pong_spectators.publish(room.room_id, _pong_spectator_view(room), final=True)
+        for room in list(self._shards[index].values()):
+            if room.status == "finished" and wall - room.last_tick > 300:
+                self.remove(room.room_id)
+        return ticks
+
+    def _run(self, index: int) -> None:
+        next_pass = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            PONG_TICK_LAG.observe(max(0.0, now - next_pass))
+            ticks = self.step_shard(index, now)
+            PONG_TICK_DURATION.observe(time.monotonic() - now)
+            if ticks:
+                PONG_TICKS.inc(ticks)
+            next_pass += self.tick
+            delay = next_pass - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_pass = time.monotonic()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, args=(i,), name=f"pong-shard-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+
+pong_engine = PongEngine()
+pong_engine.start()
+
+# Seconds between writes of moving Pong rooms to the room store. A crash
+# loses at most this much of a match.
+PONG_CHECKPOINT_SECONDS = float(os.environ.get("PONG_CHECKPOINT_SECONDS", "1.0"))
+
+
+def _replay_pong_rng(room: PongRoom) -> None:
+    """Rebuild ``room.rng`` for the current score.
+
+    A match draws twice for the opening serve and once per point, so
+    the seed and the score pin down the generator exactly.
+    """
+    rng = room.rng = random.Random(room.seed)
+    rng.uniform(-0.6, 0.6)
+    rng.choice([True, False])
+    for _ in range(room.score_left + room.score_right):
+        rng.uniform(-1, 1)
+
+
+def _resume_pong_room(record: dict) -> PongRoom:
+    """Put a room from the store back into play on this worker."""
+    room = PongRoom(**record)
+    _replay_pong_rng(room)
+    room.saved_tick = room.tick
+    pong_engine.add(room)
+    if room.status == "playing":
+        with room.lock:
+            pong_engine.start_match(room)
+    return room
+
+
+def _pong_room(room_id: str) -> Optional[PongRoom]:
+    """This worker's copy of a room, loaded from the store on first use."""
+    room = PONG_ROOMS.get(room_id)
+    if room is not None:
+        return room
+    with _RESTORE_LOCK:
+        room = PONG_ROOMS.get(room_id)
+        if room is None:
+            record = room_store.load("pong", room_id)
+            if record is not None:
+                room = _resume_pong_room(record)
+    return room
+
+
+async def _pong_room_async(room_id: str) -> Optional[PongRoom]:
+    """:func:`_pong_room` for async handlers: a store load runs off the event loop."""
+    room = PONG_ROOMS.get(room_id)
+    if room is None:
+        room = await asyncio.to_thread(_pong_room, room_id)
+    return room
+
+
+def _pong_record(room: PongRoom) -> dict:
+    with room.lock:
+        pong_engine.sync(room)
+        record = _room_record(room)
+        room.saved_tick = room.tick
+    return record
+
+
+def checkpoint_pong_rooms() -> int:
+    """Write every Pong room that has moved since its last save. Returns the count."""
+    records = [_pong_record(room) for room in list(PONG_ROOMS.values())
+               if room.tick != room.saved_tick]
+    if records:
+        room_store.save("pong", records)
+    return len(records)
+
+
+class PongCheckpointer:
+    """Background thread that runs :func:`checkpoint_pong_rooms` periodically."""
+
+    def __init__(self, interval: float = PONG_CHECKPOINT_SECONDS) -> None:
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pong-checkpoint", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread and take one last checkpoint."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1.0)
+            self._thread = None
+        checkpoint_pong_rooms()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                checkpoint_pong_rooms()
+            except sqlite3.Error as e:
+                logger.error(f"Pong checkpoint failed: {e}")
+
+
+pong_checkpointer = PongCheckpointer()
+
+
+def restore_rooms() -> Tuple[int, int]:
+    """Load this worker's unfinished chess and Pong rooms from the room store.
+
+    Returns how many chess and Pong rooms were restored.
+    """
+    mine = WORKER_INDEX % WORKER_COUNT
+    chess_rooms = [r for r in room_store.load_active("chess") if room_shard(r["room_id"]) == mine]
+    pong_rooms = [r for r in room_store.load_active("pong") if room_shard(r["room_id"]) == mine]
+    with _RESTORE_LOCK:
+        for record in chess_rooms:
+            if record["room_id"] not in CHESS_ROOMS:
+                CHESS_ROOMS[record["room_id"]] = _chess_from_record(record)
+        for record in pong_rooms:
+            if record["room_id"] not in PONG_ROOMS:
+                _resume_pong_room(record)
+    if chess_rooms or pong_rooms:
+        logger.info(f"Restored {len(chess_rooms)} chess and {len(pong_rooms)} pong rooms")
+    return len(chess_rooms), len(pong_rooms)
 
 
 @app.post("/api/pong/create_room")
 def pong_create_room(player_name: str = Query(...)) -> dict:
-    room_id = secrets.token_hex(4)
+    room_id = _new_room_id()
     room = PongRoom(room_id=room_id, player_left=player_name.strip())
-    with _PONG_LOCK:
-        PONG_ROOMS[room_id] = room
+    pong_engine.add(room)
+    room_store.save("pong", [_pong_record(room)])
     return {"room_id": room_id, "side": "left", "status": "waiting"}
 
 
 @app.post("/api/pong/join_room")
 def pong_join_room(room_id: str = Query(...), player_name: str = Query(...)):
-    room = PONG_ROOMS.get(room_id)
+    room = _pong_room(room_id)
     if not room:
         raise HTTPException(404, "Room not found")
-    if room.status != "waiting":
-        raise HTTPException(400, "Game already started")
-    if room.player_left == player_name.strip():
-        raise HTTPException(400, "Cannot join your own room")
-    room.player_right = player_name.strip()
-    _init_pong_room(room)
+    with room.lock:
+        # Checked under the lock so a second joiner cannot restart the match.
+        if room.status != "waiting":
+            raise HTTPException(400, "Game already started")
+        if room.player_left == player_name.strip():
+            raise HTTPException(400, "Cannot join your own room")
+        room.player_right = player_name.strip()
+        _init_pong_room(room)
+        pong_engine.start_match(room)
+    room_store.save("pong", [_pong_record(room)])
     return {"room_id": room_id, "side": "right", "status": "playing"}
 
 
+PONG_DIRECTIONS = ("up", "down", "stop")
+
+
+def _pong_side(room: PongRoom, player_name: str) -> Optional[str]:
+    name = player_name.strip()
+    if name == room.player_left:
+        return "left"
+    if room.player_right and name == room.player_right:
+        return "right"
+    return None
+
+
+def _set_pong_paddle(room: PongRoom, side: str, direction: str) -> None:
+    with room.lock:
+        if side == "left":
+            room.paddle_dir_left = direction
+        else:
+            room.paddle_dir_right = direction
+        pong_engine.steer(room)
+
+
+def _pong_view(room: PongRoom, side: str) -> dict:
+    """State of a room as seen by the player on ``side``.
+
+    Read under ``room.lock`` so the view never mixes fields from two ticks.
+    """
+    left = side == "left"
+    with room.lock:
+        pong_engine.sync(room)
+        return {
+            "side": side,
+            "ball_x": room.ball_x,
+            "ball_y": room.ball_y,
+            "my_paddle_y": room.paddle_left if left else room.paddle_right,
+            "opponent_paddle_y": room.paddle_right if left else room.paddle_left,
+            "my_score": room.score_left if left else room.score_right,
+            "opponent_score": room.score_right if left else room.score_left,
+            "status": room.status,
+            "winner": room.winner,
+            "paddle_size": room.paddle_size,
+            "width": PONG_WIDTH,
+            "height": PONG_HEIGHT,
+            "ball_dx": room.ball_dx,
+            "ball_dy": room.ball_dy,
+            "tick": room.tick,
+            "tick_seconds": PONG_TICK,
+        }
+
+
+# Snapshot deltas: each view sent to a side gets a sequence number, and a
+# client that acknowledges one receives only the fields changed since.
+PONG_SNAPSHOT_HISTORY = 32
+# Wire order for binary snapshots; bit i of the mask marks field i.
+PONG_SNAPSHOT_FIELDS = (
+    ("ball_x", "f"), ("ball_y", "f"), ("my_paddle_y", "f"), ("opponent_paddle_y", "f"),
+    ("my_score", "B"), ("opponent_score", "B"), ("status", "s"), ("winner", "s"),
+    ("side", "s"), ("paddle_size", "B"), ("width", "H"), ("height", "H"),
+    ("ball_dx", "f"), ("ball_dy", "f"), ("tick", "I"), ("tick_seconds", "f"),
+)
+_SNAPSHOT_HEADER = struct.Struct("<IIH")
+
+
+class PongSnapshotLog:
+    """Recent snapshots sent to one side of a room, by sequence number."""
+
+    def __init__(self) -> None:
+        self.seq = 0
+        self.history: "OrderedDict[int, dict]" = OrderedDict()
+
+    def delta(self, view: dict, ack: int) -> Tuple[int, Optional[int], dict]:
+        """Record ``view`` and diff it against snapshot ``ack``.
+
+        Returns ``(seq, base, changes)``. ``base`` is None, and ``changes``
+        the whole view, when ``ack`` is 0 or too old to diff against.
+        """
+        if not self.history or self.history[self.seq] != view:
+            self.seq += 1
+            self.history[self.seq] = view
+            if len(self.history) > PONG_SNAPSHOT_HISTORY:
+                self.history.popitem(last=False)
+        base = self.history.get(ack)
+        if base is None:
+            return self.seq, None, dict(view)
+        return self.seq, ack, {k: v for k, v in view.items() if base.get(k) != v}
+
+
+def _pong_snapshot(room: PongRoom, side: str) -> dict:
+    view = _pong_view(room, side)
+    for key in ("ball_x", "ball_y", "my_paddle_y", "opponent_paddle_y"):
+        view[key] = round(view[key], 2)
+    view["ball_dx"] = round(view["ball_dx"], 3)
+    view["ball_dy"] = round(view["ball_dy"], 3)
+    return view
+
+
+def _encode_pong_delta(seq: int, base: Optional[int], changes: dict, encoding: str) -> Union[str, bytes]:
+    """Serialise a delta as compact JSON text or a bitmasked binary frame."""
+    if encoding == "json":
+        return json.dumps({"seq": seq, "base": base, "changes": changes}, separators=(",", ":"))
+    mask = 0
+    body = b""
+    for bit, (name, code) in enumerate(PONG_SNAPSHOT_FIELDS):
+        if name not in changes:
+            continue
+        mask |= 1 << bit
+        if code == "s":
+            raw = changes[name].encode()[:255]
+            body += bytes([len(raw)]) + raw
+        else:
+            body += struct.pack("<" + code, changes[name])
+    return _SNAPSHOT_HEADER.pack(seq, base or 0, mask) + body
+
+
 @app.post("/api/pong/paddle")
 def pong_paddle(room_id: str = Query(...), player_name: str = Query(...), direction: str = Query("stop")):
-    room = PONG_ROOMS.get(room_id)
+    room = _pong_room(room_id)
     if not room:
         raise HTTPException(404, "Room not found")
-    if direction not in ("up", "down", "stop"):
+    if direction not in PONG_DIRECTIONS:
         raise HTTPException(400, "Invalid direction")
 
-    with _PONG_LOCK:
-        if room.player_left == player_name.strip():
-            room.paddle_dir_left = direction
-        elif room.player_right == player_name.strip():
-            room.paddle_dir_right = direction
-        else:
-            raise HTTPException(403, "Not a player in this game")
+    side = _pong_side(room, player_name)
+    if side is None:
+        raise HTTPException(403, "Not a player in this game")
+    _set_pong_paddle(room, side, direction)
     return {"ack": True}
 
 
 @app.get("/api/pong/state")
-def pong_state(room_id: str = Query(...), player_name: str = Query(...)):
-    room = PONG_ROOMS.get(room_id)
+def pong_state(
+    room_id: str = Query(...),
+    player_name: str = Query(...),
+    encoding: Optional[str] = Query(None, pattern="^(json|binary)$"),
+    ack: int = Query(0, ge=0),
+):
+    """Full state, or with ``encoding`` a delta against snapshot ``ack``."""
+    room = _pong_room(room_id)
     if not room:
         raise HTTPException(404, "Room not found")
-
-    if player_name.strip() == room.player_left:
-        side = "left"
-        opponent_paddle = room.paddle_right
-        my_paddle = room.paddle_left
-    elif room.player_right and player_name.strip() == room.player_right:
-        side = "right"
-        opponent_paddle = room.paddle_left
-        my_paddle = room.paddle_right
-    else:
+    side = _pong_side(room, player_name)
+    if side is None:
         raise HTTPException(403, "Not a player")
-
-    return {
-        "side": side,
-        "ball_x": room.ball_x,
-        "ball_y": room.ball_y,
-        "my_paddle_y": my_paddle,
-        "opponent_paddle_y": opponent_paddle,
-        "my_score": room.score_left if side == "left" else room.score_right,
-        "opponent_score": room.score_right if side == "left" else room.score_left,
-        "status": room.status,
-        "winner": room.winner,
-        "paddle_size": room.paddle_size,
-        "width": PONG_WIDTH,
-        "height": PONG_HEIGHT,
-    }
+    if encoding is None:
+        return _pong_view(room, side)
+    snapshot = _pong_snapshot(room, side)
+    with room.lock:
+        log = room.snapshots.setdefault(side, PongSnapshotLog())
+        seq, base, changes = log.delta(snapshot, ack)
+    if encoding == "json":
+        return {"seq": seq, "base": base, "changes": changes}
+    return Response(_encode_pong_delta(seq, base, changes, encoding), media_type="application/octet-stream")
+
+
+@app.websocket("/ws/pong")
+async def pong_ws(websocket: WebSocket, room_id: str, player_name: str,
+                  encoding: Optional[str] = None) -> None:
+    """Push room state every tick; accept ``{"direction": ...}`` messages.
+
+    With ``encoding=json`` or ``encoding=binary`` each push is a delta
+    against the previous one; the ordered stream acknowledges implicitly.
+    """
+    if encoding not in (None, "json", "binary"):
+        await websocket.close(code=1008)
+        return
+    room = await _pong_room_async(room_id)
+    side = _pong_side(room, player_name) if room else None
+    if side is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+
+    # Views and paddle changes take room.lock, and through sync() the shard's
+    # batch lock, which a worker holds for a whole step: run them off the loop.
+    async def push() -> None:
+        last = None
+        log = PongSnapshotLog()
+        try:
+            while True:
+                if encoding is None:
+                    payload = json.dumps(await asyncio.to_thread(_pong_view, room, side))
+                    if payload != last:
+                        await websocket.send_text(payload)
+                        last = payload
+                else:
+                    snapshot = await asyncio.to_thread(_pong_snapshot, room, side)
+                    seq, base, changes = log.delta(snapshot, log.seq)
+                    if changes:
+                        frame = _encode_pong_delta(seq, base, changes, encoding)
+                        if encoding == "json":
+                            await websocket.send_text(frame)
+                        else:
+                            await websocket.send_bytes(frame)
+                if room.status == "finished":
+                    await websocket.close()
+                    break
+                await asyncio.sleep(PONG_TICK)
+        except (WebSocketDisconnect, OSError):
+            pass
+        tg.cancel_scope.cancel()
+
+    async def receive() -> None:
+        try:
+            while True:
+                try:
+                    message = json.loads(await websocket.receive_text())
+                except ValueError:
+                    continue
+                direction = message.get("direction") if isinstance(message, dict) else None
+                if direction in PONG_DIRECTIONS:
+                    await asyncio.to_thread(_set_pong_paddle, room, side, direction)
+        except WebSocketDisconnect:
+            pass
+        tg.cancel_scope.cancel()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(push)
+        tg.start_soon(receive)
 
 
 @app.post("/api/pong/forfeit")
 def pong_forfeit(room_id: str = Query(...), player_name: str = Query(...)):
-    room = PONG_ROOMS.get(room_id)
+    room = _pong_room(room_id)
     if not room:
         raise HTTPException(404, "Room not found")
     if room.status != "playing":
         raise HTTPException(400, "Game not in progress")
 
-    with _PONG_LOCK:
+    with room.lock:
         if room.player_left == player_name.strip():
-            room.status = "finished"
-            room.winner = room.player_right
+            winner = room.player_right
         elif room.player_right == player_name.strip():
-            room.status = "finished"
-            room.winner = room.player_left
+            winner = room.player_left
         else:
             raise HTTPException(403, "Not a player")
+        pong_engine.end_match(room)
+        if room.status != "playing":
+            raise HTTPException(400, "Game not in progress")
+        room.status = "finished"
+        room.winner = winner
+        pong_spectators.publish(room_id, _pong_spectator_view(room), final=True)
+    room_store.save("pong", [_pong_record(room)])
     return {"status": "finished", "winner": room.winner}
+
+
+def _pong_spectate(room: PongRoom) -> Tuple[Subscription, dict]:
+    with room.lock:
+        pong_engine.sync(room)
+        return pong_spectators.subscribe(room.room_id), _pong_spectator_view(room)
+
+
+@app.get("/api/pong/spectate")
+def pong_spectate(room_id: str = Query(...)) -> StreamingResponse:
+    """Watch a match as server-sent events, one per simulation step."""
+    room = _pong_room(room_id)
+    if not room:
+        raise HTTPException(404, "Room not found")
+    return _spectate_sse(*_pong_spectate(room))
+
+
+@app.websocket("/ws/pong/spectate")
+async def pong_spectate_ws(websocket: WebSocket, room_id: str) -> None:
+    room = await _pong_room_async(room_id)
+    if room is None:
+        await websocket.close(code=1008)
+        return
+    await _spectate_ws(websocket, *await asyncio.to_thread(_pong_spectate, room))
@@ -3,7 +3,7 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import time
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from arcade_utils import (
     C_BLACK,
@@ -16,7 +16,6 @@ from arcade_utils import (
     C_WHITE,
     C_YELLOW,
     Renderer,
-    apply_theme,
     beep,
     check_terminal_size,
     clear_screen,
@@ -29,7 +28,7 @@ from error_handler import safe_game_call
 from input_handler import get_safe_input_handler
 from logger_setup import setup_logger
 from sound_engine import start_background_music, stop_background_music
-from stats_manager import get_stats_manager
+from stats_manager import get_stats_manager, level_progress
 
 logger = setup_logger()
 
@@ -177,26 +176,30 @@ def _format_time(seconds: int) -> str:
 
 def draw_profile() -> None:
     """Render the high-score and XP profile."""
-    mgr = get_stats_manager()
-    settings = mgr.get_settings()
-    player_name = settings.get('player_name', 'RETRO_MASTER')
+    stats = get_stats_manager().get_stats()
+    player_name = stats['settings'].get('player_name', 'RETRO_MASTER')
     term_width, _ = get_terminal_size()
     box_width = min(50, term_width - 4)
 
-    total_score = 0
-    total_played = 0
-    for game in GAMES:
-        total_score += mgr.get_high_score(game)
-        total_played += mgr.get_game_play_count(game)
+    def high_score(game: str) -> int:
+        game_stats = stats['games'].get(game, {})
+        return game_stats.get('high_score', game_stats.get('best_score', 0))
+
+    def sessions(game: str) -> Dict[str, Any]:
+        return stats['sessions'].get(game, {'plays': 0, 'seconds': 0})
+
+    total_score = sum(high_score(g) for g in GAMES)
+    total_played = sum(sessions(g)['plays'] for g in GAMES)
 
-    level, xp, progress = mgr.get_level_and_xp()
-    achievements = mgr.get_unlocked_achievements()
+    level, xp = stats['level'], stats['total_xp']
+    progress = level_progress(level, xp)
+    achievements = stats['achievements']
     bar_width = 20
     filled = int(progress * bar_width)
     xp_bar = f"[{C_GREEN}{u_safe('█', '#') * filled}{C_BLACK}{u_safe('░', '-') * (bar_width - filled)}{C_WHITE}]"
     level_bar = f"[{C_YELLOW}{u_safe('★', '*') * (level % 5)}{C_WHITE}]"
 
-    total_time = sum(mgr.get_game_total_time(g) for g in GAMES)
+    total_time = sum(sessions(g)['seconds'] for g in GAMES)
 
     profile_lines: list[str] = [
         f"LV:{level} {level_bar} XP:{xp} {xp_bar}",
@@ -208,9 +211,9 @@ def draw_profile() -> None:
     game_entries = [(g, u_safe(GAME_ICONS[g], GAME_ICON_FALLBACK[g])) for g in GAMES]
 
     for gname, icon in game_entries:
-        hs = mgr.get_high_score(gname)
-        pc = mgr.get_game_play_count(gname)
-        gt = _format_time(mgr.get_game_total_time(gname))
+        hs = high_score(gname)
+        pc = sessions(gname)['plays']
+        gt = _format_time(sessions(gname)['seconds'])
         profile_lines.append(f"{icon} {hs:>6}  {pc:>2}pl  {gt}")
 
     if achievements:
@@ -328,41 +331,70 @@ def select_game_difficulty() -> Optional[str]:
         time.sleep(0.05)
 
 
+def _online_boards(limit: int = 4) -> List[Optional[str]]:
+    """Online boards worth warming: the global one, then recently played games."""
+    recent = [g for g in get_stats_manager().recent_games(limit * 2) if g in GAMES]
+    return [None] + recent[:limit]
+
+
 def show_online_leaderboard() -> None:
-    """Display online (global) leaderboard."""
+    """Display online (global) leaderboard.
+
+    Boards come from the local cache straight away; stale ones are
+    refreshed in the background for the next visit.
+    """
     from arcade_utils import get_key
 
-    clear_screen()
-    print("\n" * 2)
-
-    if not olb.health_check():
-        lines = [f"{C_RED}Online leaderboard unavailable.{C_RESET}",
-                 f"{C_WHITE}The server may be offline or your{C_RESET}",
-                 f"{C_WHITE}internet connection is down.{C_RESET}"]
-        draw_retro_box(40, "🌐 ONLINE LEADERBOARD", lines, color=C_RED)
-        print("\n" + " " * 28 + f"{C_WHITE}[Any Key] Back{C_RESET}")
-        get_key()
-        return
+    cache = olb.get_leaderboard_cache()
+    boards = _online_boards()
+    index = 0
+    while True:
+        game = boards[index]
+        cached = cache.get(game)
+        if cached is None:
+            # Never fetched: nothing to show until the first fetch lands.
+            clear_screen()
+            print("\n" * 2 + " " * 28 + f"{C_WHITE}Loading...{C_RESET}")
+            cache.wait(olb.TIMEOUT)
+            cached = cache.get(game)
 
-    entries = olb.fetch_leaderboard(limit=20)
-    if not entries:
-        lines = [f"{C_YELLOW}No scores submitted yet!{C_RESET}",
-                 f"{C_WHITE}Play a game and your score will{C_RESET}",
-                 f"{C_WHITE}automatically upload.{C_RESET}"]
-        draw_retro_box(40, "🌐 ONLINE LEADERBOARD", lines, color=C_YELLOW)
-    else:
-        lines: list[str] = []
-        for i, e in enumerate(entries):
-            rank = e.get('rank', i + 1)
-            medal = {1: '🥇', 2: '🥈', 3: '🥉'}.get(rank, f"{rank:>2}.")
-            name = e.get('player_name', '?')[:12]
-            score = e.get('score', 0)
-            game = e.get('game_name', '')
-            entry = f"{medal} {C_GREEN}{name:<10}{C_RESET}:{C_YELLOW}{score:>6}{C_RESET} {C_CYAN}{game:<10}{C_RESET}"
-            lines.append(entry)
-        draw_retro_box(40, "🌐 GLOBAL HALL OF FAME", lines, color=C_YELLOW)
-    print("\n" + " " * 28 + f"{C_WHITE}[Any Key] Back{C_RESET}")
-    get_key()
+        clear_screen()
+        print("\n" * 2)
+        title = "🌐 GLOBAL HALL OF FAME" if game is None else f"🌐 {game.replace('_', ' ').upper()}"
+        if cached is None:
+            lines = [f"{C_RED}Online leaderboard unavailable.{C_RESET}",
+                     f"{C_WHITE}The server may be offline or your{C_RESET}",
+                     f"{C_WHITE}internet connection is down.{C_RESET}"]
+            draw_retro_box(40, "🌐 ONLINE LEADERBOARD", lines, color=C_RED)
+        else:
+            entries, age = cached
+            if not entries:
+                lines = [f"{C_YELLOW}No scores submitted yet!{C_RESET}",
+                         f"{C_WHITE}Play a game and your score will{C_RESET}",
+                         f"{C_WHITE}automatically upload.{C_RESET}"]
+            else:
+                lines = []
+                for i, e in enumerate(entries):
+                    rank = e.get('rank', i + 1)
+                    medal = {1: '🥇', 2: '🥈', 3: '🥉'}.get(rank, f"{rank:>2}.")
+                    name = e.get('player_name', '?')[:12]
+                    score = e.get('score', 0)
+                    game_name = e.get('game_name', '')
+                    entry = f"{medal} {C_GREEN}{name:<10}{C_RESET}:{C_YELLOW}{score:>6}{C_RESET} {C_CYAN}{game_name:<10}{C_RESET}"
+                    lines.append(entry)
+            status = "offline, saved" if cache.reachable is False else "updated"
+            lines.append(f"{C_WHITE}{status} {_format_time(int(age))} ago{C_RESET}")
+            draw_retro_box(40, title, lines, color=C_YELLOW)
+        hint = "[N] Next  [R] Refresh  [Any Key] Back" if len(boards) > 1 else "[R] Refresh  [Any Key] Back"
+        print("\n" + " " * 20 + f"{C_WHITE}{hint}{C_RESET}")
+
+        key = get_key()
+        if key and key.lower() == 'n' and len(boards) > 1:
+            index = (index + 1) % len(boards)
+        elif key and key.lower() == 'r':
+            cache.refresh(game)
+        else:
+            return
 
 
 def show_leaderboard() -> None:
@@ -443,7 +475,6 @@ def show_settings() -> None:
             new_theme = theme_names[(idx + 1) % len(theme_names)]
             mgr.set_setting('theme', new_theme)
             mgr.save()
-            apply_theme()
             beep("correct")
         elif key and key.lower() == 'q':
             break
@@ -729,7 +760,7 @@ def _play_and_submit(game_func, game_name: str, difficulty: Optional[str]) -> No
             mgr.unlock_achievement("level_10")
     if result and result.get('high_score', 0) > 0:
         name = mgr.get_settings().get('player_name', 'RETRO_MASTER')
-        olb.submit_score(name, game_key, result['high_score'], difficulty or 'normal')
+        olb.queue_score(name, game_key, result['high_score'], difficulty or 'normal')
 
 
 def main() -> None:
@@ -751,11 +782,21 @@ def main() -> None:
     # Record app start telemetry
     mgr = get_stats_manager()
     mgr.record_telemetry('app_start', 'arcade')
+    # Upload any scores left in the outbox by earlier sessions.
+    olb.get_score_sync()
 
     # Start background music
     start_background_music(bpm=120)
 
+    online_boards: List[Optional[str]] = []
+    boards_checked = 0.0
+
     while True:
+        # Keep the online boards of recently played games warm while the menu is open.
+        if time.monotonic() - boards_checked > 30:
+            online_boards = _online_boards()
+            boards_checked = time.monotonic()
+        olb.get_leaderboard_cache().prefetch(online_boards)
         renderer.render_frame(lambda: print_menu(selection, renderer))
         key = input_handler.get_safe_key()
 
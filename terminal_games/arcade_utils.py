@@ -131,9 +131,7 @@ THEMES: Dict[str, Dict[str, str]] = {
 
 def apply_theme() -> None:
     """Update all Color objects based on current setting in StatsManager."""
-    mgr = get_stats_manager()
-    settings = mgr.get_settings()
-    theme_name = settings.get('theme', 'classic')
+    theme_name = get_stats_manager().get_setting('theme', 'classic')
     theme = THEMES.get(theme_name, THEMES['classic'])
 
     C_RED.value = theme['red']
@@ -147,8 +145,15 @@ def apply_theme() -> None:
     C_GRAY.value = theme.get('gray', "\033[90m")
 
 
+def _theme_setting_changed(key: str, value: Any) -> None:
+    if key == 'theme':
+        apply_theme()
+
+
 try:
     apply_theme()
+    # Recolour as soon as the theme setting changes, wherever it is changed from.
+    get_stats_manager().on_settings_change(_theme_setting_changed)
 except (AttributeError, KeyError, TypeError):
     pass
 
@@ -127,6 +127,7 @@ class BaseGame(ABC):
             state = self.save_state_json()
             if state:
                 self.stats_manager.save_game_state(self.game_name, state)
+            self.stats_manager.flush()
             self.game_over = True
             return True
         return False
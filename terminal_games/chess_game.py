@@ -80,6 +80,7 @@ class ChessGame(BaseGame):
         self.my_color = my_color
         self._last_known_moves = 0
         self._poll_failures = 0
+        self._long_poll = True
 
         # Init Stockfish engine if available
         if _STOCKFISH_PATH and CHESS_AVAILABLE:
@@ -328,8 +329,21 @@ class ChessGame(BaseGame):
                 elif direction == 'right':
                     self.cursor_x = min(7, self.cursor_x + 1)
         else:
-            # Poll server for opponent's move
-            state = network_game.get_chess_game_state(self.room_id, self.player_name)
+            # Wait on the server for the opponent's move
+            state = None
+            if self._long_poll:
+                try:
+                    state = network_game.wait_chess_moves(self.room_id, self._last_known_moves)
+                except network_game.LongPollUnsupported:
+                    # An older server: poll the full state from now on.
+                    self._long_poll = False
+            # Only an answered long poll already waited on the server.
+            waited = state is not None
+            if state is None:
+                # Transient long-poll failures leave _long_poll on; it is retried next turn.
+                state = network_game.get_chess_game_state(self.room_id, self.player_name)
+                if state is not None:
+                    state = dict(state, moves=state.get("moves", [])[self._last_known_moves:])
             if state is None:
                 self._poll_failures += 1
                 if self._poll_failures > 150:  # ~30 seconds of failures
@@ -338,14 +352,8 @@ class ChessGame(BaseGame):
                     return
             else:
                 self._poll_failures = 0
-                if state.get("status") == "finished":
-                    if state.get("winner"):
-                        winner = state["winner"]
-                        show_popup(f"{winner.upper()} wins!", C_GREEN if winner == self.my_color else C_RED)
-                    self.game_over = True
-                    return
-                if len(state.get("moves", [])) > self._last_known_moves:
-                    new_moves = state["moves"][self._last_known_moves:]
+                new_moves = state.get("moves", [])
+                if new_moves:
                     for move_uci in new_moves:
                         try:
                             move = chess.Move.from_uci(move_uci)
@@ -356,8 +364,16 @@ class ChessGame(BaseGame):
                                 logger.warning(f"Invalid remote move: {move_uci}")
                         except Exception as e:
                             logger.warning(f"Failed to apply remote move {move_uci}: {e}")
-                    self._last_known_moves = len(state["moves"])
+                    self._last_known_moves += len(new_moves)
                     self.score += 5
+                if state.get("status") == "finished":
+                    if state.get("winner"):
+                        winner = state["winner"]
+                        show_popup(f"{winner.upper()} wins!", C_GREEN if winner == self.my_color else C_RED)
+                    self.game_over = True
+                    return
+                if waited:
+                    return
             time.sleep(0.2)
 
     def _handle_online_selection(self) -> None:
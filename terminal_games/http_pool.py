@@ -0,0 +1,329 @@
+"""Shared HTTP client — pooled keep-alive connections and a circuit breaker.
+
+``urllib.request.urlopen`` opens a new connection (and TLS session) for
+every call. :data:`client` keeps idle connections per server and reuses
+them, pipelines a batch of requests over one connection, and refuses
+calls to a server that keeps failing until it has had time to recover.
+"""
+
+import collections
+import http.client
+import json
+import logging
+import ssl
+import threading
+import time
+import urllib.parse
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = 5
+# Idle connections per server. Extras are closed on release.
+MAX_IDLE = 4
+# Drop idle connections before the server does (uvicorn closes them after 5 s).
+IDLE_SECONDS = 4.0
+
+# What a server closing an idle keep-alive connection looks like to us.
+_STALE = (ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+Origin = Tuple[str, str, int]
+
+
+class HTTPError(OSError):
+    """The server answered with an error status."""
+
+    def __init__(self, status: int, body: bytes = b"") -> None:
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.body = body
+
+
+class CircuitOpenError(OSError):
+    """The server failed repeatedly; calls are refused until the backoff runs out."""
+
+
+class Response:
+    """Status, headers and the fully read body of one response."""
+
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: http.client.HTTPMessage, body: bytes) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode())
+
+
+class CircuitBreaker:
+    """Stops calls to a failing server, then probes it with backoff.
+
+    Closed: calls go through. ``threshold`` consecutive failures (connection
+    errors or 5xx) open it, and calls fail fast. Once ``backoff`` seconds have
+    passed, one trial call is let through. Success closes the breaker. Failure
+    reopens it with the backoff doubled, up to ``max_backoff``.
+    """
+
+    def __init__(self, threshold: int = 3, backoff: float = 1.0, max_backoff: float = 30.0,
+                 clock=time.monotonic) -> None:
+        self.threshold = threshold
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.failures = 0
+        self.backoff = backoff
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._trial or self.clock() - self.opened_at >= self.backoff:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or self.clock() - self.opened_at < self.backoff:
+                return False
+            self._trial = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.backoff = self.base_backoff
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial:
+                self._trial = False
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                self.opened_at = self.clock()
+            elif self.opened_at is None and self.failures >= self.threshold:
+                self.opened_at = self.clock()
+
+
+class _SharedReader:
+    """One buffered reader for every response on a pipelined connection.
+
+    ``HTTPResponse`` calls ``makefile`` on what it is given and closes the
+    file once the body is read. A fresh file per response could buffer the
+    start of the next response and lose it, so all of them share this one,
+    and closing it is left to the pipeline.
+    """
+
+    def __init__(self, sock) -> None:
+        self._fp = sock.makefile("rb")
+
+    def makefile(self, mode: str) -> "_SharedReader":
+        return self
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._fp, name)
+
+    def close(self) -> None:
+        pass
+
+
+def _split(url: str) -> Tuple[Origin, str]:
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Unsupported URL: {url}")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    return (parts.scheme, parts.hostname, port), path
+
+
+class HTTPClient:
+    """Keep-alive connections per server, shared across threads.
+
+    Every call borrows an idle connection for its server, or opens one, and
+    returns it to the pool after reading the whole response. A reused
+    connection the server has meanwhile closed is retried once on a fresh
+    one. Errors surface as ``OSError``: ``HTTPError`` for 4xx/5xx answers,
+    ``CircuitOpenError`` while the server's breaker is open.
+    """
+
+    def __init__(self, timeout: float = TIMEOUT, max_idle: int = MAX_IDLE,
+                 idle_seconds: float = IDLE_SECONDS, ssl_context: Optional[ssl.SSLContext] = None) -> None:
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle_seconds = idle_seconds
+        self._ssl_context = ssl_context
+        self._idle: Dict[Origin, Deque[Tuple[http.client.HTTPConnection, float]]] = {}
+        self._breakers: Dict[Origin, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.opened = 0  # connections opened, for tests and benchmarks
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """The circuit breaker guarding the server ``url`` points at."""
+        return self._breaker(_split(url)[0])
+
+    def _breaker(self, origin: Origin) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(origin)
+            if breaker is None:
+                breaker = self._breakers[origin] = CircuitBreaker()
+            return breaker
+
+    def _acquire(self, origin: Origin, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        conn = None
+        with self._lock:
+            idle = self._idle.get(origin)
+            while idle:
+                candidate, since = idle.pop()
+                if now - since < self.idle_seconds:
+                    conn = candidate
+                    break
+                candidate.close()
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        scheme, host, port = origin
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        self.opened += 1
+        return conn, False
+
+    def _release(self, origin: Origin, conn: http.client.HTTPConnection, will_close: bool) -> None:
+        if not will_close:
+            with self._lock:
+                idle = self._idle.setdefault(origin, collections.deque())
+                if len(idle) < self.max_idle:
+                    idle.append((conn, time.monotonic()))
+                    return
+        conn.close()
+
+    def _guarded(self, origin: Origin, send) -> List[Response]:
+        breaker = self._breaker(origin)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{origin[1]}:{origin[2]} is failing; backing off")
+        try:
+            responses = send()
+        except http.client.HTTPException as e:
+            breaker.failure()
+            raise ConnectionError(f"Bad HTTP response: {e!r}") from e
+        except OSError:
+            breaker.failure()
+            raise
+        if any(r.status >= 500 for r in responses):
+            breaker.failure()
+        else:
+            breaker.success()
+        for r in responses:
+            if r.status >= 400:
+                raise HTTPError(r.status, r.body)
+        return responses
+
+    def request(self, method: str, url: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> Response:
+        """Send one request and return its response, read in full."""
+        origin, path = _split(url)
+        timeout = self.timeout if timeout is None else timeout
+
+        def send() -> List[Response]:
+            for attempt in range(2):
+                conn, reused = self._acquire(origin, timeout)
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                    resp = conn.getresponse()
+                    data = resp.read()
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    if reused and attempt == 0 and isinstance(e, _STALE):
+                        continue
+                    raise
+                self._release(origin, conn, resp.will_close)
+                return [Response(resp.status, resp.msg, data)]
+
+        return self._guarded(origin, send)[0]
+
+    def get(self, url: str, timeout: Optional[float] = None) -> Response:
+        return self.request("GET", url, timeout=timeout)
+
+    def post(self, url: str, body: bytes = b"", content_type: str = "application/json",
+             timeout: Optional[float] = None) -> Response:
+        return self.request("POST", url, body, {"Content-Type": content_type}, timeout)
+
+    def pipeline(self, requests: List[Tuple[str, str, Optional[bytes]]],
+                 timeout: Optional[float] = None) -> List[Response]:
+        """Send ``(method, url, body)`` requests back to back on one connection.
+
+        The responses come back in order, so the batch costs one round trip
+        instead of one per request. All URLs must point at the same server.
+        """
+        origins = {_split(url)[0] for _, url, _ in requests}
+        if len(origins) != 1:
+            raise ValueError("Pipelined requests must share one server")
+        origin = origins.pop()
+        timeout = self.timeout if timeout is None else timeout
+        wire = bytearray()
+        for method, url, body in requests:
+            body = body or b""
+            wire += (f"{method} {_split(url)[1]} HTTP/1.1\r\nHost: {origin[1]}:{origin[2]}\r\n"
+                     f"Accept-Encoding: identity\r\nContent-Length: {len(body)}\r\n\r\n").encode("latin-1")
+            wire += body
+
+        def send() -> List[Response]:
+            for attempt in range(2):
+                conn, reused = self._acquire(origin, timeout)
+                responses: List[Response] = []
+                will_close = False
+                reader = None
+                try:
+                    if conn.sock is None:
+                        conn.connect()
+                    conn.sock.sendall(wire)
+                    reader = _SharedReader(conn.sock)
+                    for method, _, _ in requests:
+                        resp = http.client.HTTPResponse(reader, method=method)
+                        resp.begin()
+                        responses.append(Response(resp.status, resp.msg, resp.read()))
+                        if resp.will_close:
+                            will_close = True
+                            break
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    if reused and attempt == 0 and not responses and isinstance(e, _STALE):
+                        continue
+                    raise
+                finally:
+                    if reader is not None:
+                        reader._fp.close()
+                if len(responses) < len(requests):
+                    conn.close()
+                    raise ConnectionError(f"Server closed the connection after {len(responses)} "
+                                          f"of {len(requests)} pipelined requests")
+                self._release(origin, conn, will_close)
+                return responses
+
+        return self._guarded(origin, send)
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for conn, _ in idle:
+                conn.close()
+
+
+# Shared by network_game and online_leaderboard.
+client = HTTPClient()
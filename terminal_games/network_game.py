@@ -1,27 +1,39 @@
 """Network multiplayer client — communicates with the chess relay server."""
 
+import base64
+import hashlib
 import json
 import logging
-import urllib.error
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
 import urllib.parse
-import urllib.request
 from typing import Any, Dict, Optional
 
+import http_pool
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_SERVER = "https://retro-arcade-leaderboard.onrender.com"
 TIMEOUT = 5
+# How long the server may hold a chess long-poll open, in seconds.
+CHESS_WAIT = 20
 
 
 class NetworkError(Exception):
     """Raised when a network operation fails."""
 
 
-def _get(url: str) -> Optional[Dict[str, Any]]:
+class LongPollUnsupported(NetworkError):
+    """The server has no chess long-poll endpoint (it predates it)."""
+
+
+def _get(url: str, timeout: float = TIMEOUT) -> Optional[Dict[str, Any]]:
     try:
-        req = urllib.request.Request(url)
-        resp = urllib.request.urlopen(req, timeout=TIMEOUT)
-        return json.loads(resp.read().decode())
+        return http_pool.client.get(url, timeout=timeout).json()
     except Exception as e:
         logger.debug(f"Network GET failed: {e}")
         return None
@@ -29,14 +41,7 @@ def _get(url: str) -> Optional[Dict[str, Any]]:
 
 def _post(url: str, data: str) -> Optional[Dict[str, Any]]:
     try:
-        req = urllib.request.Request(
-            url,
-            data=data.encode(),
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            method="POST",
-        )
-        resp = urllib.request.urlopen(req, timeout=TIMEOUT)
-        return json.loads(resp.read().decode())
+        return http_pool.client.post(url, data.encode(), "application/x-www-form-urlencoded", TIMEOUT).json()
     except Exception as e:
         logger.debug(f"Network POST failed: {e}")
         return None
@@ -89,6 +94,33 @@ def get_chess_game_state(
     )
 
 
+def wait_chess_moves(
+    room_id: str,
+    since: int,
+    server: str = DEFAULT_SERVER,
+    wait: float = CHESS_WAIT,
+) -> Optional[Dict[str, Any]]:
+    """Block until the room has moves after the first ``since``, or the game ends.
+
+    Returns only the new moves; an empty list means ``wait`` ran out first.
+    Returns None on a failure worth retrying (timeout, 5xx, 429, open
+    circuit) and raises :class:`LongPollUnsupported` when the server
+    answers 404 or 405, as one without the endpoint does.
+    """
+    try:
+        return http_pool.client.get(
+            f"{server}/api/chess/wait?room_id={room_id}&since={since}&timeout={wait}",
+            timeout=wait + TIMEOUT,
+        ).json()
+    except http_pool.HTTPError as e:
+        if e.status in (404, 405):
+            raise LongPollUnsupported(f"HTTP {e.status} from /api/chess/wait") from e
+        logger.debug(f"Chess long-poll failed: {e}")
+    except Exception as e:
+        logger.debug(f"Chess long-poll failed: {e}")
+    return None
+
+
 def resign_chess(
     room_id: str,
     player_name: str,
@@ -126,6 +158,18 @@ def join_pong_room(
     )
 
 
+def _pong_paddle_url(room_id: str, player_name: str, direction: str, server: str) -> str:
+    return (f"{server}/api/pong/paddle?room_id={room_id}&player_name={urllib.parse.quote(player_name)}"
+            f"&direction={urllib.parse.quote(direction)}")
+
+
+def _pong_state_url(room_id: str, player_name: str, server: str, ack: Optional[int]) -> str:
+    url = f"{server}/api/pong/state?room_id={room_id}&player_name={urllib.parse.quote(player_name)}"
+    if ack is not None:
+        url += f"&encoding=json&ack={ack}"
+    return url
+
+
 def send_pong_paddle(
     room_id: str,
     player_name: str,
@@ -133,21 +177,44 @@ def send_pong_paddle(
     server: str = DEFAULT_SERVER,
 ) -> Optional[Dict[str, Any]]:
     """Send paddle direction to the server."""
-    return _post(
-        f"{server}/api/pong/paddle?room_id={room_id}&player_name={urllib.parse.quote(player_name)}&direction={urllib.parse.quote(direction)}",
-        "",
-    )
+    return _post(_pong_paddle_url(room_id, player_name, direction, server), "")
 
 
 def get_pong_state(
     room_id: str,
     player_name: str,
     server: str = DEFAULT_SERVER,
+    ack: Optional[int] = None,
 ) -> Optional[Dict[str, Any]]:
-    """Get the current Pong game state from the server."""
-    return _get(
-        f"{server}/api/pong/state?room_id={room_id}&player_name={urllib.parse.quote(player_name)}",
-    )
+    """Get the current Pong game state from the server.
+
+    With ``ack`` the server answers with a delta against that snapshot;
+    feed it to :class:`PongSnapshots` to rebuild the full state.
+    """
+    return _get(_pong_state_url(room_id, player_name, server, ack))
+
+
+def send_pong_paddle_and_get_state(
+    room_id: str,
+    player_name: str,
+    direction: str,
+    server: str = DEFAULT_SERVER,
+    ack: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """Send the paddle direction and fetch the state in one round trip.
+
+    The two requests are pipelined on one connection. Returns the state,
+    as :func:`get_pong_state` would, or None if either request fails.
+    """
+    try:
+        _, state = http_pool.client.pipeline([
+            ("POST", _pong_paddle_url(room_id, player_name, direction, server), b""),
+            ("GET", _pong_state_url(room_id, player_name, server, ack), None),
+        ])
+        return state.json()
+    except Exception as e:
+        logger.debug(f"Network pipeline failed: {e}")
+        return None
 
 
 def forfeit_pong(
@@ -160,3 +227,281 @@ def forfeit_pong(
         f"{server}/api/pong/forfeit?room_id={room_id}&player_name={urllib.parse.quote(player_name)}",
         "",
     )
+
+
+# ── Pong WebSocket transport ──────────────────────────────────────────
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_OP_TEXT, _OP_CLOSE, _OP_PING, _OP_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+class _WebSocket:
+    """Minimal RFC 6455 client: text frames, ping/pong and close only."""
+
+    def __init__(self, url: str, timeout: float = TIMEOUT) -> None:
+        parts = urllib.parse.urlsplit(url)
+        secure = parts.scheme == "wss"
+        host = parts.hostname or ""
+        port = parts.port or (443 if secure else 80)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+        sock = socket.create_connection((host, port), timeout=timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        self._send_lock = threading.Lock()
+        self._buf = b""
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        sock.sendall(request.encode())
+        while b"\r\n\r\n" not in self._buf:
+            self._fill()
+        head, self._buf = self._buf.split(b"\r\n\r\n", 1)
+        lines = head.decode("latin-1").split("\r\n")
+        if " 101 " not in lines[0] + " ":
+            sock.close()
+            raise NetworkError(f"WebSocket upgrade refused: {lines[0]}")
+        expected = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        headers = {k.strip().lower(): v.strip() for k, _, v in (ln.partition(":") for ln in lines[1:])}
+        if headers.get("sec-websocket-accept") != expected:
+            sock.close()
+            raise NetworkError("WebSocket upgrade returned a bad accept key")
+        sock.settimeout(None)
+
+    def _fill(self) -> None:
+        chunk = self._sock.recv(65536)
+        if not chunk:
+            raise NetworkError("WebSocket connection closed")
+        self._buf += chunk
+
+    def _read(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            self._fill()
+        data, self._buf = self._buf[:n], self._buf[n:]
+        return data
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        header = bytes([0x80 | opcode])
+        n = len(payload)
+        if n < 126:
+            header += bytes([0x80 | n])
+        elif n < 65536:
+            header += bytes([0x80 | 126]) + struct.pack("!H", n)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", n)
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        with self._send_lock:
+            self._sock.sendall(header + mask + masked)
+
+    def send_text(self, text: str) -> None:
+        self._send_frame(_OP_TEXT, text.encode())
+
+    def recv_text(self) -> Optional[str]:
+        """Block for the next text message. Returns None once the server closes."""
+        message = b""
+        while True:
+            b0, b1 = self._read(2)
+            opcode = b0 & 0x0F
+            n = b1 & 0x7F
+            if n == 126:
+                n = struct.unpack("!H", self._read(2))[0]
+            elif n == 127:
+                n = struct.unpack("!Q", self._read(8))[0]
+            payload = self._read(n)
+            if opcode == _OP_PING:
+                self._send_frame(_OP_PONG, payload)
+            elif opcode == _OP_CLOSE:
+                return None
+            elif opcode != _OP_PONG:
+                message += payload
+                if b0 & 0x80:
+                    return message.decode()
+
+    def close(self) -> None:
+        try:
+            self._send_frame(_OP_CLOSE, struct.pack("!H", 1000))
+        except OSError:
+            pass
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+
+# Must match PONG_SNAPSHOT_FIELDS on the server.
+_SNAPSHOT_FIELDS = (
+    ("ball_x", "f"), ("ball_y", "f"), ("my_paddle_y", "f"), ("opponent_paddle_y", "f"),
+    ("my_score", "B"), ("opponent_score", "B"), ("status", "s"), ("winner", "s"),
+    ("side", "s"), ("paddle_size", "B"), ("width", "H"), ("height", "H"),
+    ("ball_dx", "f"), ("ball_dy", "f"), ("tick", "I"), ("tick_seconds", "f"),
+)
+_SNAPSHOT_HEADER = struct.Struct("<IIH")
+
+
+def decode_pong_snapshot(data: bytes) -> Dict[str, Any]:
+    """Turn a binary snapshot frame into the JSON delta shape."""
+    seq, base, mask = _SNAPSHOT_HEADER.unpack_from(data)
+    offset = _SNAPSHOT_HEADER.size
+    changes: Dict[str, Any] = {}
+    for bit, (name, code) in enumerate(_SNAPSHOT_FIELDS):
+        if not mask & (1 << bit):
+            continue
+        if code == "s":
+            n = data[offset]
+            changes[name] = data[offset + 1:offset + 1 + n].decode()
+            offset += 1 + n
+        else:
+            (value,) = struct.unpack_from("<" + code, data, offset)
+            changes[name] = round(value, 3) if code == "f" else value
+            offset += struct.calcsize(code)
+    return {"seq": seq, "base": base or None, "changes": changes}
+
+
+class PongSnapshots:
+    """Rebuilds full Pong state from the server's delta snapshots."""
+
+    def __init__(self) -> None:
+        self.seq = 0
+        self.state: Optional[Dict[str, Any]] = None
+
+    def apply(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Fold one message in and return the resulting full state."""
+        if "changes" not in message:
+            # Full state from a server without snapshot support.
+            self.state = message
+            return message
+        base = message.get("base")
+        if base is None:
+            state: Dict[str, Any] = {}
+        elif base == self.seq and self.state is not None:
+            state = dict(self.state)
+        else:
+            # Diffed against a snapshot we never saw; ask for a full one.
+            self.seq = 0
+            return self.state
+        state.update(message["changes"])
+        self.seq = message["seq"]
+        self.state = state
+        return state
+
+
+class PongTransport:
+    """Paddle and state channel for one online Pong match.
+
+    Prefers a WebSocket, where the server pushes state every tick and
+    paddle changes go up as small messages. If the socket cannot be
+    opened, or drops mid-game, it falls back to HTTP polling, where the
+    paddle direction rides along with the next state poll. Both channels
+    carry snapshot deltas, rebuilt by :class:`PongSnapshots`.
+    """
+
+    HTTP_PADDLE_INTERVAL = 0.05
+
+    def __init__(self, room_id: str, player_name: str, server: str = DEFAULT_SERVER,
+                 use_websocket: bool = True) -> None:
+        self.room_id = room_id
+        self.player_name = player_name
+        self.server = server
+        self.mode = "http"
+        self._ws: Optional[_WebSocket] = None
+        self._state: Optional[Dict[str, Any]] = None
+        self._state_lock = threading.Lock()
+        self._snapshots = PongSnapshots()
+        self._last_direction: Optional[str] = None
+        self._pending_direction: Optional[str] = None
+        self._last_http_send = 0.0
+        if use_websocket:
+            self._open_websocket()
+
+    def _ws_url(self) -> str:
+        base = self.server.replace("https://", "wss://", 1).replace("http://", "ws://", 1)
+        query = urllib.parse.urlencode({"room_id": self.room_id, "player_name": self.player_name,
+                                        "encoding": "json"})
+        return f"{base}/ws/pong?{query}"
+
+    def _open_websocket(self) -> None:
+        try:
+            self._ws = _WebSocket(self._ws_url())
+        except (OSError, NetworkError) as e:
+            logger.debug(f"Pong WebSocket unavailable, polling over HTTP: {e}")
+            return
+        self.mode = "websocket"
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def _reader(self) -> None:
+        ws = self._ws
+        try:
+            while ws is not None:
+                text = ws.recv_text()
+                if text is None:
+                    break
+                with self._state_lock:
+                    if self._ws is not ws:
+                        return
+                    state = self._state = self._snapshots.apply(json.loads(text))
+                if state and state.get("status") == "finished":
+                    break
+        except (OSError, NetworkError, ValueError) as e:
+            logger.debug(f"Pong WebSocket dropped: {e}")
+        if not (self._state and self._state.get("status") == "finished"):
+            self._fall_back_to_http(ws)
+
+    def _fall_back_to_http(self, ws: Optional[_WebSocket]) -> None:
+        """Drop the socket ``ws`` and poll over HTTP from here on."""
+        with self._state_lock:
+            if ws is None or self._ws is not ws:
+                return
+            self._ws = None
+            # Sequence numbers are per connection; start HTTP from a full snapshot.
+            self._snapshots.seq = 0
+            self.mode = "http"
+        ws.close()
+
+    def send_paddle(self, direction: str) -> None:
+        """Report the paddle direction. Cheap to call every frame."""
+        ws = self._ws
+        if self.mode == "websocket" and ws is not None:
+            if direction != self._last_direction:
+                try:
+                    ws.send_text(json.dumps({"direction": direction}))
+                    self._last_direction = direction
+                except OSError as e:
+                    logger.debug(f"Pong WebSocket send failed: {e}")
+                    self._fall_back_to_http(ws)
+            return
+        now = time.time()
+        if now - self._last_http_send > self.HTTP_PADDLE_INTERVAL:
+            # Pipelined with the next state poll: one round trip for both.
+            self._pending_direction = direction
+            self._last_http_send = now
+
+    def latest_state(self) -> Optional[Dict[str, Any]]:
+        """Most recent room state: pushed over the socket, or polled over HTTP."""
+        if self.mode == "websocket":
+            with self._state_lock:
+                return self._state
+        direction, self._pending_direction = self._pending_direction, None
+        if direction is None:
+            message = get_pong_state(self.room_id, self.player_name, self.server, ack=self._snapshots.seq)
+        else:
+            message = send_pong_paddle_and_get_state(self.room_id, self.player_name, direction, self.server,
+                                                     ack=self._snapshots.seq)
+        if message is None:
+            return None
+        with self._state_lock:
+            return self._snapshots.apply(message)
+
+    def close(self) -> None:
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            ws.close()
@@ -2,15 +2,25 @@
 
 import json
 import logging
-import urllib.error
+import queue
+import random
+import sqlite3
+import threading
+import time
 import urllib.parse
-import urllib.request
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import http_pool
+from stats_manager import StatsManager, get_stats_manager
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_SERVER = "https://retro-arcade-leaderboard.onrender.com"
 TIMEOUT = 5
+# Scores per /api/scores/bulk request (the server takes up to 500).
+SYNC_BATCH = 100
+# Cached online boards older than this are refetched in the background.
+LEADERBOARD_TTL = 60.0
 
 
 def submit_score(
@@ -28,19 +38,20 @@ def submit_score(
             "score": score,
             "difficulty": difficulty,
         }).encode()
-        req = urllib.request.Request(
-            f"{server}/api/scores",
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
-        urllib.request.urlopen(req, timeout=TIMEOUT)
+        http_pool.client.post(f"{server}/api/scores", data, timeout=TIMEOUT)
         return True
-    except (urllib.error.URLError, urllib.error.HTTPError, OSError) as e:
+    except OSError as e:
         logger.debug(f"Online leaderboard unavailable: {e}")
         return False
 
 
+def _fetch_leaderboard(game_name: Optional[str], limit: int, server: str) -> List[Dict[str, Any]]:
+    url = f"{server}/api/leaderboard?limit={limit}"
+    if game_name:
+        url += f"&game_name={urllib.parse.quote(game_name)}"
+    return http_pool.client.get(url, timeout=TIMEOUT).json()
+
+
 def fetch_leaderboard(
     game_name: Optional[str] = None,
     limit: int = 10,
@@ -48,13 +59,8 @@ def fetch_leaderboard(
 ) -> List[Dict[str, Any]]:
     """Fetch global leaderboard from the server."""
     try:
-        url = f"{server}/api/leaderboard?limit={limit}"
-        if game_name:
-            url += f"&game_name={urllib.parse.quote(game_name)}"
-        req = urllib.request.Request(url)
-        resp = urllib.request.urlopen(req, timeout=TIMEOUT)
-        return json.loads(resp.read().decode())
-    except (urllib.error.URLError, urllib.error.HTTPError, OSError, json.JSONDecodeError) as e:
+        return _fetch_leaderboard(game_name, limit, server)
+    except (OSError, ValueError) as e:
         logger.debug(f"Online leaderboard fetch failed: {e}")
         return []
 
@@ -62,8 +68,268 @@ def fetch_leaderboard(
 def health_check(server: str = DEFAULT_SERVER) -> bool:
     """Check if the leaderboard server is reachable."""
     try:
-        req = urllib.request.Request(f"{server}/health")
-        resp = urllib.request.urlopen(req, timeout=TIMEOUT)
-        return resp.status == 200
-    except (urllib.error.URLError, OSError):
+        return http_pool.client.get(f"{server}/health", timeout=TIMEOUT).status == 200
+    except OSError:
         return False
+
+
+# ── Background score upload ──────────────────────────────────────────
+
+_SCORE_FIELDS = ("player_name", "game_name", "score", "difficulty")
+
+
+class ScoreSync:
+    """Uploads the score outbox from a background thread.
+
+    Scores go to the ``score_outbox`` table in the player database first, so
+    the player never waits on the network and nothing is lost while the
+    server is down. The thread posts them to ``/api/scores/bulk`` in batches
+    and deletes each batch once the server accepts it. After a failure it
+    waits with exponential backoff (``backoff`` doubling to ``max_backoff``,
+    with jitter) and ignores new scores until the wait is over.
+
+    Delivery is at least once: if a response is lost, the batch is sent again.
+    Scores the server rejects as invalid (a 4xx other than 429) are dropped
+    from the outbox and counted in ``rejected``.
+    """
+
+    def __init__(self, manager: StatsManager, server: str = DEFAULT_SERVER,
+                 backoff: float = 5.0, max_backoff: float = 600.0) -> None:
+        self.manager = manager
+        self.server = server
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.delay = 0.0
+        self.rejected = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="score-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Stop the thread. Unsent scores stay in the outbox for next time."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, player_name: str, game_name: str, score: int, difficulty: str = "normal") -> None:
+        """Queue a score and return at once."""
+        self.manager.queue_score(player_name, game_name, score, difficulty)
+        self._wake.set()
+
+    def sync_once(self) -> int:
+        """Upload everything pending. Returns how many scores the server accepted.
+
+        Raises ``OSError`` when the server cannot take them; whatever was not
+        delivered stays queued. Rejected scores are not counted here but in
+        ``rejected``.
+        """
+        sent = 0
+        while True:
+            rows = self.manager.pending_scores(SYNC_BATCH)
+            if not rows:
+                return sent
+            payload = json.dumps([{k: r[k] for k in _SCORE_FIELDS} for r in rows]).encode()
+            try:
+                http_pool.client.post(f"{self.server}/api/scores/bulk", payload, timeout=TIMEOUT)
+            except http_pool.HTTPError as e:
+                if e.status == 429 or e.status >= 500:
+                    raise
+                # One invalid score rejects the whole batch: send them singly.
+                rejected = self._submit_each(rows)
+                if rejected:
+                    self.rejected += rejected
+                    logger.warning(f"Server rejected {rejected} of {len(rows)} queued scores; dropped them")
+                sent += len(rows) - rejected
+            else:
+                self.manager.remove_scores([r["id"] for r in rows])
+                sent += len(rows)
+
+    def _submit_each(self, rows: List[Dict[str, Any]]) -> int:
+        """Post ``rows`` one at a time. Returns how many the server rejected."""
+        done: List[int] = []
+        rejected = 0
+        try:
+            for row in rows:
+                try:
+                    http_pool.client.post(f"{self.server}/api/scores",
+                                          json.dumps({k: row[k] for k in _SCORE_FIELDS}).encode(),
+                                          timeout=TIMEOUT)
+                except http_pool.HTTPError as e:
+                    if e.status == 429 or e.status >= 500:
+                        raise
+                    logger.warning(f"Server rejected queued score {row}: HTTP {e.status}")
+                    rejected += 1
+                done.append(row["id"])
+        finally:
+            self.manager.remove_scores(done)
+        return rejected
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                self._wake.clear()
+                try:
+                    sent = self.sync_once()
+                    if sent:
+                        logger.debug(f"Uploaded {sent} queued scores")
+                    self.delay = 0.0
+                except (OSError, sqlite3.Error) as e:
+                    self.delay = min(self.max_backoff, self.delay * 2 if self.delay else self.backoff)
+                    logger.debug(f"Score upload failed, retrying in {self.delay:.0f}s: {e}")
+                if self.delay:
+                    self._stop.wait(self.delay * random.uniform(0.5, 1.0))
+                else:
+                    self._wake.wait()
+        finally:
+            self.manager.close_thread_connection()
+
+
+_sync: Optional[ScoreSync] = None
+
+
+def get_score_sync() -> ScoreSync:
+    """The shared :class:`ScoreSync`, started on first use."""
+    global _sync
+    if _sync is None:
+        _sync = ScoreSync(get_stats_manager())
+        _sync.start()
+    return _sync
+
+
+def queue_score(player_name: str, game_name: str, score: int, difficulty: str = "normal") -> None:
+    """Save a score for the online leaderboard without waiting on the network."""
+    get_score_sync().submit(player_name, game_name, score, difficulty)
+
+
+# ── Cached leaderboards ──────────────────────────────────────────────
+
+class LeaderboardCache:
+    """Online boards cached in the player database and refreshed in the background.
+
+    :meth:`get` never waits on the network. It returns whatever is cached,
+    however old, and if that is older than ``ttl`` it also queues a refresh
+    (stale-while-revalidate). :meth:`prefetch` warms a list of boards the
+    same way, so the menu can fetch the boards of recently played games
+    before the player opens them. Refreshes run one at a time on a worker
+    thread that exits when idle.
+    """
+
+    # After a failed fetch, prefetch leaves the board alone this long.
+    RETRY_SECONDS = 15.0
+
+    def __init__(self, manager: StatsManager, server: str = DEFAULT_SERVER,
+                 ttl: float = LEADERBOARD_TTL, limit: int = 20) -> None:
+        self.manager = manager
+        self.server = server
+        self.ttl = ttl
+        self.limit = limit
+        # Whether the last fetch reached the server; None until one has run.
+        self.reachable: Optional[bool] = None
+        self._fetched: Dict[str, float] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._queued: Set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(game_name: Optional[str]) -> str:
+        return game_name or "*"
+
+    def get(self, game_name: Optional[str] = None) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """Cached entries and their age in seconds, or None if never fetched."""
+        key = self._key(game_name)
+        cached = self.manager.get_cached_leaderboard(key)
+        if cached is None:
+            self._fetched[key] = 0.0
+            self._schedule(key)
+            return None
+        entries, fetched_at = cached
+        self._fetched[key] = fetched_at
+        age = max(0.0, time.time() - fetched_at)
+        if age >= self.ttl:
+            self._schedule(key)
+        return entries, age
+
+    def prefetch(self, game_names: Iterable[Optional[str]]) -> None:
+        """Queue refreshes for any of these boards that are missing or stale."""
+        now = time.time()
+        for game_name in game_names:
+            key = self._key(game_name)
+            if key not in self._fetched:
+                cached = self.manager.get_cached_leaderboard(key)
+                self._fetched[key] = cached[1] if cached else 0.0
+            if now - self._fetched[key] >= self.ttl:
+                self._schedule(key)
+
+    def refresh(self, game_name: Optional[str] = None) -> bool:
+        """Fetch one board now and cache it. Returns False if the server was unreachable."""
+        key = self._key(game_name)
+        try:
+            entries = _fetch_leaderboard(game_name, self.limit, self.server)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Online leaderboard fetch failed: {e}")
+            self.reachable = False
+            retry_from = time.time() - self.ttl + self.RETRY_SECONDS
+            self._fetched[key] = max(self._fetched.get(key, 0.0), retry_from)
+            return False
+        self.manager.cache_leaderboard(key, entries)
+        self._fetched[key] = time.time()
+        self.reachable = True
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        """Block until queued refreshes finish. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queued:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def _schedule(self, key: str) -> None:
+        with self._lock:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+            self._queue.put(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="leaderboard-prefetch", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    try:
+                        key = self._queue.get_nowait()
+                    except queue.Empty:
+                        self._thread = None
+                        return
+                try:
+                    self.refresh(None if key == "*" else key)
+                except sqlite3.Error as e:
+                    logger.debug(f"Could not cache online leaderboard: {e}")
+                finally:
+                    with self._lock:
+                        self._queued.discard(key)
+        finally:
+            self.manager.close_thread_connection()
+
+
+_leaderboards: Optional[LeaderboardCache] = None
+
+
+def get_leaderboard_cache() -> LeaderboardCache:
+    """The shared :class:`LeaderboardCache`."""
+    global _leaderboards
+    if _leaderboards is None:
+        _leaderboards = LeaderboardCache(get_stats_manager())
+    return _leaderboards
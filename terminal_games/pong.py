@@ -6,6 +6,7 @@ Classic table tennis — play against AI or online opponent.
 import logging
 import random
 import time
+from typing import Optional
 
 import network_game
 from arcade_utils import (
@@ -30,6 +31,103 @@ from input_handler import get_safe_input_handler
 logger = logging.getLogger(__name__)
 
 
+def _fold(value: float, low: float, high: float) -> float:
+    """Reflect ``value`` back into ``[low, high]`` as a bouncing ball would."""
+    span = high - low
+    t = (value - low) % (2 * span)
+    return low + (t if t <= span else 2 * span - t)
+
+
+class PongPredictor:
+    """Client-side simulation of an online match between server snapshots.
+
+    The local paddle moves as soon as a key is held, at the server's paddle
+    speed, and is reconciled with the server's position when snapshots say
+    otherwise. The ball is extrapolated from the last snapshot's velocity,
+    bouncing off the walls like the server does, and any jump a new
+    snapshot would cause is blended out over a few frames. Coordinates are
+    the server's: ``x`` grows towards the right player.
+    """
+
+    PADDLE_SPEED = 12.0        # cells per second, as on the server
+    BALL_RATE = 30.0           # the server moves the ball ball_dx * 30 cells per second
+    MAX_EXTRAPOLATION = 0.25   # seconds; stop guessing when snapshots dry up
+    SNAP_DISTANCE = 3.0        # larger corrections jump instead of blending
+    BLEND_HALF_LIFE = 0.05     # seconds for a blended ball correction to halve
+    PADDLE_PULL = 0.5          # share of paddle error removed per snapshot while idle
+
+    def __init__(self, width: int = 80, height: int = 30, paddle_size: int = 4,
+                 tick_seconds: float = 0.033) -> None:
+        self.width = width
+        self.height = height
+        self.paddle_size = paddle_size
+        self.tick_seconds = tick_seconds
+        self.my_paddle = height / 2 - 2
+        self.opponent_paddle = height / 2 - 2
+        self._ball = (width / 2, height / 2, 0.0, 0.0, None)
+        self._origin: Optional[float] = None   # local time of server tick 0
+        self._error = (0.0, 0.0)
+        self._error_at = 0.0
+        self._direction = 'stop'
+        self._steered_at: Optional[float] = None
+
+    def steer(self, direction: str, now: float) -> None:
+        """Apply the held direction since the last call, then switch to ``direction``."""
+        if self._steered_at is not None:
+            step = self.PADDLE_SPEED * (now - self._steered_at)
+            if self._direction == 'up':
+                self.my_paddle = max(0.0, self.my_paddle - step)
+            elif self._direction == 'down':
+                self.my_paddle = min(self.height - self.paddle_size, self.my_paddle + step)
+        self._direction = direction
+        self._steered_at = now
+
+    def observe(self, state: dict, now: float) -> None:
+        """Reconcile with an authoritative snapshot received at ``now``."""
+        self.width = state.get('width', self.width)
+        self.height = state.get('height', self.height)
+        self.paddle_size = state.get('paddle_size', self.paddle_size)
+        self.tick_seconds = state.get('tick_seconds', self.tick_seconds)
+        tick = state.get('tick')
+        if tick is not None:
+            origin = now - tick * self.tick_seconds
+            if self._origin is None or origin < self._origin:
+                self._origin = origin
+            else:
+                # Follow a server that has fallen behind, slowly enough to ignore jitter.
+                self._origin += (origin - self._origin) * 0.01
+
+        before = self.ball_position(now)
+        self._ball = (state.get('ball_x', self._ball[0]), state.get('ball_y', self._ball[1]),
+                      state.get('ball_dx', 0.0), state.get('ball_dy', 0.0), tick)
+        self._error = (0.0, 0.0)
+        after = self.ball_position(now)
+        error = (before[0] - after[0], before[1] - after[1])
+        if abs(error[0]) < self.SNAP_DISTANCE and abs(error[1]) < self.SNAP_DISTANCE:
+            self._error = error
+            self._error_at = now
+
+        self.opponent_paddle = state.get('opponent_paddle_y', self.opponent_paddle)
+        server = state.get('my_paddle_y')
+        if server is not None:
+            diff = server - self.my_paddle
+            if abs(diff) > self.SNAP_DISTANCE:
+                self.my_paddle = server
+            elif self._direction == 'stop':
+                self.my_paddle += diff * self.PADDLE_PULL
+
+    def ball_position(self, now: float) -> tuple:
+        """Best guess of where the server's ball is at local time ``now``."""
+        x, y, dx, dy, tick = self._ball
+        if tick is not None and self._origin is not None:
+            elapsed = now - (self._origin + tick * self.tick_seconds)
+            elapsed = min(max(elapsed, 0.0), self.MAX_EXTRAPOLATION)
+            x = min(max(x + dx * self.BALL_RATE * elapsed, 2.0), self.width - 3.0)
+            y = _fold(y + dy * self.BALL_RATE * elapsed, 0.1, self.height - 1.1)
+        fade = 0.5 ** ((now - self._error_at) / self.BLEND_HALF_LIFE)
+        return x + self._error[0] * fade, y + self._error[1] * fade
+
+
 class PongGame(BaseGame):
     """Pong Game logic and rendering with AI or online opponent."""
 
@@ -288,23 +386,27 @@ class PongGame(BaseGame):
             return True
 
     def _play_online(self, input_handler) -> None:
-        """Online game loop — pulls state from server."""
-        last_send = 0.0
-        while not self.game_over:
-            now = time.time()
+        """Online game loop — state is pushed over WebSocket, or polled over HTTP."""
+        transport = network_game.PongTransport(self.room_id, self.player_name)
+        try:
+            self._online_loop(input_handler, transport)
+        finally:
+            transport.close()
 
-            # Send paddle direction every 50ms
-            if now - last_send > 0.05:
-                direction = input_handler.get_direction() or "stop"
-                network_game.send_pong_paddle(self.room_id, self.player_name, direction)
-                last_send = now
+    def _online_loop(self, input_handler, transport) -> None:
+        predictor = PongPredictor()
+        last_state = None
+        while not self.game_over:
+            now = time.monotonic()
+            direction = input_handler.get_direction() or "stop"
+            transport.send_paddle(direction)
+            predictor.steer(direction, now)
 
-            # Poll server state at ~15fps
-            state = network_game.get_pong_state(self.room_id, self.player_name)
+            state = transport.latest_state()
             if state:
-                self._server_ball_x = state.get("ball_x", self._server_ball_x)
-                self._server_ball_y = state.get("ball_y", self._server_ball_y)
-                self._server_opponent_paddle = state.get("opponent_paddle_y", self._server_opponent_paddle)
+                if state is not last_state:
+                    predictor.observe(state, now)
+                    last_state = state
                 self._server_my_score = state.get("my_score", 0)
                 self._server_opponent_score = state.get("opponent_score", 0)
                 if state.get("status") == "finished":
@@ -318,7 +420,14 @@ class PongGame(BaseGame):
                     break
                 self.score = self._server_my_score * 10
 
-            # Render using server state
+            # Render the predicted state; the board is drawn from our side
+            ball_x, self._server_ball_y = predictor.ball_position(now)
+            if self.my_side == "right":
+                ball_x = predictor.width - 1 - ball_x
+            self._server_ball_x = ball_x
+            self.paddle_pos = predictor.my_paddle
+            self.paddle_size = predictor.paddle_size
+            self._server_opponent_paddle = predictor.opponent_paddle
             self.renderer.render_frame(self._render_online)
 
             # Check for forfeit
@@ -334,7 +443,7 @@ class PongGame(BaseGame):
             time.sleep(0.05)
 
     def _render_online(self) -> None:
-        """Render the Pong board using server state."""
+        """Render the Pong board using predicted server state."""
         lines: list[str] = []
         lines.append(
             f" YOU: {C_YELLOW}{self._server_my_score}{C_RESET}  "
@@ -188,9 +188,7 @@ def _play_file(path: str) -> None:
 
 def play_sound(event: str = "correct") -> None:
     """Play a synthesized sound effect."""
-    mgr = get_stats_manager()
-    settings = mgr.get_settings()
-    if not settings.get('sound_enabled', True):
+    if not get_stats_manager().get_setting('sound_enabled', True):
         return
     try:
         wav = _get_wav(event)
@@ -209,6 +207,13 @@ def play_sound(event: str = "correct") -> None:
 
 _music_thread: Optional[threading.Thread] = None
 _music_stop = threading.Event()
+# Set to cut the music loop's wait short: on stop, and when sound is toggled.
+_music_wake = threading.Event()
+
+
+def _sound_setting_changed(key: str, value: object) -> None:
+    if key == 'sound_enabled':
+        _music_wake.set()
 
 
 def _music_worker(bpm: int = 120) -> None:
@@ -236,11 +241,10 @@ def _music_worker(bpm: int = 120) -> None:
             loop_duration += beat_dur * 2
 
     while not _music_stop.is_set():
-        mgr = get_stats_manager()
-        settings = mgr.get_settings()
-        if settings.get('sound_enabled', True):
+        if get_stats_manager().get_setting('sound_enabled', True):
             _play_wav(_build_wav(wav_data))
-        _music_stop.wait(loop_duration)
+        _music_wake.wait(loop_duration)
+        _music_wake.clear()
 
 
 def start_background_music(bpm: int = 120) -> None:
@@ -248,6 +252,8 @@ def start_background_music(bpm: int = 120) -> None:
     global _music_thread, _music_stop
     stop_background_music()
     _music_stop.clear()
+    _music_wake.clear()
+    get_stats_manager().on_settings_change(_sound_setting_changed)
     _music_thread = threading.Thread(target=_music_worker, args=(bpm,), daemon=True)
     _music_thread.start()
 
@@ -255,6 +261,7 @@ def start_background_music(bpm: int = 120) -> None:
 def stop_background_music() -> None:
     """Stop background music."""
     _music_stop.set()
+    _music_wake.set()
     global _music_thread
     if _music_thread and _music_thread.is_alive():
         _music_thread.join(timeout=1)
@@ -3,15 +3,119 @@ Centralized player statistics manager using SQLite.
 Provides persistent storage, queries, time-series tracking.
 """
 
+import atexit
 import logging
 import os
 import sqlite3
+import threading
 import time
+import weakref
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Pending XP is written at most this long after it was awarded.
+XP_FLUSH_SECONDS = 1.0
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 10000",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Schema changes in the order they were made; a database's PRAGMA
+# user_version counts how many it has had. Append, never edit: a database
+# already past a step will not see a changed version of it. Tables that
+# predate the list were created with CREATE TABLE IF NOT EXISTS, so an
+# unversioned database may hold any of them and the early steps say so too.
+MIGRATIONS: Tuple[Tuple[str, ...], ...] = (
+    # 1: the original tables.
+    (
+        """CREATE TABLE IF NOT EXISTS profile (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS games (
+            game_name TEXT NOT NULL,
+            stat_key TEXT NOT NULL,
+            stat_value INTEGER DEFAULT 0,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (game_name, stat_key)
+        )""",
+        """CREATE TABLE IF NOT EXISTS achievements (
+            achievement_id TEXT PRIMARY KEY,
+            unlocked_at REAL NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS settings (
+            setting_key TEXT PRIMARY KEY,
+            setting_value TEXT NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS play_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_name TEXT NOT NULL,
+            score INTEGER DEFAULT 0,
+            xp_earned INTEGER DEFAULT 0,
+            duration_seconds REAL DEFAULT 0,
+            difficulty TEXT DEFAULT 'normal',
+            played_at REAL NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS telemetry_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            payload TEXT DEFAULT '',
+            created_at REAL NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS game_states (
+            game_name TEXT PRIMARY KEY,
+            state_json TEXT NOT NULL,
+            saved_at REAL NOT NULL
+        )""",
+    ),
+    # 2: the online score outbox and leaderboard cache.
+    (
+        """CREATE TABLE IF NOT EXISTS leaderboard_cache (
+            cache_key TEXT PRIMARY KEY,
+            entries_json TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS score_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_name TEXT NOT NULL,
+            game_name TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            difficulty TEXT DEFAULT 'normal',
+            created_at REAL NOT NULL
+        )""",
+    ),
+    # 3: play_sessions indexes and the per-game rollup kept by record_session.
+    (
+        "CREATE INDEX IF NOT EXISTS idx_play_sessions_game_score ON play_sessions (game_name, score DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_play_sessions_played_at ON play_sessions (played_at)",
+        """CREATE TABLE IF NOT EXISTS game_summary (
+            game_name TEXT PRIMARY KEY,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            total_seconds REAL NOT NULL DEFAULT 0,
+            best_score INTEGER NOT NULL DEFAULT 0,
+            last_played REAL NOT NULL DEFAULT 0
+        )""",
+        "INSERT OR REPLACE INTO game_summary "
+        "SELECT game_name, COUNT(*), COALESCE(SUM(duration_seconds), 0), MAX(score), MAX(played_at) "
+        "FROM play_sessions GROUP BY game_name",
+    ),
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _connect(path: str, **kwargs: Any) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, **kwargs)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 
 class StatsManager:
     """Player statistics manager backed by SQLite."""
@@ -20,56 +124,46 @@ class StatsManager:
 
     def __init__(self) -> None:
         """Initialize and ensure schema exists."""
-        os.makedirs(os.path.dirname(self.DB_PATH), exist_ok=True)
-        self.conn = sqlite3.connect(self.DB_PATH, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self._init_schema()
+        # Fixed at construction: background threads must reach this file even if DB_PATH changes later.
+        self.db_path = self.DB_PATH
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = _connect(self.db_path, check_same_thread=False)
+        self._owner = threading.get_ident()
+        self._local = threading.local()
+        # XP awarded but not yet written; see add_xp.
+        self._pending_xp = 0
+        # (total_xp, level) as last read or written; see _saved_xp.
+        self._xp_saved: Optional[Tuple[int, int]] = None
+        self._xp_lock = threading.RLock()
+        self._flusher: Optional[threading.Thread] = None
+        # In-memory copy of the settings table; see get_settings.
+        self._settings: Optional[Dict[str, Any]] = None
+        self.settings_version = 0
+        self._settings_listeners: List[Callable[[str, Any], None]] = []
+        self._migrate()
         self._ensure_defaults()
-
-    def _init_schema(self) -> None:
-        """Create all required tables if they don't exist."""
-        with self.conn:
-            self.conn.executescript("""
-                CREATE TABLE IF NOT EXISTS profile (
-                    key TEXT PRIMARY KEY,
-                    value TEXT NOT NULL
-                );
-                CREATE TABLE IF NOT EXISTS games (
-                    game_name TEXT NOT NULL,
-                    stat_key TEXT NOT NULL,
-                    stat_value INTEGER DEFAULT 0,
-                    updated_at REAL NOT NULL,
-                    PRIMARY KEY (game_name, stat_key)
-                );
-                CREATE TABLE IF NOT EXISTS achievements (
-                    achievement_id TEXT PRIMARY KEY,
-                    unlocked_at REAL NOT NULL
-                );
-                CREATE TABLE IF NOT EXISTS settings (
-                    setting_key TEXT PRIMARY KEY,
-                    setting_value TEXT NOT NULL
-                );
-                CREATE TABLE IF NOT EXISTS play_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    game_name TEXT NOT NULL,
-                    score INTEGER DEFAULT 0,
-                    xp_earned INTEGER DEFAULT 0,
-                    duration_seconds REAL DEFAULT 0,
-                    difficulty TEXT DEFAULT 'normal',
-                    played_at REAL NOT NULL
-                );
-                CREATE TABLE IF NOT EXISTS telemetry_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_type TEXT NOT NULL,
-                    payload TEXT DEFAULT '',
-                    created_at REAL NOT NULL
-                );
-                CREATE TABLE IF NOT EXISTS game_states (
-                    game_name TEXT PRIMARY KEY,
-                    state_json TEXT NOT NULL,
-                    saved_at REAL NOT NULL
-                );
-            """)
+        atexit.register(_flush_at_exit, weakref.ref(self))
+
+    def _migrate(self) -> None:
+        """Apply the migrations this database has not seen yet, oldest first.
+
+        Each one commits together with its ``user_version`` bump, so an
+        interrupted upgrade resumes where it stopped on the next start.
+        """
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            logger.warning(f"Player database is at schema version {version}, newer than {SCHEMA_VERSION}")
+            return
+        for number in range(version + 1, SCHEMA_VERSION + 1):
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                # Another process starting at the same time may have got here first.
+                if self.conn.execute("PRAGMA user_version").fetchone()[0] >= number:
+                    continue
+                for sql in MIGRATIONS[number - 1]:
+                    self.conn.execute(sql)
+                self.conn.execute(f"PRAGMA user_version = {number}")
+            logger.info(f"Player database migrated to schema version {number}")
 
     def _ensure_defaults(self) -> None:
         """Insert default profile/settings rows if missing."""
@@ -95,10 +189,31 @@ class StatsManager:
                 ('theme', 'classic')
             )
 
+    def _thread_conn(self) -> sqlite3.Connection:
+        """``self.conn`` on the thread that created the manager, a private connection elsewhere.
+
+        Transactions on one shared connection interleave across threads, so
+        background workers (the score sync) get their own.
+        """
+        if threading.get_ident() == self._owner:
+            return self.conn
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = _connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def close_thread_connection(self) -> None:
+        """Close the calling background thread's private connection, if it opened one."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
     # --- Profile helpers ---
 
-    def _get_profile_int(self, key: str, default: int = 0) -> int:
-        row = self.conn.execute(
+    def _read_profile_int(self, key: str, default: int = 0) -> int:
+        row = self._thread_conn().execute(
             "SELECT value FROM profile WHERE key = ?", (key,)
         ).fetchone()
         if row is None:
@@ -108,7 +223,38 @@ class StatsManager:
         except (ValueError, TypeError):
             return default
 
+    def _saved_xp(self) -> Tuple[int, int]:
+        """Persisted (total_xp, level): read once, then kept current by flush.
+
+        Call with ``_xp_lock`` held.
+        """
+        if self._xp_saved is None:
+            self._xp_saved = (self._read_profile_int('total_xp', 0), self._read_profile_int('level', 1))
+        return self._xp_saved
+
+    def _get_profile_int(self, key: str, default: int = 0) -> int:
+        if key not in ('total_xp', 'level'):
+            return self._read_profile_int(key, default)
+        with self._xp_lock:
+            total, level = self._saved_xp()
+            if not self._pending_xp:
+                return total if key == 'total_xp' else level
+            total += self._pending_xp
+            return total if key == 'total_xp' else 1 + total // 500
+
     def _set_profile_int(self, key: str, value: int) -> None:
+        if key == 'total_xp':
+            with self._xp_lock:
+                # An absolute value supersedes awards still in memory.
+                self._pending_xp = 0
+                self._write_profile_int(key, value)
+                self._xp_saved = None
+        else:
+            self._write_profile_int(key, value)
+            if key == 'level':
+                self._xp_saved = None
+
+    def _write_profile_int(self, key: str, value: int) -> None:
         with self.conn:
             self.conn.execute(
                 "INSERT OR REPLACE INTO profile (key, value) VALUES (?, ?)",
@@ -122,6 +268,17 @@ class StatsManager:
         return row['value'] if row is not None else default
 
     def _set_profile_str(self, key: str, value: str) -> None:
+        if key == 'total_xp':
+            with self._xp_lock:
+                self._pending_xp = 0
+                self._write_profile_str(key, value)
+                self._xp_saved = None
+        else:
+            self._write_profile_str(key, value)
+            if key == 'level':
+                self._xp_saved = None
+
+    def _write_profile_str(self, key: str, value: str) -> None:
         with self.conn:
             self.conn.execute(
                 "INSERT OR REPLACE INTO profile (key, value) VALUES (?, ?)",
@@ -157,24 +314,65 @@ class StatsManager:
             )
 
     def add_xp(self, amount: int) -> int:
-        """Add XP, recalculate level, return new level."""
+        """Add XP, recalculate level, return new level.
+
+        The award stays in memory and is written behind: :meth:`flush`
+        folds every pending award into one transaction. A background thread
+        runs it within ``XP_FLUSH_SECONDS``, recording a session runs it at
+        game end, and so does interpreter exit. Reads include pending XP.
+        The saved total is held in memory too, so an award never touches SQLite.
+        """
         if amount < 0:
             logger.warning(f"Negative XP amount: {amount}")
             return self._get_profile_int('level', 1)
 
-        current = self._get_profile_int('total_xp', 0)
-        current += amount
-        self._set_profile_int('total_xp', current)
-
-        old_level = self._get_profile_int('level', 1)
-        new_level = 1 + (current // 500)
-        self._set_profile_int('level', new_level)
+        with self._xp_lock:
+            base, level = self._saved_xp()
+            if self._pending_xp:
+                old_level = 1 + (base + self._pending_xp) // 500
+            else:
+                old_level = level
+            self._pending_xp += amount
+            new_level = 1 + (base + self._pending_xp) // 500 if self._pending_xp else old_level
+            if self._pending_xp and self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="xp-flush", daemon=True)
+                self._flusher.start()
 
         if new_level > old_level:
             logger.info(f"Level up! New level: {new_level}")
 
         return new_level
 
+    def flush(self) -> None:
+        """Write pending XP and the level it implies in one transaction."""
+        with self._xp_lock:
+            if not self._pending_xp:
+                return
+            total = self._saved_xp()[0] + self._pending_xp
+            conn = self._thread_conn()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO profile (key, value) VALUES (?, ?)",
+                    [('total_xp', str(total)), ('level', str(1 + total // 500))]
+                )
+            self._xp_saved = (total, 1 + total // 500)
+            self._pending_xp = 0
+
+    def _flush_loop(self) -> None:
+        try:
+            while True:
+                time.sleep(XP_FLUSH_SECONDS)
+                with self._xp_lock:
+                    try:
+                        self.flush()
+                    except sqlite3.Error as e:
+                        logger.warning(f"Could not write XP, retrying: {e}")
+                    if not self._pending_xp:
+                        self._flusher = None
+                        return
+        finally:
+            self.close_thread_connection()
+
     def unlock_achievement(self, achievement_id: str) -> bool:
         """Unlock an achievement. Returns True if newly unlocked."""
         now = time.time()
@@ -189,7 +387,13 @@ class StatsManager:
             return False
 
     def get_stats(self, game_name: Optional[str] = None) -> Dict[str, Any]:
-        """Get overall or game-specific stats."""
+        """Get overall or game-specific stats.
+
+        The overall view is one query over the profile, achievements, per-game
+        stats and the ``game_summary`` rollup; settings come from the snapshot.
+        ``sessions`` maps each played game to its play count, seconds played,
+        best session score and last play time.
+        """
         if game_name:
             rows = self.conn.execute(
                 "SELECT stat_key, stat_value, updated_at FROM games WHERE game_name = ?",
@@ -200,45 +404,62 @@ class StatsManager:
                 result[row['stat_key']] = row['stat_value']
             return result
 
+        rows = self.conn.execute("""
+            SELECT 0 AS kind, key AS name, NULL AS stat, value, NULL AS extra, NULL AS ord FROM profile
+            UNION ALL
+            SELECT 1, achievement_id, NULL, NULL, NULL, unlocked_at FROM achievements
+            UNION ALL
+            SELECT 2, game_name, stat_key, stat_value, NULL, NULL FROM games
+            UNION ALL
+            SELECT 3, game_name, sessions, total_seconds, best_score, last_played FROM game_summary
+            ORDER BY kind, ord, name
+        """).fetchall()
         result: Dict[str, Any] = {}
-        profile_rows = self.conn.execute("SELECT key, value FROM profile").fetchall()
-        for row in profile_rows:
-            val: Any = row['value']
-            try:
-                val = int(val)
-            except (ValueError, TypeError):
+        achievements: List[str] = []
+        games: Dict[str, Dict[str, Any]] = {}
+        sessions: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            kind, name = row['kind'], row['name']
+            if kind == 0:
+                val: Any = row['value']
                 try:
-                    val = float(val)
+                    val = int(val)
                 except (ValueError, TypeError):
-                    pass
-            result[row['key']] = val
-
-        result['achievements'] = self.get_unlocked_achievements()
+                    try:
+                        val = float(val)
+                    except (ValueError, TypeError):
+                        pass
+                result[name] = val
+            elif kind == 1:
+                achievements.append(name)
+            elif kind == 2:
+                games.setdefault(name, {})[row['stat']] = row['value']
+            else:
+                sessions[name] = {
+                    'plays': row['stat'],
+                    'seconds': int(row['value']),
+                    'best_score': row['extra'],
+                    'last_played': row['ord'],
+                }
+        with self._xp_lock:
+            if self._pending_xp:
+                result['total_xp'] = int(result.get('total_xp', 0)) + self._pending_xp
+                result['level'] = 1 + result['total_xp'] // 500
+        result.setdefault('total_xp', 0)
+        result.setdefault('level', 1)
+        result.setdefault('games_played', 0)
+        result.setdefault('total_playtime', 0)
+        result['achievements'] = achievements
         result['settings'] = self.get_settings()
-        result['games'] = {}
-        game_rows = self.conn.execute(
-            "SELECT game_name, stat_key, stat_value FROM games ORDER BY game_name"
-        ).fetchall()
-        for row in game_rows:
-            gname = row['game_name']
-            if gname not in result['games']:
-                result['games'][gname] = {}
-            result['games'][gname][row['stat_key']] = row['stat_value']
-        result['games_played'] = self._get_profile_int('games_played', 0)
-        result['total_playtime'] = self._get_profile_int('total_playtime', 0)
+        result['games'] = games
+        result['sessions'] = sessions
         return result
 
     def get_level_and_xp(self) -> Tuple[int, int, float]:
         """Return (level, total_xp, progress_to_next_level)."""
         level = self._get_profile_int('level', 1)
         total_xp = self._get_profile_int('total_xp', 0)
-        xp_for_level = (level - 1) * 500
-        xp_for_next = level * 500
-        progress = 0.0
-        if xp_for_next > xp_for_level:
-            progress = (total_xp - xp_for_level) / (xp_for_next - xp_for_level)
-        progress = min(1.0, max(0.0, progress))
-        return level, total_xp, progress
+        return level, total_xp, level_progress(level, total_xp)
 
     def get_high_score(self, game_name: str) -> int:
         """Return the highest score recorded for a game."""
@@ -265,27 +486,59 @@ class StatsManager:
     # --- Settings ---
 
     def get_settings(self) -> Dict[str, Any]:
-        """Return all settings as a dict."""
-        rows = self.conn.execute("SELECT setting_key, setting_value FROM settings").fetchall()
-        settings: Dict[str, Any] = {
-            'sound_enabled': True,
-            'player_name': 'RETRO_MASTER',
-            'theme': 'classic',
-        }
-        for row in rows:
-            val: Any = row['setting_value']
-            if val.lower() in ('true', 'false'):
-                val = val.lower() == 'true'
-            settings[row['setting_key']] = val
+        """Return all settings as a dict.
+
+        Served from a snapshot read once and kept current by set_setting, so
+        sound effects and the music loop can ask on every call. The result is
+        a copy the caller may change freely.
+        """
+        return dict(self._settings_snapshot())
+
+    def get_setting(self, key: str, default: Any = None) -> Any:
+        """Return one setting from the snapshot without copying it."""
+        return self._settings_snapshot().get(key, default)
+
+    def _settings_snapshot(self) -> Dict[str, Any]:
+        settings = self._settings
+        if settings is None:
+            rows = self._thread_conn().execute("SELECT setting_key, setting_value FROM settings").fetchall()
+            settings = {
+                'sound_enabled': True,
+                'player_name': 'RETRO_MASTER',
+                'theme': 'classic',
+            }
+            for row in rows:
+                settings[row['setting_key']] = _parse_setting(row['setting_value'])
+            self._settings = settings
         return settings
 
     def set_setting(self, key: str, value: Any) -> None:
-        """Update a single setting."""
+        """Update a single setting and tell the listeners about it."""
         with self.conn:
             self.conn.execute(
                 "INSERT OR REPLACE INTO settings (setting_key, setting_value) VALUES (?, ?)",
                 (key, str(value))
             )
+        parsed = _parse_setting(str(value))
+        # Swap in a new dict so readers on other threads never see a half-updated one.
+        settings = dict(self._settings_snapshot())
+        settings[key] = parsed
+        self._settings = settings
+        self.settings_version += 1
+        for callback in list(self._settings_listeners):
+            try:
+                callback(key, parsed)
+            except Exception as e:
+                logger.error(f"Settings listener {callback!r} failed: {e}")
+
+    def on_settings_change(self, callback: Callable[[str, Any], None]) -> None:
+        """Call ``callback(key, value)`` after every set_setting."""
+        if callback not in self._settings_listeners:
+            self._settings_listeners.append(callback)
+
+    def remove_settings_listener(self, callback: Callable[[str, Any], None]) -> None:
+        if callback in self._settings_listeners:
+            self._settings_listeners.remove(callback)
 
     def save(self) -> None:
         """Commit any pending writes (no-op with auto-commit)."""
@@ -296,6 +549,7 @@ class StatsManager:
     def record_session(self, game_name: str, score: int, xp_earned: int,
                        duration: float, difficulty: str = 'normal') -> None:
         """Record a completed play session."""
+        self.flush()
         now = time.time()
         with self.conn:
             self.conn.execute(
@@ -303,6 +557,13 @@ class StatsManager:
                 "VALUES (?, ?, ?, ?, ?, ?)",
                 (game_name.lower(), score, xp_earned, duration, difficulty, now)
             )
+            self.conn.execute(
+                "INSERT INTO game_summary (game_name, sessions, total_seconds, best_score, last_played) "
+                "VALUES (?, 1, ?, ?, ?) ON CONFLICT (game_name) DO UPDATE SET "
+                "sessions = sessions + 1, total_seconds = total_seconds + excluded.total_seconds, "
+                "best_score = MAX(best_score, excluded.best_score), last_played = excluded.last_played",
+                (game_name.lower(), duration, score, now)
+            )
             total = self._get_profile_int('total_playtime', 0)
             self._set_profile_int('total_playtime', total + int(duration))
 
@@ -317,18 +578,26 @@ class StatsManager:
     def get_game_play_count(self, game_name: str) -> int:
         """Return number of play sessions for a game."""
         row = self.conn.execute(
-            "SELECT COUNT(*) as cnt FROM play_sessions WHERE game_name = ?",
+            "SELECT sessions FROM game_summary WHERE game_name = ?",
             (game_name.lower(),)
         ).fetchone()
-        return row['cnt'] if row else 0
+        return row['sessions'] if row else 0
 
     def get_game_total_time(self, game_name: str) -> int:
         """Return total seconds played for a game."""
         row = self.conn.execute(
-            "SELECT COALESCE(SUM(duration_seconds), 0) as total FROM play_sessions WHERE game_name = ?",
+            "SELECT total_seconds FROM game_summary WHERE game_name = ?",
             (game_name.lower(),)
         ).fetchone()
-        return int(row['total']) if row else 0
+        return int(row['total_seconds']) if row else 0
+
+    def recent_games(self, limit: int = 5) -> List[str]:
+        """Return the most recently played games, newest first."""
+        rows = self.conn.execute(
+            "SELECT game_name FROM game_summary ORDER BY last_played DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [r['game_name'] for r in rows]
 
     def get_game_leaderboard(self, game_name: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Return top scores for a specific game."""
@@ -356,6 +625,65 @@ class StatsManager:
         ).fetchall()
         return {r['event_type']: r['cnt'] for r in rows}
 
+    # --- Score outbox ---
+
+    def queue_score(self, player_name: str, game_name: str, score: int,
+                    difficulty: str = 'normal') -> int:
+        """Store a score for upload to the online leaderboard. Returns its outbox id."""
+        conn = self._thread_conn()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO score_outbox (player_name, game_name, score, difficulty, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (player_name, game_name, score, difficulty, time.time())
+            )
+        return cursor.lastrowid
+
+    def pending_scores(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Return the oldest scores still waiting for upload."""
+        rows = self._thread_conn().execute(
+            "SELECT * FROM score_outbox ORDER BY id LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def remove_scores(self, ids: List[int]) -> None:
+        """Drop uploaded scores from the outbox."""
+        conn = self._thread_conn()
+        with conn:
+            conn.executemany("DELETE FROM score_outbox WHERE id = ?", [(i,) for i in ids])
+
+    def outbox_size(self) -> int:
+        """Return how many scores are waiting for upload."""
+        row = self._thread_conn().execute("SELECT COUNT(*) AS cnt FROM score_outbox").fetchone()
+        return row['cnt']
+
+    # --- Online leaderboard cache ---
+
+    def get_cached_leaderboard(self, cache_key: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """Return (entries, fetched_at) for a cached online board, or None."""
+        import json
+        row = self._thread_conn().execute(
+            "SELECT entries_json, fetched_at FROM leaderboard_cache WHERE cache_key = ?",
+            (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row['entries_json']), row['fetched_at']
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return None
+
+    def cache_leaderboard(self, cache_key: str, entries: List[Dict[str, Any]]) -> None:
+        """Store a freshly fetched online board."""
+        import json
+        conn = self._thread_conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO leaderboard_cache (cache_key, entries_json, fetched_at) VALUES (?, ?, ?)",
+                (cache_key, json.dumps(entries), time.time())
+            )
+
     def save_game_state(self, game_name: str, state: Dict[str, Any]) -> None:
         """Save a game's progress state as JSON."""
         import json
@@ -396,6 +724,31 @@ class StatsManager:
         return row is not None
 
 
+def level_progress(level: int, total_xp: int) -> float:
+    """Fraction of the way from ``level`` to the next one, clamped to 0..1."""
+    xp_for_level = (level - 1) * 500
+    xp_for_next = level * 500
+    progress = 0.0
+    if xp_for_next > xp_for_level:
+        progress = (total_xp - xp_for_level) / (xp_for_next - xp_for_level)
+    return min(1.0, max(0.0, progress))
+
+
+def _parse_setting(value: str) -> Any:
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    return value
+
+
+def _flush_at_exit(ref: "weakref.ref[StatsManager]") -> None:
+    manager = ref()
+    if manager is not None:
+        try:
+            manager.flush()
+        except sqlite3.Error as e:
+            logger.error(f"Could not write XP at exit: {e}")
+
+
 # Global singleton
 _manager: Optional[StatsManager] = None
 
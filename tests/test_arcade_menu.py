@@ -64,3 +64,37 @@ class TestInvadersLock:
         locked = arcade._is_game_locked("invaders")
         unlocked_count = len(mgr.get_unlocked_achievements())
         assert locked == (unlocked_count < 5)
+
+
+class TestOnlineLeaderboard:
+    def test_renders_cached_boards_without_waiting(self, monkeypatch, capsys):
+        import arcade_utils
+        shown = []
+
+        class Cache:
+            reachable = True
+
+            def get(self, game):
+                shown.append(game)
+                return [{'rank': 1, 'player_name': 'ACE', 'score': 900, 'game_name': 'snake'}], 90.0
+
+            def wait(self, timeout):
+                raise AssertionError('a cached board must render without waiting')
+
+        keys = iter(['n', 'q'])
+        monkeypatch.setattr(arcade.olb, 'get_leaderboard_cache', lambda: Cache())
+        monkeypatch.setattr(arcade, '_online_boards', lambda: [None, 'snake'])
+        monkeypatch.setattr(arcade_utils, 'get_key', lambda: next(keys))
+        monkeypatch.setattr(arcade, 'clear_screen', lambda: None)
+        arcade.show_online_leaderboard()
+        assert shown == [None, 'snake']
+        out = capsys.readouterr().out
+        assert 'ACE' in out and 'updated 1m30s ago' in out
+
+    def test_online_boards_lists_recent_known_games(self, monkeypatch):
+        class Mgr:
+            def recent_games(self, limit):
+                return ['tetris', 'VS Mode', 'snake']
+
+        monkeypatch.setattr(arcade, 'get_stats_manager', lambda: Mgr())
+        assert arcade._online_boards() == [None, 'tetris', 'snake']
@@ -790,6 +790,75 @@ class TestChessGuard:
         assert chess_game._find_stockfish() is None
 
 
+class TestChessOnlineWait:
+    @pytest.fixture(autouse=True)
+    def requires_lib(self, monkeypatch):
+        import chess_game
+        if not chess_game.CHESS_AVAILABLE:
+            pytest.skip('requires python-chess installed')
+        monkeypatch.setattr(chess_game, 'beep', lambda *a: None)
+
+    def _game(self):
+        import chess_game
+        return chess_game.ChessGame('normal', online_mode=True, room_id='r1', player_name='Alice')
+
+    def test_opponent_move_arrives_by_long_poll(self, monkeypatch):
+        import network_game
+        waits = []
+        monkeypatch.setattr(network_game, 'wait_chess_moves',
+                            lambda room, since: waits.append(since) or {'moves': ['e2e4'], 'status': 'playing'})
+        monkeypatch.setattr(network_game, 'get_chess_game_state',
+                            lambda *a: pytest.fail('polled full state'))
+        game = self._game()
+        game._handle_online_turn(False)
+        assert waits == [0]
+        assert game._last_known_moves == 1
+        assert game.board.move_stack[-1].uci() == 'e2e4'
+
+    def test_falls_back_to_state_poll_on_older_server(self, monkeypatch):
+        import network_game
+
+        def unsupported(*a):
+            raise network_game.LongPollUnsupported('HTTP 404')
+
+        monkeypatch.setattr(network_game, 'wait_chess_moves', unsupported)
+        monkeypatch.setattr(network_game, 'get_chess_game_state',
+                            lambda *a: {'moves': ['e2e4', 'e7e5'], 'status': 'playing'})
+        game = self._game()
+        game._handle_online_turn(False)
+        assert game._long_poll is False
+        assert [m.uci() for m in game.board.move_stack] == ['e2e4', 'e7e5']
+
+    def test_timed_out_long_poll_is_retried(self, monkeypatch):
+        import chess_game
+        import network_game
+        waits = []
+        replies = [None, {'moves': ['e7e5'], 'status': 'playing'}]
+        monkeypatch.setattr(network_game, 'wait_chess_moves',
+                            lambda room, since: waits.append(since) or replies.pop(0))
+        monkeypatch.setattr(network_game, 'get_chess_game_state',
+                            lambda *a: {'moves': ['e2e4'], 'status': 'playing'})
+        sleeps = []
+        monkeypatch.setattr(chess_game.time, 'sleep', sleeps.append)
+        game = self._game()
+        game._handle_online_turn(False)
+        assert game._long_poll is True
+        assert sleeps == [0.2]  # the fallback poll still paces itself
+        game._handle_online_turn(False)
+        assert waits == [0, 1]
+        assert sleeps == [0.2]
+        assert [m.uci() for m in game.board.move_stack] == ['e2e4', 'e7e5']
+
+    def test_final_move_applied_before_game_over(self, monkeypatch):
+        import network_game
+        monkeypatch.setattr(network_game, 'wait_chess_moves', lambda *a: {
+            'moves': ['f2f3', 'e7e5', 'g2g4', 'd8h4'], 'status': 'finished', 'winner': 'black'})
+        game = self._game()
+        game._handle_online_turn(False)
+        assert game.game_over
+        assert game.board.is_checkmate()
+
+
 class TestChessEngine:
     @pytest.fixture(autouse=True)
     def requires_lib(self):
@@ -1172,7 +1241,7 @@ class TestArcadePlayAndSubmit:
         monkeypatch.setattr(arcade, '_show_game_summary', lambda *a: summaries.append(a))
         monkeypatch.setattr(arcade, 'check_and_celebrate', lambda *a: celebrated.append(a))
         monkeypatch.setattr(arcade, 'celebrate_level_up', lambda *a: None)
-        monkeypatch.setattr(arcade.olb, 'submit_score', lambda *a: submitted.append(a))
+        monkeypatch.setattr(arcade.olb, 'queue_score', lambda *a: submitted.append(a))
         arcade._play_and_submit(lambda: None, 'Snake', 'normal')
         assert 'first_game' in mgr.unlocked
         assert 'level_5' in mgr.unlocked
@@ -1203,7 +1272,7 @@ class TestArcadePlayAndSubmit:
         monkeypatch.setattr(arcade, '_check_saved_state', lambda *a: None)
         monkeypatch.setattr(arcade, 'safe_game_call', lambda func, name, **kw: {})
         monkeypatch.setattr(arcade, 'check_and_celebrate', lambda *a: celebrated.append(a))
-        monkeypatch.setattr(arcade.olb, 'submit_score', lambda *a: submitted.append(a))
+        monkeypatch.setattr(arcade.olb, 'queue_score', lambda *a: submitted.append(a))
         arcade._play_and_submit(lambda: None, 'Snake', 'hard')
         assert 'first_game' in mgr.unlocked
         assert celebrated == []
@@ -1575,6 +1644,96 @@ class TestPong:
         assert pong.play_pong_online('Bob', 'ROOM1', 'right', 'hard') == {'online': True}
 
 
+class TestPongPredictor:
+    TICK = 0.033
+
+    def _record(self, ticks=120):
+        """Server-style ball flight: fixed steps, damped wall bounces, no paddles."""
+        x, y, dx, dy = 10.0, 15.0, 0.6, 1.4
+        frames = []
+        for tick in range(ticks):
+            frames.append({'ball_x': x, 'ball_y': y, 'ball_dx': dx, 'ball_dy': dy, 'tick': tick,
+                           'tick_seconds': self.TICK, 'my_paddle_y': 13.0, 'opponent_paddle_y': 13.0,
+                           'width': 80, 'height': 30, 'paddle_size': 4})
+            x += dx * self.TICK * 30
+            y += dy * self.TICK * 30
+            if y <= 0 or y >= 29:
+                dy *= -0.95
+                y = max(0.1, min(28.9, y))
+        return frames
+
+    def _truth(self, frames, t):
+        """Ball position on the server timeline at ``t`` seconds."""
+        k = min(int(t / self.TICK), len(frames) - 2)
+        a, b = frames[k], frames[k + 1]
+        f = t / self.TICK - k
+        return a['ball_x'] + (b['ball_x'] - a['ball_x']) * f, a['ball_y'] + (b['ball_y'] - a['ball_y']) * f
+
+    def test_replayed_stream_tracks_ball_better_than_last_snapshot(self):
+        import random
+
+        import pong
+        frames = self._record()
+        rng = random.Random(1)
+        latency = 0.06
+        arrivals = []
+        for frame in frames:
+            arrivals.append(max(arrivals[-1] if arrivals else 0.0,
+                                frame['tick'] * self.TICK + latency + rng.uniform(0, 0.05)))
+
+        predictor = pong.PongPredictor()
+        naive_err, predicted_err = [], []
+        received = 0
+        t = 0.3
+        end = frames[-1]['tick'] * self.TICK
+        while t < end:
+            while received < len(frames) and arrivals[received] <= t:
+                predictor.observe(frames[received], arrivals[received])
+                received += 1
+            # Only jitter and staleness are recoverable, so judge against the
+            # server timeline as seen through the stream's base latency.
+            tx, ty = self._truth(frames, t - latency)
+            last = frames[received - 1]
+            px, py = predictor.ball_position(t)
+            naive_err.append(abs(last['ball_x'] - tx) + abs(last['ball_y'] - ty))
+            predicted_err.append(abs(px - tx) + abs(py - ty))
+            t += 1 / 60
+
+        naive = sum(naive_err) / len(naive_err)
+        predicted = sum(predicted_err) / len(predicted_err)
+        assert predicted < 0.5
+        assert predicted < naive / 3
+
+    def test_local_paddle_moves_before_server_confirms(self):
+        import pong
+        predictor = pong.PongPredictor()
+        start = predictor.my_paddle
+        predictor.steer('down', 0.0)
+        predictor.steer('down', 0.1)
+        assert predictor.my_paddle == pytest.approx(start + 1.2)
+        # A stale server position does not yank a paddle that is still moving...
+        predictor.observe({'my_paddle_y': start}, 0.1)
+        assert predictor.my_paddle == pytest.approx(start + 1.2)
+        # ...but once idle it converges, and a large disagreement snaps.
+        predictor.steer('stop', 0.2)
+        predictor.observe({'my_paddle_y': start + 2.4}, 0.2)
+        assert predictor.my_paddle == pytest.approx(start + 2.4)
+        predictor.observe({'my_paddle_y': 0.0}, 0.3)
+        assert predictor.my_paddle == 0.0
+
+    def test_without_velocity_falls_back_to_snapshot(self):
+        import pong
+        predictor = pong.PongPredictor()
+        predictor.observe({'ball_x': 12.0, 'ball_y': 5.0}, 1.0)
+        assert predictor.ball_position(1.5) == pytest.approx((12.0, 5.0), abs=1e-3)
+
+    def test_fold_reflects_off_walls(self):
+        import pong
+        assert pong._fold(-1.0, 0.0, 10.0) == 1.0
+        assert pong._fold(12.0, 0.0, 10.0) == 8.0
+        assert pong._fold(5.0, 0.0, 10.0) == 5.0
+
+
 class TestRoulette:
     def test_pick_prefers_least_played(self, monkeypatch):
         import roulette
@@ -0,0 +1,171 @@
+"""Tests for the pooled keep-alive HTTP client."""
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'terminal_games'))
+
+import http_pool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload, close=False):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if close:
+            # Hang up without announcing it, as a server dropping an idle connection does.
+            self.close_connection = True
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.path.startswith('/fail'):
+            self._reply(500, {'detail': 'boom'})
+        elif self.path.startswith('/missing'):
+            self._reply(404, {'detail': 'nope'})
+        else:
+            self._reply(200, {'method': 'GET', 'path': self.path}, close=self.path.startswith('/hangup'))
+
+    def do_POST(self):
+        self.server.requests += 1
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        self._reply(200, {'method': 'POST', 'path': self.path, 'body': body})
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.connections = 0
+    httpd.requests = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+
+class TestHTTPClient:
+    def test_reuses_one_connection(self, server):
+        httpd, url = server
+        client = http_pool.HTTPClient()
+        for i in range(5):
+            assert client.get(f'{url}/item?i={i}').json() == {'method': 'GET', 'path': f'/item?i={i}'}
+        assert client.post(f'{url}/scores', b'{"score": 1}').json()['body'] == '{"score": 1}'
+        assert client.opened == 1
+        assert httpd.connections == 1
+        client.close()
+
+    def test_pipeline_answers_in_order_on_one_connection(self, server):
+        httpd, url = server
+        client = http_pool.HTTPClient()
+        responses = client.pipeline([
+            ('POST', f'{url}/paddle?d=up', b'x'),
+            ('GET', f'{url}/state?n=1', None),
+            ('GET', f'{url}/state?n=2', None),
+        ])
+        assert [r.json()['path'] for r in responses] == ['/paddle?d=up', '/state?n=1', '/state?n=2']
+        assert responses[0].json()['body'] == 'x'
+        # The connection goes back to the pool and keeps working.
+        assert client.get(f'{url}/after').json()['path'] == '/after'
+        assert httpd.connections == 1
+        client.close()
+
+    def test_pipeline_needs_one_server(self, server):
+        _, url = server
+        with pytest.raises(ValueError):
+            http_pool.HTTPClient().pipeline([('GET', f'{url}/a', None), ('GET', 'http://127.0.0.2:1/b', None)])
+
+    def test_retries_a_connection_the_server_dropped(self, server):
+        httpd, url = server
+        client = http_pool.HTTPClient()
+        assert client.get(f'{url}/hangup').status == 200
+        assert client.get(f'{url}/again').json()['path'] == '/again'
+        assert client.opened == 2
+        assert client.breaker(url).failures == 0
+        client.close()
+
+    def test_expired_idle_connections_are_not_reused(self, server):
+        httpd, url = server
+        client = http_pool.HTTPClient(idle_seconds=0)
+        client.get(f'{url}/a')
+        client.get(f'{url}/b')
+        assert client.opened == 2
+        client.close()
+
+    def test_client_errors_raise_without_tripping_the_breaker(self, server):
+        _, url = server
+        client = http_pool.HTTPClient()
+        for _ in range(5):
+            with pytest.raises(http_pool.HTTPError) as excinfo:
+                client.get(f'{url}/missing')
+            assert excinfo.value.status == 404
+        assert client.breaker(url).state == 'closed'
+        client.close()
+
+    def test_server_errors_open_the_breaker(self, server):
+        httpd, url = server
+        client = http_pool.HTTPClient()
+        for _ in range(3):
+            with pytest.raises(http_pool.HTTPError):
+                client.get(f'{url}/fail')
+        assert client.breaker(url).state == 'open'
+        with pytest.raises(http_pool.CircuitOpenError):
+            client.get(f'{url}/ok')
+        assert httpd.requests == 3
+        client.close()
+
+    def test_unreachable_server(self, server):
+        httpd, url = server
+        httpd.shutdown()
+        httpd.server_close()
+        client = http_pool.HTTPClient(timeout=1)
+        for _ in range(3):
+            with pytest.raises(OSError):
+                client.get(f'{url}/health')
+        with pytest.raises(http_pool.CircuitOpenError):
+            client.get(f'{url}/health')
+
+
+class TestCircuitBreaker:
+    def test_backoff_doubles_until_a_trial_succeeds(self):
+        now = [0.0]
+        breaker = http_pool.CircuitBreaker(threshold=2, backoff=1.0, max_backoff=3.0, clock=lambda: now[0])
+        breaker.failure()
+        assert breaker.allow()
+        breaker.failure()
+        assert breaker.state == 'open' and not breaker.allow()
+
+        now[0] = 1.0
+        assert breaker.allow()  # the trial call
+        assert not breaker.allow()  # only one at a time
+        breaker.failure()
+        assert breaker.backoff == 2.0 and not breaker.allow()
+
+        now[0] = 3.0
+        assert breaker.allow()
+        breaker.failure()
+        assert breaker.backoff == 3.0  # capped
+
+        now[0] = 6.0
+        assert breaker.allow()
+        breaker.success()
+        assert breaker.state == 'closed' and breaker.backoff == 1.0 and breaker.allow()
@@ -2,8 +2,11 @@
 
 import os
 import sys
+import time
 from unittest.mock import patch
 
+import pytest
+
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'terminal_games'))
 
 import network_game as ng
@@ -61,6 +64,28 @@ class TestGetChessGameState:
         assert len(result['moves']) == 2
 
 
+class TestWaitChessMoves:
+    @patch.object(ng.http_pool.client, 'get')
+    def test_long_poll_outlasts_server_hold(self, mock_get):
+        mock_get.return_value.json.return_value = {'status': 'playing', 'moves': ['e7e5'], 'move_count': 2}
+        result = ng.wait_chess_moves('abc123', 1, server='http://host', wait=10)
+        assert result['moves'] == ['e7e5']
+        url = mock_get.call_args[0][0]
+        assert url == 'http://host/api/chess/wait?room_id=abc123&since=1&timeout=10'
+        assert mock_get.call_args[1]['timeout'] == 10 + ng.TIMEOUT
+
+    def test_missing_endpoint_raises(self):
+        with patch.object(ng.http_pool.client, 'get', side_effect=ng.http_pool.HTTPError(405)):
+            with pytest.raises(ng.LongPollUnsupported):
+                ng.wait_chess_moves('abc123', 0)
+
+    def test_transient_failures_return_none(self):
+        for error in (TimeoutError('timed out'), ng.http_pool.HTTPError(503), ng.http_pool.HTTPError(429),
+                      ng.http_pool.CircuitOpenError('backing off')):
+            with patch.object(ng.http_pool.client, 'get', side_effect=error):
+                assert ng.wait_chess_moves('abc123', 0) is None
+
+
 class TestResignChess:
     @patch.object(ng, '_post')
     def test_resign(self, mock_post):
@@ -68,3 +93,118 @@ class TestResignChess:
         result = ng.resign_chess('abc123', 'Player1')
         assert result['status'] == 'finished'
         assert result['winner'] == 'black'
+
+
+class TestPongTransport:
+    def test_falls_back_to_http_when_socket_fails(self):
+        with patch.object(ng, '_WebSocket', side_effect=OSError('refused')), \
+                patch.object(ng, 'get_pong_state', return_value={'status': 'playing'}) as get_state, \
+                patch.object(ng, 'send_pong_paddle_and_get_state',
+                             return_value={'status': 'playing'}) as send:
+            transport = ng.PongTransport('abc123', 'Player1', server='http://localhost:1')
+            assert transport.mode == 'http'
+            transport.send_paddle('up')
+            transport.send_paddle('down')  # throttled
+            # The paddle change is pipelined with the state poll.
+            assert transport.latest_state() == {'status': 'playing'}
+            assert send.call_count == 1
+            assert send.call_args[0][2] == 'up'
+            get_state.assert_not_called()
+            assert transport.latest_state() == {'status': 'playing'}
+            assert send.call_count == 1
+            get_state.assert_called_once()
+
+    def test_websocket_mode_uses_pushed_state(self):
+        import queue
+        import time
+
+        class FakeSocket:
+            def __init__(self, url):
+                self.url = url
+                self.sent = []
+                self.inbox = queue.Queue()
+
+            def send_text(self, text):
+                self.sent.append(text)
+
+            def recv_text(self):
+                return self.inbox.get()
+
+            def close(self):
+                self.inbox.put(None)
+
+        with patch.object(ng, '_WebSocket', FakeSocket), patch.object(ng, 'get_pong_state') as get_state:
+            transport = ng.PongTransport('abc123', 'Player One', server='https://example.com')
+            ws = transport._ws
+            assert transport.mode == 'websocket'
+            assert ws.url == 'wss://example.com/ws/pong?room_id=abc123&player_name=Player+One&encoding=json'
+
+            transport.send_paddle('down')
+            transport.send_paddle('down')  # unchanged direction is not resent
+            assert ws.sent == ['{"direction": "down"}']
+
+            ws.inbox.put('{"status": "finished", "winner": "Player One"}')
+            for _ in range(100):
+                if transport.latest_state():
+                    break
+                time.sleep(0.01)
+            assert transport.latest_state()['winner'] == 'Player One'
+            get_state.assert_not_called()
+            transport.close()
+
+
+    def test_failed_send_polls_http_from_a_full_snapshot(self):
+        class BrokenSocket:
+            closed = False
+
+            def __init__(self, url):
+                pass
+
+            def send_text(self, text):
+                raise BrokenPipeError('gone')
+
+            def recv_text(self):
+                while not self.closed:
+                    time.sleep(0.01)
+                return None
+
+            def close(self):
+                self.closed = True
+
+        with patch.object(ng, '_WebSocket', BrokenSocket), \
+                patch.object(ng, 'send_pong_paddle_and_get_state',
+                             return_value={'seq': 3, 'base': None, 'changes': {'status': 'playing'}}) as send:
+            transport = ng.PongTransport('abc123', 'Player1', server='http://localhost:1')
+            ws = transport._ws
+            transport._snapshots.seq = 41  # as far as the socket's own log had got
+            transport.send_paddle('up')
+            assert transport.mode == 'http' and transport._ws is None and ws.closed
+            transport.send_paddle('up')
+            transport.latest_state()
+            assert send.call_args[1]['ack'] == 0
+            assert transport._snapshots.seq == 3
+
+
+class TestPongSnapshots:
+    def test_rebuilds_state_from_deltas(self):
+        snaps = ng.PongSnapshots()
+        assert snaps.apply({'seq': 1, 'base': None, 'changes': {'ball_x': 1.0, 'width': 80}}) == \
+            {'ball_x': 1.0, 'width': 80}
+        assert snaps.apply({'seq': 2, 'base': 1, 'changes': {'ball_x': 2.0}}) == {'ball_x': 2.0, 'width': 80}
+        assert snaps.seq == 2
+
+    def test_unknown_base_requests_full_snapshot(self):
+        snaps = ng.PongSnapshots()
+        snaps.apply({'seq': 5, 'base': None, 'changes': {'ball_x': 1.0}})
+        assert snaps.apply({'seq': 9, 'base': 7, 'changes': {'ball_x': 3.0}}) == {'ball_x': 1.0}
+        assert snaps.seq == 0
+
+    def test_full_state_passes_through(self):
+        assert ng.PongSnapshots().apply({'status': 'playing'}) == {'status': 'playing'}
+
+    def test_decode_binary_frame(self):
+        import struct
+        frame = struct.pack('<IIH', 4, 3, 0b1000001) + struct.pack('<f', 12.34) + bytes([7]) + b'playing'
+        assert ng.decode_pong_snapshot(frame) == {
+            'seq': 4, 'base': 3, 'changes': {'ball_x': 12.34, 'status': 'playing'},
+        }
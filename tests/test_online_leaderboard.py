@@ -3,79 +3,241 @@
 import json
 import os
 import sys
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
+
+import pytest
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'terminal_games'))
 
+import http_pool
 import online_leaderboard as olb
+from stats_manager import StatsManager
 
 SERVER = "https://test-server.example.com"
 
 
+def _response(status=200, body=b''):
+    return http_pool.Response(status, {}, body)
+
+
 class TestSubmitScore:
-    @patch('urllib.request.urlopen')
-    def test_submit_success(self, mock_urlopen):
-        mock_response = MagicMock()
-        mock_response.status = 200
-        mock_urlopen.return_value = mock_response
+    @patch.object(http_pool.client, 'request')
+    def test_submit_success(self, mock_request):
+        mock_request.return_value = _response(200, b'{"status": "ok"}')
         result = olb.submit_score("PLAYER", "snake", 500, "normal", SERVER)
         assert result is True
-        mock_urlopen.assert_called_once()
+        mock_request.assert_called_once()
+        method, url, body = mock_request.call_args[0][:3]
+        assert (method, url) == ('POST', f'{SERVER}/api/scores')
+        assert json.loads(body)['score'] == 500
 
-    @patch('urllib.request.urlopen', side_effect=OSError("Connection failed"))
-    def test_submit_server_down(self, mock_urlopen):
+    @patch.object(http_pool.client, 'request', side_effect=http_pool.HTTPError(422))
+    def test_submit_rejected(self, mock_request):
+        assert olb.submit_score("PLAYER", "snake", -1, "normal", SERVER) is False
+
+    @patch.object(http_pool.client, 'request', side_effect=OSError("Connection failed"))
+    def test_submit_server_down(self, mock_request):
         result = olb.submit_score("PLAYER", "snake", 500, "normal", SERVER)
         assert result is False
 
 
 class TestFetchLeaderboard:
-    @patch('urllib.request.urlopen')
-    def test_fetch_success(self, mock_urlopen):
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps([
+    @patch.object(http_pool.client, 'request')
+    def test_fetch_success(self, mock_request):
+        mock_request.return_value = _response(200, json.dumps([
             {"rank": 1, "player_name": "PLAYER", "score": 500,
              "game_name": "snake", "difficulty": "normal", "submitted_at": 1000.0}
-        ]).encode()
-        mock_urlopen.return_value = mock_response
+        ]).encode())
         result = olb.fetch_leaderboard("snake", 10, SERVER)
         assert len(result) == 1
         assert result[0]["rank"] == 1
         assert result[0]["player_name"] == "PLAYER"
         assert result[0]["score"] == 500
 
-    @patch('urllib.request.urlopen', side_effect=OSError("Connection failed"))
-    def test_fetch_server_down(self, mock_urlopen):
+    @patch.object(http_pool.client, 'request', side_effect=OSError("Connection failed"))
+    def test_fetch_server_down(self, mock_request):
         result = olb.fetch_leaderboard("snake", 10, SERVER)
         assert result == []
 
-    @patch('urllib.request.urlopen', side_effect=OSError("Connection failed"))
-    def test_fetch_all_games_server_down(self, mock_urlopen):
+    @patch.object(http_pool.client, 'request', side_effect=http_pool.CircuitOpenError("backing off"))
+    def test_fetch_all_games_server_down(self, mock_request):
         result = olb.fetch_leaderboard(None, 10, SERVER)
         assert result == []
 
 
 class TestHealthCheck:
-    @patch('urllib.request.urlopen')
-    def test_health_ok(self, mock_urlopen):
-        mock_response = MagicMock()
-        mock_response.status = 200
-        mock_urlopen.return_value = mock_response
+    @patch.object(http_pool.client, 'request')
+    def test_health_ok(self, mock_request):
+        mock_request.return_value = _response(200)
         result = olb.health_check(SERVER)
         assert result is True
 
-    @patch('urllib.request.urlopen', side_effect=OSError("Connection failed"))
-    def test_health_fail(self, mock_urlopen):
+    @patch.object(http_pool.client, 'request', side_effect=OSError("Connection failed"))
+    def test_health_fail(self, mock_request):
         result = olb.health_check(SERVER)
         assert result is False
 
-    @patch('urllib.request.urlopen')
-    def test_health_non_200(self, mock_urlopen):
-        mock_response = MagicMock()
-        mock_response.status = 503
-        mock_urlopen.return_value.__enter__.return_value = mock_response
+    @patch.object(http_pool.client, 'request')
+    def test_health_non_200(self, mock_request):
+        mock_request.return_value = _response(204)
         result = olb.health_check(SERVER)
         assert result is False
 
+    @patch.object(http_pool.client, 'request', side_effect=http_pool.HTTPError(503))
+    def test_health_server_error(self, mock_request):
+        assert olb.health_check(SERVER) is False
+
+
+def _manager(monkeypatch, tmp_path):
+    monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+    return StatsManager()
+
+
+class TestScoreSync:
+    def test_uploads_pending_scores_in_one_bulk_request(self, monkeypatch, tmp_path):
+        manager = _manager(monkeypatch, tmp_path)
+        manager.queue_score("ACE", "snake", 120)
+        manager.queue_score("ACE", "tetris", 900, "hard")
+        sync = olb.ScoreSync(manager, SERVER)
+        with patch.object(http_pool.client, 'request', return_value=_response(200)) as mock_request:
+            assert sync.sync_once() == 2
+        method, url, body = mock_request.call_args[0][:3]
+        assert (method, url) == ('POST', f'{SERVER}/api/scores/bulk')
+        assert json.loads(body) == [
+            {"player_name": "ACE", "game_name": "snake", "score": 120, "difficulty": "normal"},
+            {"player_name": "ACE", "game_name": "tetris", "score": 900, "difficulty": "hard"},
+        ]
+        assert manager.outbox_size() == 0
+
+    def test_server_down_keeps_scores_queued(self, monkeypatch, tmp_path):
+        manager = _manager(monkeypatch, tmp_path)
+        manager.queue_score("ACE", "snake", 120)
+        sync = olb.ScoreSync(manager, SERVER)
+        for error in (OSError("Connection failed"), http_pool.HTTPError(503), http_pool.HTTPError(429)):
+            with patch.object(http_pool.client, 'request', side_effect=error):
+                with pytest.raises(OSError):
+                    sync.sync_once()
+            assert manager.outbox_size() == 1
+
+    def test_rejected_batch_is_retried_one_by_one(self, monkeypatch, tmp_path):
+        manager = _manager(monkeypatch, tmp_path)
+        manager.queue_score("ACE", "snake", 120)
+        manager.queue_score("", "snake", 5)
+        manager.queue_score("ACE", "pong", 7)
+        sync = olb.ScoreSync(manager, SERVER)
+
+        def request(method, url, body=None, headers=None, timeout=None):
+            if url.endswith('/bulk') or not json.loads(body)["player_name"]:
+                raise http_pool.HTTPError(400)
+            return _response(200)
+
+        with patch.object(http_pool.client, 'request', side_effect=request) as mock_request:
+            assert sync.sync_once() == 2
+        assert sync.rejected == 1
+        assert mock_request.call_count == 4
+        assert manager.outbox_size() == 0
+
+    def test_background_thread_backs_off_then_delivers(self, monkeypatch, tmp_path):
+        import time
+        manager = _manager(monkeypatch, tmp_path)
+        sync = olb.ScoreSync(manager, SERVER, backoff=0.02, max_backoff=0.05)
+        outcomes = [OSError("down"), OSError("down"), _response(200)]
+        delays = []
+
+        def request(*args, **kwargs):
+            delays.append(sync.delay)
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with patch.object(http_pool.client, 'request', side_effect=request):
+            sync.start()
+            try:
+                sync.submit("ACE", "snake", 120)
+                for _ in range(200):
+                    if manager.outbox_size() == 0:
+                        break
+                    time.sleep(0.01)
+            finally:
+                sync.stop()
+        assert manager.outbox_size() == 0
+        assert delays == [0.0, 0.02, 0.04]
+        assert sync.delay == 0.0
+
+    def test_queue_score_returns_without_network(self, monkeypatch, tmp_path):
+        manager = _manager(monkeypatch, tmp_path)
+        sync = olb.ScoreSync(manager, SERVER)
+        monkeypatch.setattr(olb, '_sync', sync)  # not started: nothing is sent
+        with patch.object(http_pool.client, 'request') as mock_request:
+            olb.queue_score("ACE", "snake", 120, "easy")
+        mock_request.assert_not_called()
+        assert [(r['player_name'], r['score'], r['difficulty']) for r in manager.pending_scores()] == \
+            [("ACE", 120, "easy")]
+
+
+class TestLeaderboardCache:
+    BOARD = [{"rank": 1, "player_name": "ACE", "score": 900, "game_name": "snake"}]
+
+    def _age(self, manager, key, seconds):
+        with manager.conn:
+            manager.conn.execute("UPDATE leaderboard_cache SET fetched_at = fetched_at - ? WHERE cache_key = ?",
+                                 (seconds, key))
+
+    def test_first_get_fetches_in_the_background(self, monkeypatch, tmp_path):
+        manager = _manager(monkeypatch, tmp_path)
+        cache = olb.LeaderboardCache(manager, SERVER)
+        with patch.object(http_pool.client, 'request',
+                          return_value=_response(200, json.dumps(self.BOARD).encode())) as mock_request:
+            assert cache.get("snake") is None
+            assert cache.wait(5)
+            entries, age = cache.get("snake")
+        assert entries == self.BOARD and age < 5
+        assert mock_request.call_args[0][1] == f'{SERVER}/api/leaderboard?limit=20&game_name=snake'
+        assert cache.reachable is True
+        # Persisted: a new cache over the same database starts warm.
+        with patch.object(http_pool.client, 'request') as mock_request:
+            assert olb.LeaderboardCache(manager, SERVER).get("snake")[0] == self.BOARD
+        mock_request.assert_not_called()
+
+    def test_stale_entries_are_served_while_revalidating(self, monkeypatch, tmp_path):
+        manager = _manager(monkeypatch, tmp_path)
+        manager.cache_leaderboard("*", self.BOARD)
+        self._age(manager, "*", 120)
+        cache = olb.LeaderboardCache(manager, SERVER, ttl=60)
+        fresh = [dict(self.BOARD[0], score=1000)]
+        with patch.object(http_pool.client, 'request', return_value=_response(200, json.dumps(fresh).encode())):
+            entries, age = cache.get()
+            assert entries == self.BOARD and age >= 120
+            assert cache.wait(5)
+        entries, age = cache.get()
+        assert entries == fresh and age < 60
+
+    def test_failed_refresh_keeps_the_saved_board(self, monkeypatch, tmp_path):
+        manager = _manager(monkeypatch, tmp_path)
+        manager.cache_leaderboard("snake", self.BOARD)
+        self._age(manager, "snake", 120)
+        cache = olb.LeaderboardCache(manager, SERVER, ttl=60)
+        with patch.object(http_pool.client, 'request', side_effect=OSError("down")) as mock_request:
+            cache.prefetch(["snake"])
+            assert cache.wait(5)
+            cache.prefetch(["snake"])  # backing off
+            assert cache.wait(5)
+        assert mock_request.call_count == 1
+        assert cache.reachable is False
+        assert cache.get("snake")[0] == self.BOARD
+
+    def test_prefetch_warms_only_missing_or_stale_boards(self, monkeypatch, tmp_path):
+        manager = _manager(monkeypatch, tmp_path)
+        manager.cache_leaderboard("tetris", self.BOARD)
+        cache = olb.LeaderboardCache(manager, SERVER)
+        with patch.object(http_pool.client, 'request', return_value=_response(200, b'[]')) as mock_request:
+            cache.prefetch([None, "snake", "tetris"])
+            assert cache.wait(5)
+        urls = sorted(call[0][1] for call in mock_request.call_args_list)
+        assert urls == [f'{SERVER}/api/leaderboard?limit=20', f'{SERVER}/api/leaderboard?limit=20&game_name=snake']
+        assert cache.get("snake")[0] == []
+
 
 class TestConstants:
     def test_default_server(self):
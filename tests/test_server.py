@@ -2,6 +2,7 @@
 
 import os
 import sys
+import time
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
 
@@ -21,7 +22,11 @@ else:
 @pytest.fixture(autouse=True)
 def fresh_db(tmp_path, monkeypatch):
     monkeypatch.setattr(srv, 'DB_PATH', str(tmp_path / 'test.db'))
+    # All requests here come from one TestClient; TestRateLimiting turns it back on.
+    monkeypatch.setattr(srv.rate_limiter, 'enabled', False)
+    srv.rate_limiter.reset()
     yield
+    srv.close_pools()
 
 
 class TestHealth:
@@ -31,6 +36,34 @@ class TestHealth:
         assert r.json()['status'] == 'ok'
 
 
+class TestDatabasePool:
+    def test_connection_reused_per_thread(self):
+        assert srv.get_db() is srv.get_db()
+
+    def test_wal_mode_and_schema(self):
+        conn = srv.get_db()
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {'scores', 'chess_games'} <= tables
+
+    def test_other_threads_get_own_connection(self):
+        import threading
+        seen = []
+        t = threading.Thread(target=lambda: seen.append(srv.get_db()))
+        t.start()
+        t.join()
+        assert seen[0] is not srv.get_db()
+
+    def test_old_chess_table_gains_new_columns(self):
+        import sqlite3
+        conn = sqlite3.connect(srv.DB_PATH)
+        conn.execute('CREATE TABLE chess_games (room_id TEXT PRIMARY KEY, player_white TEXT, '
+                     'player_black TEXT, winner TEXT, moves_json TEXT, created_at REAL)')
+        conn.close()
+        columns = {r[1] for r in srv.get_db().execute('PRAGMA table_info(chess_games)')}
+        assert {'fen', 'result', 'termination'} <= columns
+
+
 class TestScores:
     def test_submit_valid(self):
         r = client.post('/api/scores', json={
@@ -81,6 +114,376 @@ class TestScores:
         assert client.get('/api/my_best?player_name=nobody').json()['best'] == 0
 
 
+class TestScoreIngestion:
+    def test_bulk_submit_feeds_leaderboard(self):
+        r = client.post('/api/scores/bulk', json=[
+            {'player_name': 'amy', 'game_name': 'snake', 'score': 300},
+            {'player_name': 'bob', 'game_name': 'Snake', 'score': 700},
+        ])
+        assert r.status_code == 200
+        assert r.json()['count'] == 2
+        entries = client.get('/api/leaderboard?game_name=snake').json()
+        assert [e['score'] for e in entries] == [700, 300]
+
+    def test_bulk_rejects_invalid_entry(self):
+        r = client.post('/api/scores/bulk', json=[
+            {'player_name': 'amy', 'game_name': 'snake', 'score': 300},
+            {'player_name': 'bob', 'game_name': 'snake', 'score': -1},
+        ])
+        assert r.status_code == 400
+        assert client.get('/api/leaderboard?game_name=snake').json() == []
+
+    def test_bulk_size_limit(self):
+        body = [{'player_name': 'a', 'game_name': 'snake', 'score': 1}] * (srv.MAX_BULK_SCORES + 1)
+        assert client.post('/api/scores/bulk', json=body).status_code == 400
+
+    def test_buffered_mode_flushes_on_stop(self, monkeypatch):
+        monkeypatch.setattr(srv, 'SCORE_DURABILITY', 'buffered')
+        writer = srv.ScoreWriter(flush_rows=1000, flush_ms=60_000)
+        monkeypatch.setattr(srv, 'score_writer', writer)
+        for i in range(5):
+            client.post('/api/scores', json={'player_name': f'p{i}', 'game_name': 'snake', 'score': i})
+        assert client.get('/health').json()['score_queue_depth'] == 5
+        writer.stop()
+        assert writer.depth == 0
+        assert len(client.get('/api/leaderboard?game_name=snake').json()) == 5
+
+    def test_unexpected_flush_error_keeps_writer_running(self, monkeypatch):
+        writer = srv.ScoreWriter(flush_rows=1, flush_ms=1)
+        monkeypatch.setattr(srv, 'score_writer', writer)
+        real_write = srv._write_scores
+        calls = []
+
+        def flaky(conn, rows):
+            calls.append(rows)
+            if len(calls) == 1:
+                raise TypeError('bad row')
+            return real_write(conn, rows)
+
+        monkeypatch.setattr(srv, '_write_scores', flaky)
+        body = {'player_name': 'amy', 'game_name': 'snake', 'score': 5}
+        assert client.post('/api/scores', json=body).status_code == 503
+        assert client.post('/api/scores', json=body).status_code == 200
+        assert writer._thread.is_alive()
+        assert writer.depth == 0
+        writer.stop()
+
+    def test_stop_leaves_queue_to_a_writer_still_flushing(self, monkeypatch):
+        import threading
+        writer = srv.ScoreWriter(flush_rows=1, flush_ms=1)
+        release = threading.Event()
+        flushed = []
+        monkeypatch.setattr(srv, 'SCORE_COMMIT_TIMEOUT', 0.05)
+        monkeypatch.setattr(writer, '_flush', lambda pending: (release.wait(5), flushed.append(len(pending))))
+        writer.submit([('amy', 'snake', 1, 'normal', 0.0)])
+        writer.submit([('bob', 'snake', 2, 'normal', 0.0)])
+        writer.stop()
+        assert flushed == []  # stop() did not drain behind the busy thread's back
+        release.set()
+        writer._thread.join(5)
+        assert sum(flushed) == 2
+
+
+class TestLeaderboardCache:
+    def _sql_top(self, game_name, limit):
+        conn = srv.get_db()
+        if game_name:
+            rows = conn.execute(
+                'SELECT player_name, score FROM scores WHERE game_name = ? ORDER BY score DESC, id LIMIT ?',
+                (game_name, limit),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                'SELECT player_name, score FROM scores ORDER BY score DESC, id LIMIT ?', (limit,)
+            ).fetchall()
+        return [(r['player_name'], r['score']) for r in rows]
+
+    def test_cache_matches_sql_under_incremental_updates(self):
+        import random
+        rng = random.Random(7)
+        games = ['snake', 'tetris', 'pong']
+        # Warm the boards first so every later score goes through apply().
+        for game in games + [None]:
+            srv.leaderboard_cache.get(game)
+        for _ in range(6):
+            body = [
+                {'player_name': f'p{rng.randrange(50)}', 'game_name': rng.choice(games),
+                 'score': rng.randrange(200)}
+                for _ in range(60)
+            ]
+            assert client.post('/api/scores/bulk', json=body).status_code == 200
+            for game in games + [None]:
+                for limit in (1, 10, 100):
+                    url = f'/api/leaderboard?limit={limit}'
+                    if game:
+                        url += f'&game_name={game}'
+                    got = [(e['player_name'], e['score']) for e in client.get(url).json()]
+                    assert got == self._sql_top(game, limit)
+
+    def test_etag_returns_304_until_board_changes(self):
+        client.post('/api/scores', json={'player_name': 'amy', 'game_name': 'snake', 'score': 10})
+        r = client.get('/api/leaderboard?game_name=snake')
+        etag = r.headers['etag']
+        again = client.get('/api/leaderboard?game_name=snake', headers={'If-None-Match': etag})
+        assert again.status_code == 304
+
+        client.post('/api/scores', json={'player_name': 'bob', 'game_name': 'snake', 'score': 20})
+        changed = client.get('/api/leaderboard?game_name=snake', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['etag'] != etag
+        assert changed.json()[0]['player_name'] == 'bob'
+
+    def test_score_below_cutoff_keeps_etag(self, monkeypatch):
+        monkeypatch.setattr(srv.leaderboard_cache, 'size', 2)
+        for name, score in [('amy', 50), ('bob', 40)]:
+            client.post('/api/scores', json={'player_name': name, 'game_name': 'snake', 'score': score})
+        etag = client.get('/api/leaderboard?game_name=snake&limit=2').headers['etag']
+        client.post('/api/scores', json={'player_name': 'cat', 'game_name': 'snake', 'score': 1})
+        r = client.get('/api/leaderboard?game_name=snake&limit=2', headers={'If-None-Match': etag})
+        assert r.status_code == 304
+
+    def test_invalidate_reloads_from_sql(self):
+        client.post('/api/scores', json={'player_name': 'amy', 'game_name': 'snake', 'score': 10})
+        assert len(client.get('/api/leaderboard?game_name=snake').json()) == 1
+        with srv.get_db() as conn:
+            conn.execute('DELETE FROM scores')
+        srv.leaderboard_cache.invalidate('snake')
+        assert client.get('/api/leaderboard?game_name=snake').json() == []
+        assert client.get('/api/leaderboard').json() == []
+
+
+class TestRankedList:
+    def test_matches_sorted_reference(self):
+        import bisect
+        import random
+        rng = random.Random(3)
+        ranked = srv.RankedList()
+        ranked.LOAD = 4
+        ref = []
+        for _ in range(2000):
+            if ref and rng.random() < 0.3:
+                item = ref.pop(rng.randrange(len(ref)))
+                ranked.remove(item)
+            else:
+                item = (rng.randrange(100), rng.randrange(1000))
+                bisect.insort(ref, item)
+                ranked.add(item)
+            probe = (rng.randrange(100), rng.randrange(1000))
+            assert ranked.bisect_left(probe) == bisect.bisect_left(ref, probe)
+        assert len(ranked) == len(ref)
+        assert [ranked[i] for i in range(len(ref))] == ref
+
+    def test_remove_missing_raises(self):
+        ranked = srv.RankedList([1, 2, 3])
+        with pytest.raises(ValueError):
+            ranked.remove(5)
+
+
+class TestPlayerRank:
+    def _submit(self, name, score, game='snake'):
+        client.post('/api/scores', json={'player_name': name, 'game_name': game, 'score': score})
+
+    def test_rank_percentile_and_neighbours(self):
+        for name, score in [('amy', 500), ('bob', 300), ('cat', 100), ('dan', 300)]:
+            self._submit(name, score)
+        self._submit('bob', 50)  # lower than bob's best, ignored
+        r = client.get('/api/rank?player_name=dan&game_name=Snake').json()
+        assert r['best'] == 300
+        assert r['rank'] == 2          # tied with bob
+        assert r['total_players'] == 4
+        assert r['percentile'] == 25.0
+        assert r['above']['player_name'] == 'bob'
+        assert r['below'] == {'player_name': 'cat', 'best': 100, 'rank': 4}
+
+        top = client.get('/api/rank?player_name=amy&game_name=snake').json()
+        assert top['rank'] == 1
+        assert top['above'] is None
+
+    def test_rank_tracks_improved_best(self):
+        self._submit('amy', 500)
+        self._submit('bob', 300)
+        assert client.get('/api/rank?player_name=bob&game_name=snake').json()['rank'] == 2
+        self._submit('bob', 900)
+        r = client.get('/api/rank?player_name=bob&game_name=snake').json()
+        assert r['rank'] == 1
+        assert r['best'] == 900
+        assert r['below']['player_name'] == 'amy'
+
+    def test_rank_unknown_player(self):
+        self._submit('amy', 500)
+        assert client.get('/api/rank?player_name=zed&game_name=snake').status_code == 404
+        assert client.get('/api/rank?player_name=amy&game_name=tetris').status_code == 404
+
+
+class TestTimeWindows:
+    NOW = 1710428400.0  # Thursday 2024-03-14 15:00 UTC
+
+    def _write(self, rows):
+        conn = srv.get_db()
+        with conn:
+            srv._write_scores(conn, rows)
+
+    def test_period_start(self):
+        assert srv.period_start('day', self.NOW) == 1710374400     # 2024-03-14
+        assert srv.period_start('week', self.NOW) == 1710115200    # Monday 2024-03-11
+        assert srv.period_start('month', self.NOW) == 1709251200   # 2024-03-01
+
+    def test_window_boards_keep_best_per_player_in_period(self, monkeypatch):
+        monkeypatch.setattr(srv.time, 'time', lambda: self.NOW)
+        yesterday = self.NOW - 86400
+        self._write([
+            ('amy', 'snake', 900, 'normal', yesterday),
+            ('amy', 'snake', 200, 'normal', self.NOW - 60),
+            ('amy', 'snake', 300, 'hard', self.NOW - 30),
+            ('bob', 'snake', 250, 'normal', self.NOW - 10),
+            ('bob', 'tetris', 999, 'normal', self.NOW - 10),
+        ])
+        day = client.get('/api/leaderboard?game_name=snake&window=day').json()
+        assert [(e['player_name'], e['score'], e['rank']) for e in day] == [('amy', 300, 1), ('bob', 250, 2)]
+        assert day[0]['difficulty'] == 'hard'
+
+        week = client.get('/api/leaderboard?game_name=snake&window=week').json()
+        assert [(e['player_name'], e['score']) for e in week] == [('amy', 900), ('bob', 250)]
+
+        every_game = client.get('/api/leaderboard?window=day').json()
+        assert every_game[0]['game_name'] == 'tetris'
+        assert client.get('/api/leaderboard?window=year').status_code == 422
+
+    def test_compaction_is_opt_in(self, monkeypatch):
+        monkeypatch.setattr(srv, 'SCORE_RETENTION_DAYS', 30)
+        old = self.NOW - 90 * 86400
+        self._write([('amy', 'snake', 100, 'normal', old), ('amy', 'snake', 500, 'normal', old + 1)])
+        assert srv.compact_scores(now=self.NOW) == 0
+        assert len(client.get('/api/leaderboard?game_name=snake').json()) == 2
+
+    def test_compaction_keeps_bests_and_expires_rollups(self, monkeypatch):
+        monkeypatch.setattr(srv, 'SCORE_COMPACTION', True)
+        monkeypatch.setattr(srv, 'SCORE_RETENTION_DAYS', 30)
+        old = self.NOW - 90 * 86400
+        self._write([
+            ('amy', 'snake', 100, 'normal', old),
+            ('amy', 'snake', 500, 'normal', old + 1),
+            ('bob', 'snake', 50, 'normal', old),
+            ('bob', 'snake', 70, 'normal', self.NOW - 5),
+        ])
+        assert len(client.get('/api/leaderboard?game_name=snake').json()) == 4
+
+        assert srv.compact_scores(now=self.NOW) == 2
+        board = client.get('/api/leaderboard?game_name=snake').json()
+        assert [(e['player_name'], e['score']) for e in board] == [('amy', 500), ('bob', 70)]
+
+        conn = srv.get_db()
+        old_days = conn.execute(
+            "SELECT COUNT(*) FROM score_rollups WHERE period = 'day' AND period_start < ?",
+            (srv._rollup_cutoff('day', self.NOW),),
+        ).fetchone()[0]
+        assert old_days == 0
+        assert conn.execute("SELECT COUNT(*) FROM score_rollups WHERE period = 'day'").fetchone()[0] == 1
+
+    def test_rollups_backfilled_from_existing_scores(self, tmp_path, monkeypatch):
+        import sqlite3
+        path = str(tmp_path / 'legacy.db')
+        legacy = sqlite3.connect(path)
+        legacy.execute(
+            'CREATE TABLE scores (id INTEGER PRIMARY KEY AUTOINCREMENT, player_name TEXT NOT NULL, '
+            "game_name TEXT NOT NULL, score INTEGER NOT NULL, difficulty TEXT DEFAULT 'normal', "
+            'submitted_at REAL NOT NULL)'
+        )
+        legacy.executemany(
+            'INSERT INTO scores (player_name, game_name, score, submitted_at) VALUES (?, ?, ?, ?)',
+            [('amy', 'snake', 10, self.NOW), ('amy', 'snake', 40, self.NOW + 60), ('bob', 'snake', 5, self.NOW)],
+        )
+        legacy.commit()
+        legacy.close()
+        monkeypatch.setattr(srv, 'DB_PATH', path)
+
+        rows = srv.get_db().execute(
+            'SELECT period, period_start, player_name, best_score FROM score_rollups ORDER BY period, player_name'
+        ).fetchall()
+        expected = []
+        for period in ('day', 'month', 'week'):
+            start = srv.period_start(period, self.NOW)
+            expected += [(period, start, 'amy', 40), (period, start, 'bob', 5)]
+        assert [tuple(r) for r in rows] == expected
+        assert srv.rank_index.lookup('snake', 'amy')['rank'] == 1
+        best = srv.get_db().execute(
+            "SELECT best_score, achieved_at FROM player_best WHERE player_name = 'amy'").fetchone()
+        assert tuple(best) == (40, self.NOW + 60)
+
+    def test_backfill_skips_periods_compaction_may_have_thinned(self, tmp_path, monkeypatch):
+        import sqlite3
+        path = str(tmp_path / 'legacy.db')
+        legacy = sqlite3.connect(path)
+        legacy.execute(
+            'CREATE TABLE scores (id INTEGER PRIMARY KEY AUTOINCREMENT, player_name TEXT NOT NULL, '
+            "game_name TEXT NOT NULL, score INTEGER NOT NULL, difficulty TEXT DEFAULT 'normal', "
+            'submitted_at REAL NOT NULL)'
+        )
+        legacy.executemany(
+            'INSERT INTO scores (player_name, game_name, score, submitted_at) VALUES (?, ?, ?, ?)',
+            [('amy', 'snake', 90, self.NOW - 60 * 86400), ('amy', 'snake', 20, self.NOW - 3600),
+             ('bob', 'snake', 10, self.NOW)],
+        )
+        legacy.commit()
+        legacy.close()
+        monkeypatch.setattr(srv, 'DB_PATH', path)
+        monkeypatch.setattr(srv, 'SCORE_COMPACTION', True)
+        monkeypatch.setattr(srv, 'SCORE_RETENTION_DAYS', 30)
+        monkeypatch.setattr(srv.time, 'time', lambda: self.NOW)
+
+        rows = srv.get_db().execute(
+            "SELECT period, period_start, best_score FROM score_rollups WHERE player_name = 'amy'").fetchall()
+        cutoff = self.NOW - 30 * 86400
+        assert {r['period'] for r in rows} == {'day', 'week', 'month'}
+        assert all(r['period_start'] >= cutoff and r['best_score'] == 20 for r in rows)
+
+
+class TestPaging:
+    def _seed(self):
+        body = [
+            {'player_name': f'p{i}', 'game_name': 'snake' if i % 3 else 'tetris', 'score': (i * 37) % 50}
+            for i in range(120)
+        ]
+        client.post('/api/scores/bulk', json=body)
+
+    def _walk(self, url):
+        seen, cursor = [], None
+        while True:
+            page = client.get(url + (f'&cursor={cursor}' if cursor else '')).json()
+            seen += page['entries']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return seen
+
+    def test_cursor_walk_matches_sql_order(self):
+        self._seed()
+        rows = srv.get_db().execute(
+            "SELECT player_name, score FROM scores WHERE game_name = 'snake' ORDER BY score DESC, id"
+        ).fetchall()
+        seen = self._walk('/api/leaderboard/page?game_name=snake&limit=7')
+        assert [(e['player_name'], e['score']) for e in seen] == [tuple(r) for r in rows]
+        assert [e['rank'] for e in seen] == list(range(1, len(rows) + 1))
+
+    def test_global_walk_covers_every_row(self):
+        self._seed()
+        seen = self._walk('/api/leaderboard/page?limit=50')
+        assert len(seen) == 120
+        assert len({e['player_name'] for e in seen}) == 120
+        assert [e['score'] for e in seen] == sorted((e['score'] for e in seen), reverse=True)
+
+    def test_invalid_cursor(self):
+        assert client.get('/api/leaderboard/page?cursor=not-a-cursor').status_code == 400
+
+    def test_export_streams_ndjson(self, monkeypatch):
+        import json
+        monkeypatch.setattr(srv, 'EXPORT_CHUNK', 16)
+        self._seed()
+        r = client.get('/api/leaderboard/export?game_name=snake')
+        assert r.headers['content-type'].startswith('application/x-ndjson')
+        lines = [json.loads(line) for line in r.text.splitlines()]
+        assert lines == self._walk('/api/leaderboard/page?game_name=snake&limit=500')
+
+
 class TestChessRooms:
     def test_create_join_move_and_state(self):
         r = client.post('/api/chess/create_room?player_name=Alice')
@@ -103,7 +506,7 @@ class TestChessRooms:
         assert ok.json()['move_number'] == 1
 
         state = client.get(f'/api/chess/game_state?room_id={room_id}&player_name=Alice').json()
-        assert state['last_move'] == 'e4'
+        assert state['last_move'] == 'e2e4'
         assert state['turn'] == 'black'
 
     def test_cannot_join_own_room(self):
@@ -121,6 +524,40 @@ class TestChessRooms:
             f'/api/chess/join_room?room_id={room_id}&player_name=Carol'
         ).status_code == 400
 
+    def test_two_joiners_race_for_one_seat(self):
+        import threading
+        room_id = client.post('/api/chess/create_room?player_name=Alice').json()['room_id']
+        results = []
+
+        def join(name):
+            try:
+                results.append(srv.chess_join_room(room_id=room_id, player_name=name)['color'])
+            except srv.HTTPException as e:
+                results.append(e.status_code)
+
+        with srv._CHESS_LOCK:
+            joiners = [threading.Thread(target=join, args=(name,)) for name in ('Bob', 'Carol')]
+            for t in joiners:
+                t.start()
+            time.sleep(0.05)  # both are past the room lookup, parked on the lock
+        for t in joiners:
+            t.join()
+        assert sorted(results, key=str) == [400, 'black']
+
+    def test_fen_unknown_without_a_board(self):
+        room_id = client.post('/api/chess/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/chess/join_room?room_id={room_id}&player_name=Bob')
+        srv.CHESS_ROOMS[room_id].board = None
+        assert client.post(f'/api/chess/move?room_id={room_id}&player_name=Alice&move=e2e4').status_code == 200
+        state = client.get(f'/api/chess/game_state?room_id={room_id}&player_name=Alice').json()
+        assert state['moves'] == ['e2e4'] and state['fen'] is None
+
+    def test_restores_records_with_the_old_fen_field(self):
+        record = srv._room_record(srv.ChessRoom(room_id='old1', player_white='Alice', moves=['e2e4']))
+        record['board_fen'] = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+        room = srv._chess_from_record(record)
+        assert room.moves == ['e2e4']
+
     def test_resign_declares_winner(self):
         r = client.post('/api/chess/create_room?player_name=Alice')
         room_id = r.json()['room_id']
@@ -131,6 +568,130 @@ class TestChessRooms:
         state = client.get(f'/api/chess/game_state?room_id={room_id}&player_name=Alice').json()
         assert state['status'] == 'finished'
 
+    def _started_room(self):
+        room_id = client.post('/api/chess/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/chess/join_room?room_id={room_id}&player_name=Bob')
+        return room_id
+
+    def test_wait_returns_only_new_moves(self):
+        room_id = self._started_room()
+        client.post(f'/api/chess/move?room_id={room_id}&player_name=Alice&move=e2e4')
+        client.post(f'/api/chess/move?room_id={room_id}&player_name=Bob&move=e7e5')
+        r = client.get(f'/api/chess/wait?room_id={room_id}&since=1').json()
+        assert r['moves'] == ['e7e5']
+        assert (r['move_count'], r['turn']) == (2, 'white')
+
+    def test_wait_blocks_until_opponent_moves(self):
+        import threading
+        import time
+        room_id = self._started_room()
+
+        def move_later():
+            time.sleep(0.2)
+            client.post(f'/api/chess/move?room_id={room_id}&player_name=Alice&move=e2e4')
+
+        mover = threading.Thread(target=move_later)
+        mover.start()
+        start = time.monotonic()
+        r = client.get(f'/api/chess/wait?room_id={room_id}&since=0&timeout=10').json()
+        mover.join()
+        assert r['moves'] == ['e2e4']
+        assert 0.15 < time.monotonic() - start < 5
+        assert srv.CHESS_ROOMS[room_id].waiters == []
+
+    def test_wait_times_out_empty_and_wakes_on_resign(self):
+        import threading
+        import time
+        room_id = self._started_room()
+        r = client.get(f'/api/chess/wait?room_id={room_id}&since=0&timeout=0.1').json()
+        assert (r['moves'], r['status']) == ([], 'playing')
+        assert srv.CHESS_ROOMS[room_id].waiters == []
+
+        resign = threading.Timer(0.1, client.post, args=(
+            f'/api/chess/resign?room_id={room_id}&player_name=Alice',))
+        resign.start()
+        r = client.get(f'/api/chess/wait?room_id={room_id}&since=0&timeout=10').json()
+        resign.join()
+        assert (r['status'], r['winner']) == ('finished', 'black')
+
+    def test_wait_loads_stored_room_off_the_event_loop(self, monkeypatch):
+        import asyncio
+        room_id = self._started_room()
+        del srv.CHESS_ROOMS[room_id]
+        on_loop = []
+        real_load = srv.room_store.load
+
+        def load(kind, rid):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return real_load(kind, rid)
+
+        monkeypatch.setattr(srv.room_store, 'load', load)
+        r = client.get(f'/api/chess/wait?room_id={room_id}&since=0&timeout=0.1').json()
+        assert r['room_id'] == room_id
+        assert on_loop == [False]
+
+    def test_wait_errors(self):
+        assert client.get('/api/chess/wait?room_id=nope').status_code == 404
+        room_id = self._started_room()
+        assert client.get(f'/api/chess/wait?room_id={room_id}&timeout=600').status_code == 422
+
+
+@pytest.mark.skipif(not srv.CHESS_AVAILABLE, reason="python-chess not installed")
+class TestChessRules:
+    def _play(self, moves):
+        room_id = client.post('/api/chess/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/chess/join_room?room_id={room_id}&player_name=Bob')
+        for i, move in enumerate(moves):
+            player = 'Alice' if i % 2 == 0 else 'Bob'
+            r = client.post(f'/api/chess/move?room_id={room_id}&player_name={player}&move={move}')
+            assert r.status_code == 200, (move, r.json())
+        return room_id
+
+    def _state(self, room_id):
+        return client.get(f'/api/chess/game_state?room_id={room_id}&player_name=Alice').json()
+
+    def test_illegal_move_rejected(self):
+        room_id = self._play(['e2e4'])
+        for bad in ('e7e4', 'nonsense', '0000', 'Ke2'):
+            r = client.post(f'/api/chess/move?room_id={room_id}&player_name=Bob&move={bad}')
+            assert r.status_code == 400
+        state = self._state(room_id)
+        assert state['moves'] == ['e2e4']
+        assert state['fen'] == 'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1'
+
+    def test_checkmate_finishes_game_and_persists(self):
+        room_id = self._play(['f2f3', 'e7e5', 'g2g4', 'd8h4'])
+        state = self._state(room_id)
+        assert (state['status'], state['winner']) == ('finished', 'black')
+        assert (state['result'], state['termination']) == ('0-1', 'checkmate')
+        assert client.post(
+            f'/api/chess/move?room_id={room_id}&player_name=Alice&move=e2e4').status_code == 400
+        row = srv.get_db().execute(
+            'SELECT fen, moves_json, result, termination FROM chess_games WHERE room_id = ?',
+            (room_id,)).fetchone()
+        assert row['fen'] == state['fen']
+        assert row['moves_json'] == '["f2f3", "e7e5", "g2g4", "d8h4"]'
+        assert (row['result'], row['termination']) == ('0-1', 'checkmate')
+
+    def test_stalemate_is_a_draw(self):
+        san = ['e3', 'a5', 'Qh5', 'Ra6', 'Qxa5', 'h5', 'h4', 'Rah6', 'Qxc7', 'f6',
+               'Qxd7+', 'Kf7', 'Qxb7', 'Qd3', 'Qxb8', 'Qh7', 'Qxc8', 'Kg6', 'Qe6']
+        room_id = self._play([m.replace('+', '%2B') for m in san])
+        state = self._state(room_id)
+        assert (state['status'], state['winner']) == ('finished', None)
+        assert (state['result'], state['termination']) == ('1/2-1/2', 'stalemate')
+        assert state['last_move'] == 'c8e6'
+
+    def test_resign_records_result(self):
+        room_id = self._play(['e2e4'])
+        client.post(f'/api/chess/resign?room_id={room_id}&player_name=Bob')
+        state = self._state(room_id)
+        assert (state['result'], state['termination']) == ('1-0', 'resignation')
+
 
 class TestPongRooms:
     def test_create_join_paddle_state_and_forfeit(self):
@@ -160,6 +721,136 @@ class TestPongRooms:
         assert r.status_code == 200
         assert r.json()['winner'] == 'Bob'
 
+    def test_websocket_pushes_state_and_takes_paddle(self):
+        import json
+        room_id = client.post('/api/pong/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/pong/join_room?room_id={room_id}&player_name=Bob')
+        with client.websocket_connect(f'/ws/pong?room_id={room_id}&player_name=Bob') as ws:
+            state = ws.receive_json()
+            assert state['side'] == 'right'
+            assert state['status'] == 'playing'
+            ws.send_text(json.dumps({'direction': 'down'}))
+            ws.send_text('not json')
+            ws.receive_json()
+            for _ in range(50):
+                if srv.PONG_ROOMS[room_id].paddle_dir_right == 'down':
+                    break
+                ws.receive_json()
+            assert srv.PONG_ROOMS[room_id].paddle_dir_right == 'down'
+        client.post(f'/api/pong/forfeit?room_id={room_id}&player_name=Alice')
+
+    def test_state_deltas_over_http(self):
+        room_id = client.post('/api/pong/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/pong/join_room?room_id={room_id}&player_name=Bob')
+        url = f'/api/pong/state?room_id={room_id}&player_name=Alice&encoding=json'
+
+        full = client.get(url).json()
+        assert full['base'] is None
+        assert full['changes']['width'] == srv.PONG_WIDTH
+        srv.time.sleep(srv.PONG_TICK * 3)
+        delta = client.get(f'{url}&ack={full["seq"]}').json()
+        assert delta['base'] == full['seq'] and delta['seq'] > full['seq']
+        assert 'ball_x' in delta['changes']
+        assert not {'width', 'height', 'side', 'paddle_size'} & set(delta['changes'])
+        assert client.get(f'{url}&ack=99999').json()['base'] is None
+        assert client.get(f'{url[:-4]}xml').status_code == 422
+        client.post(f'/api/pong/forfeit?room_id={room_id}&player_name=Alice')
+
+    def test_state_waits_for_the_tick_in_progress(self):
+        import threading
+        room_id = client.post('/api/pong/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/pong/join_room?room_id={room_id}&player_name=Bob')
+        room = srv.PONG_ROOMS[room_id]
+        results = []
+        url = f'/api/pong/state?room_id={room_id}&player_name=Alice'
+        with room.lock:
+            reader = threading.Thread(target=lambda: results.append(client.get(url).json()))
+            reader.start()
+            reader.join(0.2)
+            assert reader.is_alive() and not results
+        reader.join(5)
+        assert results[0]['status'] == 'playing'
+        client.post(f'/api/pong/forfeit?room_id={room_id}&player_name=Alice')
+
+    def test_binary_snapshot_frame(self):
+        import struct
+        room_id = client.post('/api/pong/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/pong/join_room?room_id={room_id}&player_name=Bob')
+        client.post(f'/api/pong/forfeit?room_id={room_id}&player_name=Alice')
+        url = f'/api/pong/state?room_id={room_id}&player_name=Bob&encoding=binary'
+
+        r = client.get(url)
+        assert r.headers['content-type'] == 'application/octet-stream'
+        seq, base, mask = struct.unpack_from('<IIH', r.content)
+        assert (base, mask) == (0, (1 << len(srv.PONG_SNAPSHOT_FIELDS)) - 1)
+        assert len(r.content) < len(client.get(url.replace('binary', 'json')).content)
+        again = client.get(f'{url}&ack={seq}').content
+        assert struct.unpack('<IIH', again) == (seq, seq, 0)
+
+    def test_snapshot_log_skips_unchanged_views(self):
+        log = srv.PongSnapshotLog()
+        assert log.delta({'a': 1, 'b': 2}, 0) == (1, None, {'a': 1, 'b': 2})
+        assert log.delta({'a': 1, 'b': 2}, 1) == (1, 1, {})
+        assert log.delta({'a': 1, 'b': 3}, 1) == (2, 1, {'b': 3})
+        for i in range(srv.PONG_SNAPSHOT_HISTORY):
+            log.delta({'a': i}, 0)
+        assert 1 not in log.history and log.delta({'a': -1}, 1)[1] is None
+
+    def test_websocket_pushes_deltas(self):
+        room_id = client.post('/api/pong/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/pong/join_room?room_id={room_id}&player_name=Bob')
+        url = f'/ws/pong?room_id={room_id}&player_name=Bob&encoding=json'
+        with client.websocket_connect(url) as ws:
+            first = ws.receive_json()
+            assert first['base'] is None and first['changes']['side'] == 'right'
+            second = ws.receive_json()
+            assert second['base'] == first['seq']
+            assert 'side' not in second['changes']
+        with client.websocket_connect(url.replace('json', 'binary')) as ws:
+            assert len(ws.receive_bytes()) < len(str(first))
+        client.post(f'/api/pong/forfeit?room_id={room_id}&player_name=Alice')
+
+    def test_websocket_takes_room_locks_off_the_event_loop(self, monkeypatch):
+        import asyncio
+        import json
+        on_loop = []
+
+        def off_loop(fn):
+            def wrapper(*args):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop.append(fn.__name__)
+                except RuntimeError:
+                    pass
+                return fn(*args)
+            return wrapper
+
+        for name in ('_pong_view', '_pong_snapshot', '_set_pong_paddle', '_pong_spectate'):
+            monkeypatch.setattr(srv, name, off_loop(getattr(srv, name)))
+        room_id = client.post('/api/pong/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/pong/join_room?room_id={room_id}&player_name=Bob')
+        with client.websocket_connect(f'/ws/pong?room_id={room_id}&player_name=Bob') as ws:
+            ws.receive_json()
+            ws.send_text(json.dumps({'direction': 'down'}))
+            for _ in range(50):
+                if srv.PONG_ROOMS[room_id].paddle_dir_right == 'down':
+                    break
+                ws.receive_json()
+        with client.websocket_connect(f'/ws/pong?room_id={room_id}&player_name=Bob&encoding=json') as ws:
+            ws.receive_json()
+        with client.websocket_connect(f'/ws/pong/spectate?room_id={room_id}') as ws:
+            ws.receive_json()
+        client.post(f'/api/pong/forfeit?room_id={room_id}&player_name=Alice')
+        assert srv.PONG_ROOMS[room_id].paddle_dir_right == 'down'
+        assert on_loop == []
+
+    def test_websocket_rejects_non_player(self):
+        from starlette.websockets import WebSocketDisconnect
+        room_id = client.post('/api/pong/create_room?player_name=Alice').json()['room_id']
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(f'/ws/pong?room_id={room_id}&player_name=Carol') as ws:
+                ws.receive_json()
+
     def test_pong_room_errors(self):
         assert client.get('/api/pong/state?room_id=nope&player_name=Alice').status_code == 404
         r = client.post('/api/pong/create_room?player_name=Alice')
@@ -168,9 +859,601 @@ class TestPongRooms:
             f'/api/pong/join_room?room_id={room_id}&player_name=Alice'
         ).status_code == 400
 
+    def test_two_joiners_race_for_one_seat(self, monkeypatch):
+        import threading
+        room_id = client.post('/api/pong/create_room?player_name=Alice').json()['room_id']
+        room = srv.PONG_ROOMS[room_id]
+        started = []
+        real_start = srv.pong_engine.start_match
+        monkeypatch.setattr(srv.pong_engine, 'start_match', lambda r: (started.append(r), real_start(r)))
+        results = []
+
+        def join(name):
+            try:
+                results.append(srv.pong_join_room(room_id=room_id, player_name=name)['side'])
+            except srv.HTTPException as e:
+                results.append(e.status_code)
+
+        with room.lock:
+            joiners = [threading.Thread(target=join, args=(name,)) for name in ('Bob', 'Carol')]
+            for t in joiners:
+                t.start()
+            time.sleep(0.05)  # both are past the room lookup, parked on the lock
+        for t in joiners:
+            t.join()
+        assert sorted(results, key=str) == [400, 'right']
+        assert started == [room]
+        client.post(f'/api/pong/forfeit?room_id={room_id}&player_name=Alice')
+
     def test_pong_forfeit_before_start_rejected(self):
         r = client.post('/api/pong/create_room?player_name=Alice')
         room_id = r.json()['room_id']
         assert client.post(
             f'/api/pong/forfeit?room_id={room_id}&player_name=Alice'
         ).status_code == 400
+
+
+class TestPongEngine:
+    def _room(self, room_id='r1', seed=42):
+        room = srv.PongRoom(room_id=room_id, player_left='Alice', player_right='Bob', seed=seed)
+        srv._reset_pong_room(room)
+        return room
+
+    def _state(self, room):
+        return (room.ball_x, room.ball_y, room.ball_dx, room.ball_dy, room.paddle_left,
+                room.paddle_right, room.score_left, room.score_right, room.status, room.tick)
+
+    def test_same_seed_replays_identically(self, monkeypatch):
+        monkeypatch.setattr(srv.random, 'uniform', lambda *a: pytest.fail('global random used'))
+        rooms = [self._room('a'), self._room('b')]
+        for i in range(3000):
+            for room in rooms:
+                room.paddle_dir_left = ('up', 'stop', 'down')[i // 40 % 3]
+                srv._tick_pong(room)
+        assert self._state(rooms[0]) == self._state(rooms[1])
+        assert rooms[0].score_left + rooms[0].score_right > 0
+
+    def test_step_shard_runs_fixed_steps_and_caps_catchup(self):
+        engine = srv.PongEngine(workers=1, tick=0.01)
+        room = self._room()
+        engine._shards[0][room.room_id] = room
+        room.next_tick_at = 100.0
+        assert engine.step_shard(0, now=99.0) == 0
+        assert engine.step_shard(0, now=100.025) == 3
+        assert room.tick == 3
+        assert engine.step_shard(0, now=200.0) == srv.PONG_MAX_CATCHUP
+        assert room.next_tick_at > 200.0
+
+    def test_locked_room_does_not_stall_shard(self):
+        engine = srv.PongEngine(workers=1, tick=0.01)
+        busy, free = self._room('busy'), self._room('free')
+        for room in (busy, free):
+            engine._shards[0][room.room_id] = room
+            room.next_tick_at = 0.0
+        with busy.lock:
+            engine.step_shard(0, now=0.015)
+        assert (busy.tick, free.tick) == (0, 2)
+        engine.step_shard(0, now=0.015)
+        assert busy.tick == 2
+
+    def test_finished_rooms_are_removed(self, monkeypatch):
+        engine = srv.PongEngine(workers=2)
+        room = srv.PongRoom(room_id='old', status='finished', last_tick=srv.time.time() - 301)
+        engine.add(room)
+        assert srv.PONG_ROOMS['old'] is room
+        for i in range(engine.workers):
+            engine.step_shard(i, now=srv.time.monotonic())
+        assert 'old' not in srv.PONG_ROOMS
+
+    def test_live_match_advances(self):
+        room_id = client.post('/api/pong/create_room?player_name=Alice').json()['room_id']
+        client.post(f'/api/pong/join_room?room_id={room_id}&player_name=Bob')
+        srv.time.sleep(srv.PONG_TICK * 4)
+        assert srv.PONG_ROOMS[room_id].tick > 0
+        client.post(f'/api/pong/forfeit?room_id={room_id}&player_name=Alice')
+
+
+@pytest.mark.skipif(not srv.NUMPY_AVAILABLE, reason="numpy not installed")
+class TestPongBatch:
+    def _room(self, room_id, seed):
+        room = srv.PongRoom(room_id=room_id, player_left='Alice', player_right='Bob', seed=seed)
+        srv._reset_pong_room(room)
+        return room
+
+    def _state(self, room):
+        return (room.ball_x, room.ball_y, room.ball_dx, room.ball_dy, room.paddle_left,
+                room.paddle_right, room.score_left, room.score_right, room.tick)
+
+    def test_matches_scalar_tick(self):
+        scalar = [self._room(f's{i}', seed=i) for i in range(40)]
+        batched = [self._room(f'b{i}', seed=i) for i in range(40)]
+        batch = srv.PongBatch(capacity=4)
+        slots = [batch.add(room) for room in batched]
+        dirs = ('up', 'stop', 'down')
+        finished = 0
+        for t in range(6000):
+            for i, (a, b) in enumerate(zip(scalar, batched)):
+                if a.status != 'playing':
+                    continue
+                a.paddle_dir_left = dirs[(t // (20 + i)) % 3]
+                a.paddle_dir_right = dirs[(t // (35 + i)) % 3]
+                batch.steer(slots[i], a.paddle_dir_left, a.paddle_dir_right)
+                srv._tick_pong(a)
+            events = batch.step()
+            for slot, event in events:
+                if event == 'finished':
+                    finished += 1
+                    assert scalar[slot].status == 'finished'
+            for i, (a, b) in enumerate(zip(scalar, batched)):
+                batch.load(b, slots[i])
+                assert self._state(a) == self._state(b)
+        assert finished == sum(room.status == 'finished' for room in scalar) > 0
+
+    def test_slots_are_reused(self):
+        batch = srv.PongBatch(capacity=1)
+        first = batch.add(self._room('a', 1))
+        batch.add(self._room('b', 2))
+        batch.remove(first)
+        assert batch.add(self._room('c', 3)) == first
+        assert len(batch) == 2
+
+    def test_vectorized_engine(self):
+        engine = srv.PongEngine(workers=1, tick=0.01, vectorized=True)
+        room = self._room('v', 7)
+        engine._shards[0][room.room_id] = room
+        with room.lock:
+            engine.start_match(room)
+        engine._batch_next_at[0] = 0.0
+        assert engine.step_shard(0, now=0.025) == 3
+        assert room.tick == 0
+        engine.sync(room)
+        assert room.tick == 3
+        room.paddle_dir_left = 'up'
+        engine.steer(room)
+        engine.step_shard(0, now=0.035)
+        engine.sync(room)
+        assert room.paddle_left < srv.PONG_HEIGHT / 2 - 2
+        with room.lock:
+            engine.end_match(room)
+        assert room.slot is None and len(engine._batches[0]) == 0
+
+
+class TestRoomStore:
+    @pytest.fixture(params=['memory', 'sqlite'])
+    def store(self, request):
+        return srv.ROOM_STORES[request.param]()
+
+    def _forget(self, room_id):
+        """Drop a room from this process only, as a restart would."""
+        srv.CHESS_ROOMS.pop(room_id, None)
+        with srv._PONG_LOCK:
+            srv.PONG_ROOMS.pop(room_id, None)
+            srv.pong_engine._shard(room_id).pop(room_id, None)
+
+    def test_store_roundtrip(self, store):
+        store.save('chess', [{'room_id': 'a', 'status': 'playing', 'moves': ['e2e4']},
+                             {'room_id': 'b', 'status': 'finished', 'moves': []}])
+        store.save('pong', [{'room_id': 'a', 'status': 'waiting'}])
+        assert store.load('chess', 'a')['moves'] == ['e2e4']
+        assert store.load('chess', 'zz') is None
+        assert [r['room_id'] for r in store.load_active('chess')] == ['a']
+        store.delete('chess', 'a')
+        assert store.load('chess', 'a') is None
+        assert store.load('pong', 'a')['status'] == 'waiting'
+
+    def test_chess_room_survives_restart(self):
+        rid = client.post('/api/chess/create_room', params={'player_name': 'A'}).json()['room_id']
+        client.post('/api/chess/join_room', params={'room_id': rid, 'player_name': 'B'})
+        client.post('/api/chess/move', params={'room_id': rid, 'player_name': 'A', 'move': 'e2e4'})
+        self._forget(rid)
+        assert srv.restore_rooms()[0] >= 1
+        state = client.get('/api/chess/game_state', params={'room_id': rid, 'player_name': 'B'}).json()
+        assert state['moves'] == ['e2e4'] and state['status'] == 'playing'
+        r = client.post('/api/chess/move', params={'room_id': rid, 'player_name': 'B', 'move': 'e4e5'})
+        assert r.status_code == 400
+        r = client.post('/api/chess/move', params={'room_id': rid, 'player_name': 'B', 'move': 'e7e5'})
+        assert r.status_code == 200
+
+    def test_unknown_room_is_loaded_on_first_use(self):
+        rid = client.post('/api/chess/create_room', params={'player_name': 'A'}).json()['room_id']
+        self._forget(rid)
+        r = client.post('/api/chess/join_room', params={'room_id': rid, 'player_name': 'B'})
+        assert r.status_code == 200
+        assert client.get('/api/chess/game_state', params={'room_id': 'nope', 'player_name': 'B'}).status_code == 404
+
+    def test_sockets_load_stored_rooms_off_the_event_loop(self, monkeypatch):
+        import asyncio
+        on_loop = []
+        real_load = srv.room_store.load
+
+        def load(kind, rid):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return real_load(kind, rid)
+
+        monkeypatch.setattr(srv.room_store, 'load', load)
+        chess_id = client.post('/api/chess/create_room', params={'player_name': 'A'}).json()['room_id']
+        pong_id = client.post('/api/pong/create_room', params={'player_name': 'L'}).json()['room_id']
+        for url, rid in ((f'/ws/chess/spectate?room_id={chess_id}', chess_id),
+                         (f'/ws/pong/spectate?room_id={pong_id}', pong_id),
+                         (f'/ws/pong?room_id={pong_id}&player_name=L', pong_id)):
+            self._forget(rid)
+            with client.websocket_connect(url) as ws:
+                ws.receive_json()
+        assert on_loop == [False, False, False]
+
+    def test_pong_room_resumes_from_checkpoint(self):
+        rid = client.post('/api/pong/create_room', params={'player_name': 'L'}).json()['room_id']
+        client.post('/api/pong/join_room', params={'room_id': rid, 'player_name': 'R'})
+        room = srv.PONG_ROOMS[rid]
+        with room.lock:
+            room.score_left = 3
+            room.tick += 1
+        srv.checkpoint_pong_rooms()
+        saved = srv.room_store.load('pong', rid)
+        self._forget(rid)
+        state = client.get('/api/pong/state', params={'room_id': rid, 'player_name': 'R'}).json()
+        assert state['status'] == 'playing' and state['opponent_score'] == 3
+        resumed = srv.PONG_ROOMS[rid]
+        assert resumed is not room and resumed.tick >= saved['tick']
+        client.post('/api/pong/forfeit', params={'room_id': rid, 'player_name': 'L'})
+        assert srv.room_store.load('pong', rid)['status'] == 'finished'
+
+    def test_pong_rng_replays_from_seed_and_score(self):
+        room = srv.PongRoom(room_id='rng', player_left='L', player_right='R', seed=1234)
+        srv._reset_pong_room(room)
+        while room.score_left + room.score_right < 3:
+            srv._tick_pong(room)
+        resumed = srv.PongRoom(**srv._room_record(room))
+        srv._replay_pong_rng(resumed)
+        assert resumed == room
+        assert resumed.rng.getstate() == room.rng.getstate()
+
+    def test_rooms_are_sharded_by_room_id(self, monkeypatch):
+        monkeypatch.setattr(srv, 'WORKER_COUNT', 4)
+        monkeypatch.setattr(srv, 'WORKER_INDEX', 2)
+        ids = [srv._new_room_id() for _ in range(20)]
+        assert {srv.room_shard(rid) for rid in ids} == {2}
+        other = next(rid for rid in (f'r{i}' for i in range(100)) if srv.room_shard(rid) != 2)
+        srv.room_store.save('chess', [srv._room_record(srv.ChessRoom(room_id=ids[0]))])
+        srv.room_store.save('chess', [srv._room_record(srv.ChessRoom(room_id=other))])
+        srv.restore_rooms()
+        assert ids[0] in srv.CHESS_ROOMS and other not in srv.CHESS_ROOMS
+
+    def test_kill_and_restart_mid_game(self, tmp_path):
+        import signal
+        import socket
+        import subprocess
+        import time
+        import httpx
+
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        base = f'http://127.0.0.1:{port}'
+        env = dict(os.environ, LEADERBOARD_DB=str(tmp_path / 'live.db'), PONG_CHECKPOINT_SECONDS='0.1')
+
+        def start():
+            proc = subprocess.Popen(
+                [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+                cwd=os.path.join(os.path.dirname(__file__), '..', 'server'), env=env,
+            )
+            deadline = time.time() + 15
+            while time.time() < deadline:
+                try:
+                    if httpx.get(f'{base}/health', timeout=0.5).status_code == 200:
+                        return proc
+                except httpx.HTTPError:
+                    time.sleep(0.1)
+            proc.kill()
+            pytest.fail('server did not start')
+
+        proc = start()
+        try:
+            chess_id = httpx.post(f'{base}/api/chess/create_room', params={'player_name': 'A'}).json()['room_id']
+            httpx.post(f'{base}/api/chess/join_room', params={'room_id': chess_id, 'player_name': 'B'})
+            for player, move in (('A', 'e2e4'), ('B', 'e7e5')):
+                httpx.post(f'{base}/api/chess/move', params={'room_id': chess_id, 'player_name': player, 'move': move})
+            pong_id = httpx.post(f'{base}/api/pong/create_room', params={'player_name': 'L'}).json()['room_id']
+            httpx.post(f'{base}/api/pong/join_room', params={'room_id': pong_id, 'player_name': 'R'})
+            time.sleep(0.5)
+            before = httpx.get(f'{base}/api/pong/state', params={'room_id': pong_id, 'player_name': 'L'}).json()
+            time.sleep(0.3)
+            proc.send_signal(signal.SIGKILL)
+            proc.wait(timeout=5)
+
+            proc = start()
+            state = httpx.get(f'{base}/api/chess/game_state', params={'room_id': chess_id, 'player_name': 'A'}).json()
+            assert state['moves'] == ['e2e4', 'e7e5'] and state['turn'] == 'white'
+            r = httpx.post(f'{base}/api/chess/move', params={'room_id': chess_id, 'player_name': 'A', 'move': 'g1f3'})
+            assert r.status_code == 200
+            after = httpx.get(f'{base}/api/pong/state', params={'room_id': pong_id, 'player_name': 'L'}).json()
+            assert after['status'] == 'playing' and after['tick'] >= before['tick']
+        finally:
+            proc.kill()
+            proc.wait(timeout=5)
+
+
+class TestSpectators:
+    def _chess_game(self):
+        rid = client.post('/api/chess/create_room', params={'player_name': 'A'}).json()['room_id']
+        client.post('/api/chess/join_room', params={'room_id': rid, 'player_name': 'B'})
+        return rid
+
+    def test_unwatched_publish_is_skipped(self):
+        broadcaster = srv.Broadcaster()
+        assert broadcaster.publish('room', {'x': object()}) is False
+
+    def test_slow_subscriber_gets_latest_then_stops(self):
+        import asyncio
+        broadcaster = srv.Broadcaster()
+
+        async def run():
+            sub = broadcaster.subscribe('room')
+            for i in range(3):
+                broadcaster.publish('room', {'n': i})
+            broadcaster.publish('room', {'n': 3}, final=True)
+            got = [payload async for payload in sub]
+            sub.close()
+            return got
+
+        assert asyncio.run(run()) == ['{"n": 3}']
+        assert not broadcaster.watching('room')
+
+    def test_publish_from_another_thread_wakes_subscribers(self):
+        import asyncio
+        import threading
+        broadcaster = srv.Broadcaster()
+
+        async def run():
+            subs = [broadcaster.subscribe('room') for _ in range(50)]
+            assert broadcaster.subscribers('room') == 50
+            t = threading.Thread(target=broadcaster.publish, args=('room', {'n': 1}))
+            t.start()
+            got = await asyncio.gather(*(sub.__anext__() for sub in subs))
+            t.join()
+            for sub in subs:
+                sub.close()
+            return got
+
+        assert set(asyncio.run(run())) == {'{"n": 1}'}
+        assert broadcaster.subscribers('room') == 0
+
+    def test_chess_websocket_follows_moves(self):
+        rid = self._chess_game()
+        with client.websocket_connect(f'/ws/chess/spectate?room_id={rid}') as ws:
+            assert ws.receive_json()['moves'] == []
+            client.post('/api/chess/move', params={'room_id': rid, 'player_name': 'A', 'move': 'e2e4'})
+            state = ws.receive_json()
+            assert state['moves'] == ['e2e4'] and state['turn'] == 'black'
+            client.post('/api/chess/resign', params={'room_id': rid, 'player_name': 'B'})
+            final = ws.receive_json()
+            assert final['status'] == 'finished' and final['termination'] == 'resignation'
+        assert not srv.chess_spectators.watching(rid)
+
+    def test_chess_sse_streams_until_game_ends(self):
+        import json
+        import threading
+        import time
+        rid = self._chess_game()
+
+        def play():
+            deadline = time.time() + 5
+            while srv.chess_spectators.subscribers(rid) == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            client.post('/api/chess/move', params={'room_id': rid, 'player_name': 'A', 'move': 'e2e4'})
+            client.post('/api/chess/resign', params={'room_id': rid, 'player_name': 'A'})
+
+        t = threading.Thread(target=play)
+        t.start()
+        r = client.get('/api/chess/spectate', params={'room_id': rid})
+        t.join()
+        assert r.headers['content-type'].startswith('text/event-stream')
+        events = [json.loads(line[len('data: '):]) for line in r.text.splitlines() if line]
+        assert [len(e['moves']) for e in events] == [0, 1, 1]
+        assert events[-1]['winner'] == 'black'
+
+    def test_spectating_missing_room(self):
+        assert client.get('/api/chess/spectate', params={'room_id': 'nope'}).status_code == 404
+        assert client.get('/api/pong/spectate', params={'room_id': 'nope'}).status_code == 404
+
+    def test_pong_websocket_streams_ticks(self):
+        rid = client.post('/api/pong/create_room', params={'player_name': 'L'}).json()['room_id']
+        client.post('/api/pong/join_room', params={'room_id': rid, 'player_name': 'R'})
+        with client.websocket_connect(f'/ws/pong/spectate?room_id={rid}') as ws:
+            first = ws.receive_json()
+            assert first['player_left'] == 'L' and first['status'] == 'playing'
+            assert ws.receive_json()['tick'] > first['tick']
+            client.post('/api/pong/forfeit', params={'room_id': rid, 'player_name': 'L'})
+            while True:
+                state = ws.receive_json()
+                if state['status'] == 'finished':
+                    break
+            assert state['winner'] == 'R'
+
+
+class TestMetrics:
+    def test_histogram_buckets_are_cumulative(self):
+        h = srv.Histogram('demo_seconds', 'Demo.', (0.1, 1.0), ('route',))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            h.observe(value, '/a')
+        lines = h.render()
+        assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'demo_seconds_bucket{route="/a",le="1"} 3' in lines
+        assert 'demo_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+        assert 'demo_seconds_count{route="/a"} 4' in lines
+
+    def test_routes_are_labelled_by_template(self):
+        client.get('/api/rank', params={'player_name': 'nobody', 'game_name': 'snake'})
+        client.get('/no/such/path')
+        text = client.get('/metrics').text
+        assert 'arcade_http_requests_total{method="GET",route="/api/rank",status="404"}' in text
+        assert 'route="unmatched"' in text
+        assert 'arcade_http_request_duration_seconds_count{method="GET",route="/api/rank"}' in text
+
+    def test_sqlite_and_pong_metrics(self):
+        client.post('/api/scores', json={'player_name': 'M', 'game_name': 'snake', 'score': 3})
+        client.get('/api/my_best', params={'player_name': 'M'})
+        assert srv.SQL_LATENCY.count('SQL_BEST_ALL') >= 1
+        assert srv.SQL_LATENCY.count('commit') >= 1
+        assert srv.PONG_TICK_DURATION.count() > 0
+        text = client.get('/metrics').text
+        assert 'arcade_sqlite_query_duration_seconds_bucket{query="SQL_INSERT_SCORE",le="+Inf"}' in text
+        assert '# TYPE arcade_pong_tick_lag_seconds histogram' in text
+        assert 'arcade_rooms{game="pong",status="playing"}' in text
+        assert 'arcade_score_queue_depth 0' in text
+
+    def test_profiler_is_opt_in(self):
+        assert client.post('/debug/profiler', params={'enabled': True}).status_code == 404
+        assert client.get('/debug/profiler').status_code == 404
+
+    def test_profiler_finds_hot_function(self, monkeypatch):
+        import threading
+        import time
+        monkeypatch.setattr(srv, 'PROFILER_ENABLED', True)
+
+        def spin_for_profiler():
+            end = time.perf_counter() + 0.3
+            while time.perf_counter() < end:
+                pass
+
+        assert client.post('/debug/profiler', params={'enabled': True}).json()['running']
+        t = threading.Thread(target=spin_for_profiler)
+        t.start()
+        t.join()
+        assert not client.post('/debug/profiler', params={'enabled': False}).json()['running']
+        report = client.get('/debug/profiler', params={'top': 10}).text
+        assert 'spin_for_profiler' in report
+
+
+class TestRateLimiting:
+    RULES = (
+        ('scores', '/api/scores', 'client', 1.0, 2.0),
+        ('pong_room', '/api/pong/', 'room', 10.0, 3.0),
+    )
+
+    def _scope(self, path, client='1.2.3.4', query=b'', headers=()):
+        return {'type': 'http', 'path': path, 'client': (client, 1), 'query_string': query,
+                'headers': list(headers)}
+
+    def test_bucket_refuses_then_refills(self):
+        limiter = srv.RateLimiter(rules=self.RULES, enabled=True)
+        scope = self._scope('/api/scores')
+        assert limiter.check(scope, now=0.0) is None
+        assert limiter.check(scope, now=0.0) is None
+        rule, retry = limiter.check(scope, now=0.0)
+        assert rule == 'scores' and retry == pytest.approx(1.0)
+        assert limiter.check(self._scope('/api/scores', client='5.6.7.8'), now=0.0) is None
+        assert limiter.check(scope, now=1.0) is None
+        assert limiter.check(self._scope('/api/leaderboard'), now=1.0) is None
+
+    def test_rooms_share_a_bucket(self):
+        limiter = srv.RateLimiter(rules=self.RULES, enabled=True)
+        for i in range(3):
+            assert limiter.check(self._scope('/api/pong/state', client=f'c{i}', query=b'room_id=r1'), now=0.0) is None
+        assert limiter.check(self._scope('/api/pong/state', client='c9', query=b'room_id=r1'), now=0.0)[0] == 'pong_room'
+        assert limiter.check(self._scope('/api/pong/state', query=b'room_id=r2'), now=0.0) is None
+
+    def test_game_polling_skips_the_client_bucket(self):
+        rules = self.RULES + (('client', '/', 'client', 1.0, 1.0),)
+        limiter = srv.RateLimiter(rules=rules, enabled=True)
+        for _ in range(3):
+            assert limiter.check(self._scope('/api/pong/state', query=b'room_id=r1'), now=0.0) is None
+        assert limiter.check(self._scope('/api/chess/game_state', query=b'room_id=c1'), now=0.0) is None
+        assert limiter.check(self._scope('/api/leaderboard'), now=0.0) is None
+        assert limiter.check(self._scope('/api/leaderboard'), now=0.0)[0] == 'client'
+
+    def test_room_creation_spends_the_client_bucket(self):
+        rules = self.RULES + (('client', '/', 'client', 1.0, 2.0),)
+        limiter = srv.RateLimiter(rules=rules, enabled=True)
+        assert limiter.check(self._scope('/api/pong/create_room'), now=0.0) is None
+        assert limiter.check(self._scope('/api/chess/create_room'), now=0.0) is None
+        assert limiter.check(self._scope('/api/pong/create_room'), now=0.0)[0] == 'client'
+        assert limiter.check(self._scope('/api/chess/join_room', query=b'room_id=c1'), now=0.0)[0] == 'client'
+
+    def test_bucket_count_is_bounded(self):
+        limiter = srv.RateLimiter(rules=self.RULES, max_buckets=10, enabled=True)
+        for i in range(50):
+            limiter.check(self._scope('/api/scores', client=f'c{i}'), now=0.0)
+        assert len(limiter._buckets) == 10
+
+    def test_forwarded_for_when_proxy_trusted(self, monkeypatch):
+        monkeypatch.setattr(srv, 'RATE_LIMIT_TRUST_PROXY', True)
+        limiter = srv.RateLimiter(rules=self.RULES, enabled=True)
+        for ip in (b'9.9.9.1', b'9.9.9.2'):
+            headers = [(b'x-forwarded-for', ip + b', 10.0.0.1')]
+            assert limiter.check(self._scope('/api/scores', headers=headers), now=0.0) is None
+            assert limiter.check(self._scope('/api/scores', headers=headers), now=0.0) is None
+
+    def test_middleware_answers_429(self, monkeypatch):
+        monkeypatch.setattr(srv.rate_limiter, 'enabled', True)
+        monkeypatch.setattr(srv.rate_limiter, 'rules', self.RULES)
+        before = srv.RATE_LIMITED.value('scores')
+        body = {'player_name': 'spam', 'game_name': 'snake', 'score': 1}
+        codes = [client.post('/api/scores', json=body).status_code for _ in range(4)]
+        assert codes[:2] == [200, 200] and codes[-1] == 429
+        r = client.post('/api/scores', json=body)
+        assert r.status_code == 429 and int(r.headers['retry-after']) >= 1
+        assert srv.RATE_LIMITED.value('scores') >= before + 2
+        assert 'arcade_rate_limited_total{rule="scores"}' in client.get('/metrics').text
+
+    def test_create_room_answers_429(self, monkeypatch):
+        monkeypatch.setattr(srv.rate_limiter, 'enabled', True)
+        monkeypatch.setattr(srv.rate_limiter, 'rules', (('client', '/', 'client', 1.0, 3.0),))
+        codes = [client.post('/api/pong/create_room?player_name=Spammer').status_code for _ in range(5)]
+        assert codes[:3] == [200, 200, 200] and codes[-1] == 429
+
+
+class TestCoalescing:
+    def test_concurrent_identical_gets_share_one_computation(self, monkeypatch):
+        import threading
+        import time
+        client.post('/api/scores', json={'player_name': 'amy', 'game_name': 'snake', 'score': 10})
+        real_lookup = srv.rank_index.lookup
+        calls = []
+
+        def slow_lookup(game, player):
+            calls.append(player)
+            time.sleep(0.5)
+            return real_lookup(game, player)
+
+        monkeypatch.setattr(srv.rank_index, 'lookup', slow_lookup)
+        before = srv.COALESCED.value('/api/rank')
+        results = []
+
+        def fetch():
+            results.append(client.get('/api/rank', params={'player_name': 'amy', 'game_name': 'snake'}))
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+        assert [r.status_code for r in results] == [200] * 8
+        assert len({r.text for r in results}) == 1
+        assert srv.COALESCED.value('/api/rank') == before + 7
+
+    def test_different_queries_are_not_coalesced(self, monkeypatch):
+        import threading
+        import time
+        calls = []
+
+        def slow_lookup(game, player):
+            calls.append(player)
+            time.sleep(0.2)
+
+        monkeypatch.setattr(srv.rank_index, 'lookup', slow_lookup)
+        threads = [
+            threading.Thread(target=client.get, args=('/api/rank',),
+                             kwargs={'params': {'player_name': f'p{i}', 'game_name': 'snake'}})
+            for i in range(3)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(calls) == ['p0', 'p1', 'p2']
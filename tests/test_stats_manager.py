@@ -3,8 +3,11 @@ Unit tests for StatsManager (SQLite-backed).
 """
 
 import os
+import sqlite3
 import sys
 
+import pytest
+
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'terminal_games'))
 
 from stats_manager import StatsManager, get_stats_manager
@@ -214,3 +217,309 @@ class TestStatsManagerGameState:
         manager = StatsManager()
         manager.delete_game_state('nonexistent_xyz')
         assert manager.load_game_state('nonexistent_xyz') is None
+
+
+class TestStatsManagerScoreOutbox:
+    """Test the durable queue of scores awaiting upload."""
+
+    def test_queue_survives_reopen_and_drains_in_order(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        manager = StatsManager()
+        first = manager.queue_score('ACE', 'snake', 120)
+        manager.queue_score('ACE', 'tetris', 900, 'hard')
+        manager.conn.close()
+
+        manager = StatsManager()
+        assert manager.outbox_size() == 2
+        pending = manager.pending_scores(limit=1)
+        assert [(r['id'], r['game_name'], r['score']) for r in pending] == [(first, 'snake', 120)]
+        manager.remove_scores([first])
+        assert [(r['game_name'], r['difficulty']) for r in manager.pending_scores()] == [('tetris', 'hard')]
+
+    def test_background_thread_uses_its_own_connection(self, monkeypatch, tmp_path):
+        import threading
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        manager = StatsManager()
+        manager.queue_score('ACE', 'snake', 1)
+        seen = []
+
+        def worker():
+            seen.append(manager._thread_conn() is manager.conn)
+            manager.remove_scores([r['id'] for r in manager.pending_scores()])
+            manager.close_thread_connection()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert seen == [False]
+        assert manager.outbox_size() == 0
+
+
+class TestStatsManagerLeaderboardCache:
+    """Test the cached online boards and recent-games lookup."""
+
+    def test_cache_roundtrip_and_recent_games(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        manager = StatsManager()
+        assert manager.get_cached_leaderboard('*') is None
+        manager.cache_leaderboard('*', [{'rank': 1, 'score': 10}])
+        entries, fetched_at = manager.get_cached_leaderboard('*')
+        assert entries == [{'rank': 1, 'score': 10}] and fetched_at > 0
+
+        for game in ('snake', 'tetris', 'snake', 'pong'):
+            manager.record_session(game, 1, 1, 1)
+        # Sessions recorded within one clock tick: make the order explicit.
+        with manager.conn:
+            manager.conn.executemany("UPDATE game_summary SET last_played = ? WHERE game_name = ?",
+                                     [(1, 'tetris'), (2, 'snake'), (3, 'pong')])
+        assert manager.recent_games(limit=2) == ['pong', 'snake']
+
+
+class TestStatsManagerWriteBehindXP:
+    """Test that XP awards are held in memory and written in one transaction."""
+
+    def _disk_xp(self, path):
+        import sqlite3
+        conn = sqlite3.connect(path)
+        try:
+            return {k: int(v) for k, v in conn.execute(
+                "SELECT key, value FROM profile WHERE key IN ('total_xp', 'level')")}
+        finally:
+            conn.close()
+
+    def test_awards_are_coalesced_until_flush(self, monkeypatch, tmp_path):
+        import stats_manager
+        path = str(tmp_path / 'player.db')
+        monkeypatch.setattr(StatsManager, 'DB_PATH', path)
+        monkeypatch.setattr(stats_manager, 'XP_FLUSH_SECONDS', 60)
+        manager = StatsManager()
+        changes = manager.conn.total_changes
+        for _ in range(120):
+            manager.add_xp(5)
+        assert manager.get_level_and_xp()[:2] == (2, 600)
+        assert manager.get_stats()['total_xp'] == 600
+        assert self._disk_xp(path) == {'total_xp': 0, 'level': 1}
+
+        manager.flush()
+        assert self._disk_xp(path) == {'total_xp': 600, 'level': 2}
+        assert manager.conn.total_changes - changes == 2
+
+    def test_background_flusher_writes_and_exits(self, monkeypatch, tmp_path):
+        import time
+        import stats_manager
+        path = str(tmp_path / 'player.db')
+        monkeypatch.setattr(StatsManager, 'DB_PATH', path)
+        monkeypatch.setattr(stats_manager, 'XP_FLUSH_SECONDS', 0.02)
+        manager = StatsManager()
+        manager.add_xp(40)
+        for _ in range(200):
+            if manager._flusher is None:
+                break
+            time.sleep(0.01)
+        assert manager._flusher is None
+        assert self._disk_xp(path)['total_xp'] == 40
+
+    def test_game_end_and_exit_flush(self, monkeypatch, tmp_path):
+        import weakref
+        import stats_manager
+        path = str(tmp_path / 'player.db')
+        monkeypatch.setattr(StatsManager, 'DB_PATH', path)
+        monkeypatch.setattr(stats_manager, 'XP_FLUSH_SECONDS', 60)
+        manager = StatsManager()
+        manager.add_xp(30)
+        manager.record_session('snake', 10, 30, 5.0)
+        assert self._disk_xp(path)['total_xp'] == 30
+        manager.add_xp(20)
+        stats_manager._flush_at_exit(weakref.ref(manager))
+        assert self._disk_xp(path)['total_xp'] == 50
+
+    def test_setting_total_xp_discards_pending_awards(self, monkeypatch, tmp_path):
+        import stats_manager
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        monkeypatch.setattr(stats_manager, 'XP_FLUSH_SECONDS', 60)
+        manager = StatsManager()
+        manager.add_xp(100)
+        manager._set_profile_int('total_xp', 1000)
+        manager.flush()
+        assert manager._get_profile_int('total_xp') == 1000
+
+    def test_awards_do_not_touch_sqlite(self, monkeypatch, tmp_path):
+        import stats_manager
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        monkeypatch.setattr(stats_manager, 'XP_FLUSH_SECONDS', 60)
+        manager = StatsManager()
+        manager.add_xp(10)
+        manager.flush()
+        statements = []
+        manager.conn.set_trace_callback(statements.append)
+        for _ in range(50):
+            manager.add_xp(10)
+        assert manager.get_level_and_xp()[:2] == (2, 510)
+        manager.conn.set_trace_callback(None)
+        assert statements == []
+
+    def test_flusher_writes_to_the_managers_own_file(self, monkeypatch, tmp_path):
+        import threading
+        import stats_manager
+        path = str(tmp_path / 'player.db')
+        monkeypatch.setattr(StatsManager, 'DB_PATH', path)
+        monkeypatch.setattr(stats_manager, 'XP_FLUSH_SECONDS', 60)
+        manager = StatsManager()
+        manager.add_xp(70)
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'other.db'))
+        worker = threading.Thread(target=lambda: (manager.flush(), manager.close_thread_connection()))
+        worker.start()
+        worker.join()
+        assert self._disk_xp(path)['total_xp'] == 70
+        assert not (tmp_path / 'other.db').exists()
+
+
+class TestStatsManagerSettingsSnapshot:
+    """Settings are read from the database once and kept current by set_setting."""
+
+    def test_reads_come_from_the_snapshot(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        manager = StatsManager()
+        assert manager.get_settings()['sound_enabled'] is True
+        manager.conn.execute("UPDATE settings SET setting_value = 'False' WHERE setting_key = 'sound_enabled'")
+        assert manager.get_setting('sound_enabled') is True
+        manager.get_settings()['theme'] = 'changed by a caller'
+        assert manager.get_setting('theme') == 'classic'
+
+    def test_set_setting_updates_snapshot_and_notifies(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        manager = StatsManager()
+        seen = []
+        manager.on_settings_change(lambda key, value: seen.append((key, value)))
+        version = manager.settings_version
+        manager.set_setting('sound_enabled', False)
+        manager.set_setting('theme', 'matrix')
+        assert seen == [('sound_enabled', False), ('theme', 'matrix')]
+        assert manager.settings_version == version + 2
+        assert manager.get_settings()['sound_enabled'] is False
+        assert StatsManager().get_setting('theme') == 'matrix'
+
+    def test_failing_listener_does_not_block_others(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        manager = StatsManager()
+        seen = []
+
+        def broken(key, value):
+            raise RuntimeError('boom')
+
+        manager.on_settings_change(broken)
+        manager.on_settings_change(seen.append)
+        manager.on_settings_change(lambda key, value: seen.append(key))
+        manager.remove_settings_listener(seen.append)
+        manager.set_setting('player_name', 'ACE')
+        assert seen == ['player_name']
+        assert manager.get_setting('player_name') == 'ACE'
+
+
+class TestStatsManagerSessionRollup:
+    """Test the per-game summary kept by record_session and the schema migration."""
+
+    def test_rollup_tracks_sessions(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        manager = StatsManager()
+        manager.record_session('Snake', 40, 10, 12.5)
+        manager.record_session('snake', 90, 10, 30)
+        manager.record_session('tetris', 5, 1, 3)
+        assert manager.get_game_play_count('snake') == 2
+        assert manager.get_game_total_time('SNAKE') == 42
+        assert manager.get_game_play_count('pong') == 0
+        sessions = manager.get_stats()['sessions']
+        assert sessions['snake']['plays'] == 2 and sessions['snake']['best_score'] == 90
+        assert sessions['tetris']['seconds'] == 3
+
+    def test_get_stats_is_one_query(self, monkeypatch, tmp_path):
+        import stats_manager
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        monkeypatch.setattr(stats_manager, 'XP_FLUSH_SECONDS', 60)
+        manager = StatsManager()
+        manager.update_game_stats('snake', {'high_score': 70})
+        manager.unlock_achievement('first_game')
+        manager.add_xp(600)
+        manager.get_settings()
+        statements = []
+        manager.conn.set_trace_callback(statements.append)
+        stats = manager.get_stats()
+        manager.conn.set_trace_callback(None)
+        assert len(statements) == 1
+        assert stats['total_xp'] == 600 and stats['level'] == 2
+        assert stats['achievements'] == ['first_game']
+        assert stats['games'] == {'snake': {'high_score': 70}}
+        assert stats['games_played'] == 1
+
+    def test_migration_backfills_an_old_database(self, monkeypatch, tmp_path):
+        path = str(tmp_path / 'player.db')
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE play_sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, game_name TEXT NOT NULL, "
+            "score INTEGER DEFAULT 0, xp_earned INTEGER DEFAULT 0, duration_seconds REAL DEFAULT 0, "
+            "difficulty TEXT DEFAULT 'normal', played_at REAL NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO play_sessions (game_name, score, duration_seconds, played_at) VALUES (?, ?, ?, ?)",
+            [('snake', 10, 5, 1), ('snake', 30, 7, 2), ('pong', 3, 1, 3)],
+        )
+        conn.commit()
+        conn.close()
+
+        monkeypatch.setattr(StatsManager, 'DB_PATH', path)
+        manager = StatsManager()
+        import stats_manager
+        assert manager.conn.execute("PRAGMA user_version").fetchone()[0] == stats_manager.SCHEMA_VERSION
+        assert manager.get_game_play_count('snake') == 2
+        assert manager.get_game_total_time('snake') == 12
+        assert manager.get_stats()['sessions']['pong']['best_score'] == 3
+        plan = manager.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT score FROM play_sessions WHERE game_name = ? ORDER BY score DESC LIMIT 5",
+            ('snake',)
+        ).fetchall()
+        assert any('idx_play_sessions_game_score' in row['detail'] for row in plan)
+
+
+class TestStatsManagerMigrations:
+    """Test the PRAGMA user_version migration runner."""
+
+    def test_fresh_database_is_current_and_in_wal_mode(self, monkeypatch, tmp_path):
+        import stats_manager
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        manager = StatsManager()
+        assert manager.conn.execute("PRAGMA user_version").fetchone()[0] == stats_manager.SCHEMA_VERSION
+        assert manager.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert manager._thread_conn().execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    def test_failed_step_rolls_back_and_resumes_later(self, monkeypatch, tmp_path):
+        import stats_manager
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        StatsManager().conn.close()
+        current = stats_manager.SCHEMA_VERSION
+        broken = stats_manager.MIGRATIONS + (
+            ("CREATE TABLE extra (id INTEGER PRIMARY KEY)", "INSERT INTO missing VALUES (1)"),
+        )
+        monkeypatch.setattr(stats_manager, 'MIGRATIONS', broken)
+        monkeypatch.setattr(stats_manager, 'SCHEMA_VERSION', current + 1)
+        with pytest.raises(sqlite3.OperationalError):
+            StatsManager()
+
+        conn = sqlite3.connect(StatsManager.DB_PATH)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == current
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'extra'").fetchone() is None
+        conn.close()
+
+        fixed = stats_manager.MIGRATIONS[:-1] + (("CREATE TABLE extra (id INTEGER PRIMARY KEY)",),)
+        monkeypatch.setattr(stats_manager, 'MIGRATIONS', fixed)
+        manager = StatsManager()
+        assert manager.conn.execute("PRAGMA user_version").fetchone()[0] == current + 1
+        assert manager.conn.execute("SELECT COUNT(*) FROM extra").fetchone()[0] == 0
+
+    def test_newer_database_is_left_alone(self, monkeypatch, tmp_path):
+        import stats_manager
+        monkeypatch.setattr(StatsManager, 'DB_PATH', str(tmp_path / 'player.db'))
+        StatsManager().conn.execute(f"PRAGMA user_version = {stats_manager.SCHEMA_VERSION + 5}")
+        manager = StatsManager()
+        assert manager.conn.execute("PRAGMA user_version").fetchone()[0] == stats_manager.SCHEMA_VERSION + 5
+        manager.record_session('snake', 1, 1, 1)
+        assert manager.get_game_play_count('snake') == 1